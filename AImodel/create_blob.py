@@ -1,17 +1,33 @@
-import pathlib
-
-# Define paths
-onnx_model_path = pathlib.Path("datasets/solidwaste_project/yolov8n_v1_results/weights/best.onnx")
-xml_path = pathlib.Path("datasets/solidwaste_project/yolov8n_v1_results/weights/best.xml")
-bin_path = pathlib.Path("datasets/solidwaste_project/yolov8n_v1_results/weights/best.bin")
-blob_output_path = pathlib.Path("datasets/solidwaste_project/yolov8n_v1_results/weights/best.blob")
-
-import blobconverter
-
-blob_path = blobconverter.from_onnx(
-    model=str(onnx_model_path),
-    data_type="FP16",      # Use FP16 for OAK-D
-    shaves=6,
-    use_cache=False
-)
-print(f"Compatible blob saved at: {blob_path}")
+"""
+Converts the trained model to a blob for the OAK camera and stores it in
+the model artifact cache, where the camera pipeline picks it up.
+
+Run from the repository root:
+
+    python -m AImodel.create_blob
+    python -m AImodel.create_blob --config path/to/best.json --shaves 8
+
+The blob is only converted again when the model files, best.json or the
+conversion parameters changed.
+"""
+import argparse
+
+from cameraAI.detection import config
+from cameraAI.detection.model_artifacts import ModelArtifactCache
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert the model to a blob for the OAK camera.")
+    parser.add_argument("--config", default=config.YOLOV8N_CONFIG, help="model config (default: %(default)s)")
+    parser.add_argument("--shaves", type=int, default=config.MODEL_SHAVES, help="SHAVE cores (default: %(default)s)")
+    parser.add_argument("--data-type", default=config.MODEL_DATA_TYPE, help="precision (default: %(default)s)")
+    parser.add_argument("--cache-dir", default=config.MODEL_CACHE_DIR, help="artifact cache (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    cache = ModelArtifactCache(args.cache_dir, data_type=args.data_type, shaves=args.shaves)
+    blob_path = cache.resolve(args.config)
+    print(f"Compatible blob saved at: {blob_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,546 @@
+"""
+Evaluates a model artifact on a labelled dataset split and checks that the
+inference backends agree with each other.
+
+Run from the repository root:
+
+    python -m AImodel.evaluate                                  # onnxruntime on the test split
+    python -m AImodel.evaluate --backend blob --workers 1       # the blob, on the OAK device
+    python -m AImodel.evaluate --parity openvino blob           # compare the backends with onnxruntime
+    python -m AImodel.evaluate --min-map50 0.6 --output eval.json
+
+The split is a YOLO export (``images/`` with one ``labels/<name>.txt`` per
+image holding "class cx cy w h" rows). Images are spread over a process pool
+with one backend per process, and the report holds the per-class precision
+and recall at the deployed confidence threshold, AP@0.5 and AP@0.5:0.95
+(101-point interpolation, like COCO) and the per-image latency percentiles
+of preprocessing, inference and decoding.
+
+Parity runs the first images of the split through every backend and compares
+the raw model outputs element-wise (boxes in input pixels and class scores
+have their own tolerance) and the decoded detections. The exit status is 1
+when a backend is out of tolerance or the mAP@0.5 is below ``--min-map50``,
+so a new blob can be gated before it reaches the fleet.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import json
+import time
+import sys
+import os
+
+import numpy as np
+import cv2
+
+from cameraAI.detection import backends
+from cameraAI.detection import config
+from cameraAI.detection import yolo_decode
+
+DEFAULT_SPLIT = os.path.dirname(os.path.dirname(config.TEST_DATA_PATTERN))
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+PERCENTILES = (50, 90, 99)
+STAGES = ("preprocess", "infer", "decode")
+
+
+def load_split(split_dir) -> list:
+    """
+    Lists the images of a split with their label files.
+
+    :param split_dir: Directory holding ``images/`` and ``labels/``.
+    :return: Sorted list of (image path, label path) tuples, the label file
+        may not exist for images without objects.
+    :rtype: list[tuple[str, str]]
+    """
+    split_dir = Path(split_dir)
+    images = sorted(path for path in (split_dir / "images").iterdir() if path.suffix.lower() in IMAGE_EXTENSIONS)
+    return [(str(path), str(split_dir / "labels" / (path.stem + ".txt"))) for path in images]
+
+
+def load_labels(label_path) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reads the ground truth of an image.
+
+    :param label_path: YOLO label file, rows of "class cx cy w h" in
+        normalized coordinates; polygon rows are reduced to their bounding box.
+    :return: Class ids (N,) and normalized (x1, y1, x2, y2) boxes (N, 4).
+    :rtype: tuple[numpy.ndarray, numpy.ndarray]
+    """
+    labels, boxes = [], []
+    if os.path.exists(label_path):
+        with open(label_path) as f:
+            for line in f:
+                values = line.split()
+                if len(values) < 5:
+                    continue
+                labels.append(int(values[0]))
+                coords = np.asarray(values[1:], dtype=np.float32)
+                if len(coords) == 4:
+                    boxes.append(yolo_decode.xywh_to_xyxy(coords))
+                else:
+                    points = coords[:len(coords) // 2 * 2].reshape(-1, 2)
+                    boxes.append(np.concatenate((points.min(axis=0), points.max(axis=0))))
+    return np.asarray(labels, dtype=np.int64), np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+
+
+def box_iou_matrix(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """
+    Computes the IoU of every pair of boxes.
+
+    :param boxes1: Boxes (N, 4) in (x1, y1, x2, y2) format.
+    :param boxes2: Boxes (M, 4) in (x1, y1, x2, y2) format.
+    :return: IoU matrix (N, M).
+    :rtype: numpy.ndarray
+    """
+    top_left = np.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+    bottom_right = np.minimum(boxes1[:, None, 2:], boxes2[None, :, 2:])
+    intersection = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    area1 = (boxes1[:, 2:] - boxes1[:, :2]).prod(axis=1)
+    area2 = (boxes2[:, 2:] - boxes2[:, :2]).prod(axis=1)
+    return intersection / np.maximum(area1[:, None] + area2[None, :] - intersection, 1e-9)
+
+
+def detection_boxes(detections: np.recarray) -> np.ndarray:
+    return np.stack((detections.xmin, detections.ymin, detections.xmax, detections.ymax), axis=1)
+
+
+def match_detections(detections: np.recarray, gt_labels: np.ndarray, gt_boxes: np.ndarray,
+                     iou_thresholds: np.ndarray = IOU_THRESHOLDS) -> np.ndarray:
+    """
+    Marks the true positives of an image at every IoU threshold.
+
+    Detections are matched in order of decreasing confidence to the unmatched
+    ground truth box of the same class with the highest IoU, like COCO.
+
+    :param detections: Detections of the image, sorted by decreasing confidence.
+    :param gt_labels: Ground truth class ids.
+    :param gt_boxes: Ground truth boxes, normalized (x1, y1, x2, y2).
+    :param iou_thresholds: IoU thresholds (T,).
+    :return: Boolean array (N, T), True where a detection is a true positive.
+    :rtype: numpy.ndarray
+    """
+    tp = np.zeros((len(detections), len(iou_thresholds)), dtype=bool)
+    if len(detections) == 0 or len(gt_labels) == 0:
+        return tp
+    iou = box_iou_matrix(detection_boxes(detections), gt_boxes)
+    iou[detections.label[:, None] != gt_labels[None, :]] = 0.0
+    for t, threshold in enumerate(iou_thresholds):
+        matched = np.zeros(len(gt_labels), dtype=bool)
+        for d in range(len(detections)):
+            candidates = np.where(matched, 0.0, iou[d])
+            best = candidates.argmax()
+            if candidates[best] >= threshold:
+                matched[best] = True
+                tp[d, t] = True
+    return tp
+
+
+def average_precision(tp: np.ndarray, confidences: np.ndarray, num_gt: int) -> np.ndarray:
+    """
+    Computes the average precision of one class at every IoU threshold.
+
+    :param tp: True positive flags (N, T) of all detections of the class.
+    :param confidences: Confidences (N,) of the detections.
+    :param num_gt: Number of ground truth objects of the class.
+    :return: AP per IoU threshold (T,), 101-point interpolated.
+    :rtype: numpy.ndarray
+    """
+    if num_gt == 0 or len(confidences) == 0:
+        return np.zeros(tp.shape[1])
+    order = np.argsort(-confidences, kind="stable")
+    true_positives = np.cumsum(tp[order], axis=0)
+    false_positives = np.cumsum(~tp[order], axis=0)
+    recall = true_positives / num_gt
+    precision = true_positives / (true_positives + false_positives)
+    # precision envelope: the best precision at this recall or higher
+    precision = np.flip(np.maximum.accumulate(np.flip(precision, axis=0), axis=0), axis=0)
+    points = np.linspace(0, 1, 101)
+    ap = np.zeros(tp.shape[1])
+    for t in range(tp.shape[1]):
+        index = np.searchsorted(recall[:, t], points, side="left")
+        ap[t] = np.where(index < len(precision), precision[np.minimum(index, len(precision) - 1), t], 0.0).mean()
+    return ap
+
+
+def summarize(results: list, num_classes: int, confidence_threshold: float) -> dict:
+    """
+    Computes the per-class and overall metrics of the evaluated images.
+
+    :param results: Per-image results of :func:`evaluate_image`.
+    :param num_classes: Number of classes of the model.
+    :param confidence_threshold: Deployed confidence threshold, at which the
+        precision and recall are reported.
+    :return: Dict with a "classes" list and the overall "map50", "map50_95",
+        "precision" and "recall" (means over the classes with objects).
+    :rtype: dict
+    """
+    labels = np.concatenate([result["labels"] for result in results])
+    confidences = np.concatenate([result["confidences"] for result in results])
+    tp = np.concatenate([result["tp"] for result in results]).reshape(-1, len(IOU_THRESHOLDS))
+    gt_labels = np.concatenate([result["gt_labels"] for result in results])
+
+    classes = []
+    for label in range(num_classes):
+        mask = labels == label
+        num_gt = int((gt_labels == label).sum())
+        ap = average_precision(tp[mask], confidences[mask], num_gt)
+        deployed = mask & (confidences >= confidence_threshold)
+        hits = int(tp[deployed, 0].sum())
+        classes.append({
+            "class": config.LABELS[label] if label < len(config.LABELS) else str(label),
+            "instances": num_gt,
+            "detections": int(deployed.sum()),
+            "precision": hits / int(deployed.sum()) if deployed.any() else 0.0,
+            "recall": hits / num_gt if num_gt else 0.0,
+            "ap50": float(ap[0]),
+            "ap50_95": float(ap.mean()),
+        })
+    present = [entry for entry in classes if entry["instances"]]
+    return {
+        "classes": classes,
+        "images": len(results),
+        "instances": int(len(gt_labels)),
+        "map50": float(np.mean([entry["ap50"] for entry in present])) if present else 0.0,
+        "map50_95": float(np.mean([entry["ap50_95"] for entry in present])) if present else 0.0,
+        "precision": float(np.mean([entry["precision"] for entry in present])) if present else 0.0,
+        "recall": float(np.mean([entry["recall"] for entry in present])) if present else 0.0,
+    }
+
+
+def latency_percentiles(results: list) -> dict:
+    """
+    Computes the latency percentiles of the evaluated images.
+
+    :param results: Per-image results of :func:`evaluate_image`.
+    :return: Stage -> {"p50": ms, "p90": ms, "p99": ms}, including "total".
+    :rtype: dict
+    """
+    latencies = np.array([result["latency"] for result in results]).reshape(-1, len(STAGES)) * 1000.0
+    columns = dict(zip(STAGES, latencies.T))
+    columns["total"] = latencies.sum(axis=1)
+    return {stage: {"p{}".format(p): float(np.percentile(values, p)) if len(values) else 0.0 for p in PERCENTILES}
+            for stage, values in columns.items()}
+
+
+def create_backend(name: str, config_path, model_path=None, threads: int | None = None,
+                   confidence: float | None = None) -> backends.InferenceBackend:
+    """
+    Creates a backend for evaluation.
+
+    :param name: Backend name, one of ``backends.BACKENDS``.
+    :param config_path: Model config (best.json).
+    :param model_path: Model artifact, the backend default when omitted.
+    :param threads: CPU threads of a host backend.
+    :param confidence: Confidence threshold of the decoder, the config value
+        when omitted; mAP needs a low threshold to see the whole PR curve.
+    :rtype: backends.InferenceBackend
+    """
+    options = {"num_threads": threads} if threads and name != backends.BlobBackend.name else {}
+    backend = backends.create_backend(name, config_path, model_path, **options)
+    if confidence is not None:
+        backend.confidence_threshold = confidence
+    return backend
+
+
+def evaluate_image(backend: backends.InferenceBackend, image_path: str, label_path: str) -> dict | None:
+    """
+    Runs one image through a backend and matches the detections.
+
+    :param backend: Backend created by :func:`create_backend`.
+    :param image_path: The image.
+    :param label_path: Its YOLO label file.
+    :return: Dict with the detection labels, confidences and true positive
+        flags, the ground truth labels and the (preprocess, infer, decode)
+        latency in seconds; None if the image cannot be read.
+    :rtype: dict | None
+    """
+    image = cv2.imread(image_path)
+    if image is None:
+        return None
+    start = time.perf_counter()
+    batch = backend.preprocess([image])
+    preprocessed = time.perf_counter()
+    output = backend.infer(batch)
+    inferred = time.perf_counter()
+    detections = yolo_decode.decode_yolov8(output, backend.input_size, backend.confidence_threshold,
+                                           backend.iou_threshold)
+    decoded = time.perf_counter()
+    gt_labels, gt_boxes = load_labels(label_path)
+    return {
+        "labels": np.asarray(detections.label),
+        "confidences": np.asarray(detections.confidence),
+        "tp": match_detections(detections, gt_labels, gt_boxes),
+        "gt_labels": gt_labels,
+        "latency": (preprocessed - start, inferred - preprocessed, decoded - inferred),
+    }
+
+
+# the backend of a pool process, created once by the initializer
+_worker_backend = None
+
+
+def _init_worker(name, config_path, model_path, threads, confidence):
+    global _worker_backend
+    _worker_backend = create_backend(name, config_path, model_path, threads, confidence)
+
+
+def _evaluate_chunk(samples):
+    return [evaluate_image(_worker_backend, image_path, label_path) for image_path, label_path in samples]
+
+
+def evaluate(samples: list, name: str, config_path, model_path=None, workers: int = 1,
+             confidence: float | None = 0.001, chunk_size: int = 8) -> tuple[list, float]:
+    """
+    Evaluates a backend on a list of images.
+
+    With more than one worker the images are spread in chunks over a process
+    pool; every process loads its own backend with an equal share of the CPU
+    threads, so the latencies are measured under full load.
+
+    :param samples: (image path, label path) tuples of :func:`load_split`.
+    :param name: Backend name.
+    :param config_path: Model config (best.json).
+    :param model_path: Model artifact, the backend default when omitted.
+    :param workers: Number of processes; the blob backend runs in one.
+    :param confidence: Confidence threshold of the decoder.
+    :param chunk_size: Images per task sent to a process.
+    :return: The per-image results and the wall time in seconds.
+    :rtype: tuple[list, float]
+    """
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    start = time.perf_counter()
+    if workers <= 1 or name == backends.BlobBackend.name:
+        backend = create_backend(name, config_path, model_path, threads, confidence)
+        try:
+            results = [evaluate_image(backend, image_path, label_path) for image_path, label_path in samples]
+        finally:
+            backend.close()
+    else:
+        chunks = [samples[i:i + chunk_size] for i in range(0, len(samples), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(name, config_path, model_path, threads, confidence)) as pool:
+            results = [result for chunk in pool.map(_evaluate_chunk, chunks) for result in chunk]
+    elapsed = time.perf_counter() - start
+    skipped = sum(result is None for result in results)
+    if skipped:
+        print("[WARN] could not read {} images".format(skipped))
+    return [result for result in results if result is not None], elapsed
+
+
+def model_metadata(config_path) -> dict:
+    """
+    Returns the ``NN_specific_metadata`` of a model config.
+
+    :param config_path: Model config (best.json).
+    :rtype: dict
+    """
+    with open(config_path) as f:
+        return json.load(f).get("nn_config", {}).get("NN_specific_metadata", {})
+
+
+def compare_outputs(reference: np.ndarray, output: np.ndarray, box_atol: float, score_atol: float,
+                    rtol: float) -> dict:
+    """
+    Compares two raw model outputs element-wise.
+
+    :param reference: Raw output (N, 4 + classes, anchors) of the reference.
+    :param output: Raw output of the compared backend.
+    :param box_atol: Absolute tolerance of the box channels, in input pixels.
+    :param score_atol: Absolute tolerance of the class scores.
+    :param rtol: Relative tolerance of both.
+    :return: Dict with the max and mean absolute difference of the boxes and
+        the scores and the fraction of elements out of tolerance.
+    :rtype: dict
+    """
+    difference = np.abs(output.astype(np.float32) - reference.astype(np.float32))
+    limit = rtol * np.abs(reference)
+    limit[:, :4] += box_atol
+    limit[:, 4:] += score_atol
+    return {
+        "box_max": float(difference[:, :4].max()),
+        "box_mean": float(difference[:, :4].mean()),
+        "score_max": float(difference[:, 4:].max()),
+        "score_mean": float(difference[:, 4:].mean()),
+        "outliers": float((difference > limit).mean()),
+    }
+
+
+def detection_agreement(reference: np.recarray, detections: np.recarray, iou_threshold: float) -> tuple[int, int]:
+    """
+    Counts the reference detections found again by another backend.
+
+    :param reference: Detections of the reference backend.
+    :param detections: Detections of the compared backend.
+    :param iou_threshold: Minimum IoU of a detection of the same class.
+    :return: (matched, total) reference detections.
+    :rtype: tuple[int, int]
+    """
+    if len(reference) == 0 or len(detections) == 0:
+        return 0, len(reference)
+    iou = box_iou_matrix(detection_boxes(reference), detection_boxes(detections))
+    iou[reference.label[:, None] != detections.label[None, :]] = 0.0
+    return int((iou.max(axis=1) >= iou_threshold).sum()), len(reference)
+
+
+def check_parity(samples: list, reference: str, others: list, config_path, model_path=None,
+                 box_atol: float = 1.0, score_atol: float = 0.02, rtol: float = 0.01, max_outliers: float = 0.001,
+                 iou_threshold: float = 0.9, min_agreement: float = 0.95) -> list:
+    """
+    Checks that backends produce the same outputs as a reference backend.
+
+    Every backend runs the same images with its own preprocessing, so the
+    comparison covers everything that differs between the deployments
+    (conversion, precision, input layout). The detections are decoded at the
+    deployed confidence threshold.
+
+    :param samples: (image path, label path) tuples, the images compared.
+    :param reference: Name of the reference backend.
+    :param others: Names of the compared backends.
+    :param config_path: Model config (best.json).
+    :param model_path: Model artifact of the reference backend.
+    :param box_atol: Absolute tolerance of the boxes, in input pixels.
+    :param score_atol: Absolute tolerance of the class scores.
+    :param rtol: Relative tolerance of the raw outputs.
+    :param max_outliers: Largest fraction of raw output elements allowed out
+        of tolerance.
+    :param iou_threshold: IoU at which two detections of a class agree.
+    :param min_agreement: Smallest fraction of the reference detections the
+        backend must find again.
+    :return: One dict per compared backend with the differences, the
+        detection agreement and "passed".
+    :rtype: list[dict]
+    """
+    images = [image for image in (cv2.imread(image_path) for image_path, _ in samples) if image is not None]
+
+    def run(name, path=None):
+        backend = create_backend(name, config_path, path)
+        try:
+            outputs = [backend.infer(backend.preprocess([image])) for image in images]
+            detections = [yolo_decode.decode_yolov8(output, backend.input_size, backend.confidence_threshold,
+                                                    backend.iou_threshold) for output in outputs]
+        finally:
+            backend.close()
+        return outputs, detections
+
+    reference_outputs, reference_detections = run(reference, model_path)
+    reports = []
+    for name in others:
+        outputs, detections = run(name)
+        if outputs[0].shape != reference_outputs[0].shape:
+            reports.append({"backend": name, "passed": False,
+                            "error": "output shape {} differs from {}".format(outputs[0].shape,
+                                                                              reference_outputs[0].shape)})
+            continue
+        differences = [compare_outputs(ref, out, box_atol, score_atol, rtol)
+                       for ref, out in zip(reference_outputs, outputs)]
+        counts = np.array([detection_agreement(ref, det, iou_threshold)
+                           for ref, det in zip(reference_detections, detections)]).reshape(-1, 2).sum(axis=0)
+        agreement = counts[0] / counts[1] if counts[1] else 1.0
+        report = {
+            "backend": name,
+            "images": len(images),
+            "box_max": max(d["box_max"] for d in differences),
+            "box_mean": float(np.mean([d["box_mean"] for d in differences])),
+            "score_max": max(d["score_max"] for d in differences),
+            "score_mean": float(np.mean([d["score_mean"] for d in differences])),
+            "outliers": float(np.mean([d["outliers"] for d in differences])),
+            "agreement": float(agreement),
+        }
+        report["passed"] = report["outliers"] <= max_outliers and agreement >= min_agreement
+        reports.append(report)
+    return reports
+
+
+def print_report(summary: dict, latency: dict, elapsed: float) -> None:
+    print("{:<22} {:>9} {:>9} {:>9} {:>9} {:>9}".format("class", "instances", "precision", "recall", "AP50",
+                                                         "AP50-95"))
+    for entry in summary["classes"]:
+        print("{:<22} {:>9} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f}".format(
+            entry["class"], entry["instances"], entry["precision"], entry["recall"], entry["ap50"],
+            entry["ap50_95"]))
+    print("{:<22} {:>9} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f}".format(
+        "all", summary["instances"], summary["precision"], summary["recall"], summary["map50"],
+        summary["map50_95"]))
+    print("\n{:<22} {:>9} {:>9} {:>9}".format("latency (ms)", *("p{}".format(p) for p in PERCENTILES)))
+    for stage, values in latency.items():
+        print("{:<22} {:>9.2f} {:>9.2f} {:>9.2f}".format(stage, *values.values()))
+    print("\n{} images in {:.1f}s, {:.1f} images/s".format(summary["images"], elapsed,
+                                                           summary["images"] / elapsed if elapsed else 0.0))
+
+
+def print_parity(reference: str, reports: list) -> None:
+    print("\n{:<12} {:>9} {:>9} {:>10} {:>10} {:>9} {:>9}  (reference: {})".format(
+        "parity", "box max", "box mean", "score max", "score mean", "outliers", "agree", reference))
+    for report in reports:
+        if "error" in report:
+            print("{:<12} FAILED: {}".format(report["backend"], report["error"]))
+            continue
+        print("{:<12} {:>9.3f} {:>9.4f} {:>10.4f} {:>10.5f} {:>9.2%} {:>9.2%}  {}".format(
+            report["backend"], report["box_max"], report["box_mean"], report["score_max"], report["score_mean"],
+            report["outliers"], report["agreement"], "ok" if report["passed"] else "FAILED"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate a model on a labelled split and check backend parity.")
+    parser.add_argument("--data", default=DEFAULT_SPLIT, help="split directory (default: %(default)s)")
+    parser.add_argument("--config", default=config.YOLOV8N_CONFIG, help="model config (default: %(default)s)")
+    parser.add_argument("--backend", default="onnxruntime", choices=list(backends.BACKENDS),
+                        help="backend to evaluate (default: %(default)s)")
+    parser.add_argument("--model", help="model artifact, the backend default when omitted")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes (default: one per CPU core)")
+    parser.add_argument("--confidence", type=float, default=0.001,
+                        help="confidence threshold for the mAP (default: %(default)s)")
+    parser.add_argument("--limit", type=int, default=0, help="only evaluate the first N images")
+    parser.add_argument("--parity", nargs="*", default=[], metavar="BACKEND",
+                        help="backends compared with --backend")
+    parser.add_argument("--parity-images", type=int, default=20, help="images compared (default: %(default)s)")
+    parser.add_argument("--box-atol", type=float, default=1.0,
+                        help="box tolerance in input pixels (default: %(default)s)")
+    parser.add_argument("--score-atol", type=float, default=0.02,
+                        help="class score tolerance (default: %(default)s)")
+    parser.add_argument("--rtol", type=float, default=0.01, help="relative tolerance (default: %(default)s)")
+    parser.add_argument("--max-outliers", type=float, default=0.001,
+                        help="fraction of output elements allowed out of tolerance (default: %(default)s)")
+    parser.add_argument("--min-agreement", type=float, default=0.95,
+                        help="fraction of detections another backend must find again (default: %(default)s)")
+    parser.add_argument("--min-map50", type=float, default=0.0, help="fail below this mAP@0.5")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    samples = load_split(args.data)
+    if args.limit:
+        samples = samples[:args.limit]
+    print("[INFO] evaluating {} on {} images of {} with {} workers...".format(args.backend, len(samples), args.data,
+                                                                             args.workers))
+    results, elapsed = evaluate(samples, args.backend, args.config, args.model, args.workers, args.confidence)
+    metadata = model_metadata(args.config)
+    summary = summarize(results, metadata.get("classes", len(config.LABELS)),
+                        metadata.get("confidence_threshold", 0.5))
+    latency = latency_percentiles(results)
+    print_report(summary, latency, elapsed)
+
+    parity = []
+    if args.parity:
+        parity = check_parity(samples[:args.parity_images], args.backend, args.parity, args.config, args.model,
+                              box_atol=args.box_atol, score_atol=args.score_atol, rtol=args.rtol,
+                              max_outliers=args.max_outliers, min_agreement=args.min_agreement)
+        print_parity(args.backend, parity)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"backend": args.backend, "model": args.model, "data": args.data, "workers": args.workers,
+                       "seconds": elapsed, "metrics": summary, "latency_ms": latency, "parity": parity}, f,
+                      indent=2)
+
+    failed = [report["backend"] for report in parity if not report["passed"]]
+    if failed:
+        print("\nparity failed for: {}".format(", ".join(failed)))
+    if summary["map50"] < args.min_map50:
+        print("\nmAP@0.5 {:.3f} is below {:.3f}".format(summary["map50"], args.min_map50))
+    return 1 if failed or summary["map50"] < args.min_map50 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Benchmarks of the host code that runs for every frame or every upload.
+
+The fixtures are synthetic and seeded: a 416x416 preview frame, ten
+detections shaped like ``depthai.ImgDetection``, a 1080p camera image, a
+short drive through Amsterdam and detection records as the uploader builds
+them. Uploads go to a keep-alive HTTP stub on localhost, so they measure the
+client side (serialization, compression, connection reuse) without network
+noise.
+
+Run them with ``python -m benchmarks.run``.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import threading
+import tempfile
+import json
+import os
+
+import numpy as np
+
+from benchmarks.harness import benchmark
+
+SEED = 1234
+# a drive of roughly 2 km through Amsterdam, one point every ~20 m
+ROUTE = [(52.3676 + i * 0.00018, 4.9041 + i * 0.00012) for i in range(100)]
+
+
+def _isolate_environment():
+    # keep the benchmark away from real secrets, devices and state files;
+    # only used for names that are not set already
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ.setdefault("GEOCODE_CACHE_PATH", "")
+    os.environ.setdefault("OUTBOX_PATH", os.path.join(tempfile.mkdtemp(prefix="cameraai-bench-"), "outbox.sqlite3"))
+
+
+def synthetic_frame():
+    rng = np.random.default_rng(SEED)
+    return rng.integers(0, 256, (416, 416, 3), dtype=np.uint8)
+
+
+def synthetic_detections(count=10):
+    rng = np.random.default_rng(SEED)
+    detections = []
+    for _ in range(count):
+        x, y = rng.uniform(0, 0.8, 2)
+        w, h = rng.uniform(0.05, 0.2, 2)
+        detections.append(SimpleNamespace(label=int(rng.integers(0, 17)), confidence=float(rng.uniform(0.5, 1)),
+                                          xmin=x, ymin=y, xmax=x + w, ymax=y + h))
+    return detections
+
+
+def synthetic_records(count=20):
+    from cameraAI.dto.DetectionRecordDto import DetectionRecordDto
+    time = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+    return [DetectionRecordDto("PET", ROUTE[i % len(ROUTE)], "Damrak 1, 1012 LG Amsterdam, Nederland", time,
+                               idempotency_key="{:032x}".format(i))
+            for i in range(count)]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so the client keeps the connection alive between requests
+    protocol_version = "HTTP/1.1"
+    # send headers and body in one segment, otherwise Nagle's algorithm and
+    # delayed ACKs add ~40 ms to every response and hide the client cost
+    wbufsize = -1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"ok":true}'
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_stub = None
+
+
+def stub_server_url():
+    """
+    Starts the local API stub once and returns its base URL.
+    """
+    global _stub
+    if _stub is None:
+        _stub = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        _stub.daemon_threads = True
+        threading.Thread(target=_stub.serve_forever, daemon=True).start()
+    return "http://127.0.0.1:{}".format(_stub.server_address[1])
+
+
+@benchmark("utils.frameNorm")
+def bench_frame_norm():
+    from cameraAI.detection import utils
+    frame = synthetic_frame()
+    detection = synthetic_detections(1)[0]
+    bbox = (detection.xmin, detection.ymin, detection.xmax, detection.ymax)
+    return lambda: utils.frameNorm(frame, bbox)
+
+
+@benchmark("utils.annotateFrame[10 detections]")
+def bench_annotate_frame():
+    from cameraAI.detection import utils
+    frame = synthetic_frame()
+    detections = synthetic_detections(10)
+    return lambda: utils.annotateFrame(frame, detections, "video")
+
+
+@benchmark("utils.frameNormBatch[20 detections]")
+def bench_frame_norm_batch():
+    from cameraAI.detection import utils
+    frame = synthetic_frame()
+    detections = synthetic_detections(20)
+    return lambda: utils.frameNormBatch(frame, utils.detectionBoxes(detections))
+
+
+@benchmark("utils.annotateFrame[20 detections]")
+def bench_annotate_frame_cluttered():
+    from cameraAI.detection import utils
+    frame = synthetic_frame()
+    detections = synthetic_detections(20)
+    return lambda: utils.annotateFrame(frame, detections, "video")
+
+
+@benchmark("utils.to_planar[1080p->416]")
+def bench_to_planar():
+    from cameraAI.detection import utils
+    image = np.random.default_rng(SEED).integers(0, 256, (1080, 1920, 3), dtype=np.uint8)
+    return lambda: utils.to_planar(image, (416, 416))
+
+
+@benchmark("gps_manager.get_distance_between")
+def bench_distance():
+    _isolate_environment()
+    from cameraAI.hardware import gps_manager
+    a, b = ROUTE[0], ROUTE[-1]
+    return lambda: gps_manager.get_distance_between(a, b)
+
+
+@benchmark("gps_manager.get_local_time[route]")
+def bench_local_time():
+    _isolate_environment()
+    from cameraAI.hardware import gps_manager
+    # warm up: the first lookup loads the timezone data
+    gps_manager.get_local_time(ROUTE[0])
+    return lambda: [gps_manager.get_local_time(coord) for coord in ROUTE]
+
+
+@benchmark("DetectionRecordDto.to_dict")
+def bench_to_dict():
+    record = synthetic_records(1)[0]
+    return record.to_dict
+
+
+@benchmark("DetectionRecordDto.to_dict+json[batch of 20]")
+def bench_batch_json():
+    records = synthetic_records(20)
+    return lambda: json.dumps([record.to_dict() for record in records], separators=(",", ":")).encode("utf-8")
+
+
+def _uploader():
+    _isolate_environment()
+    from cameraAI.sender import send_to_api
+    return send_to_api
+
+
+@benchmark("upload[1 record, keep-alive]")
+def bench_upload_single():
+    send_to_api = _uploader()
+    url = stub_server_url() + "/litters"
+    data = synthetic_records(1)[0].to_dict()
+    return lambda: send_to_api._post_json(url, data, compress=False)
+
+
+@benchmark("upload[batch of 20, keep-alive]")
+def bench_upload_batch():
+    send_to_api = _uploader()
+    url = stub_server_url() + "/litters/batch"
+    data = [record.to_dict() for record in synthetic_records(20)]
+    return lambda: send_to_api._post_json(url, data, compress=False)
+
+
+@benchmark("upload[batch of 20, gzip]")
+def bench_upload_batch_gzip():
+    send_to_api = _uploader()
+    url = stub_server_url() + "/litters/batch"
+    data = [record.to_dict() for record in synthetic_records(20)]
+    return lambda: send_to_api._post_json(url, data, compress=True)
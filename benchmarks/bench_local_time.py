@@ -0,0 +1,56 @@
+"""
+Per-call cost of resolving the local time at a coordinate.
+
+Compares the previous ``get_local_time`` implementation, which built a new
+TimezoneFinder on every call, with the shared, cell-cached resolver that
+``gps_manager.get_local_time`` uses now. The coordinates follow a short drive
+so most calls land in an already resolved cell, like on a vehicle.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_local_time
+"""
+from datetime import datetime
+import timeit
+import zoneinfo
+
+import timezonefinder
+
+from cameraAI.hardware.timezone_resolver import TimezoneResolver
+
+# a drive of roughly 2 km through Amsterdam, one point every ~20 m
+ROUTE = [(52.3676 + i * 0.00018, 4.9041 + i * 0.00012) for i in range(100)]
+
+
+def local_time_before(coord):
+    tzf = timezonefinder.TimezoneFinder()
+    tz_name = tzf.timezone_at(lat=coord[0], lng=coord[1])
+    return datetime.now(zoneinfo.ZoneInfo(tz_name))
+
+
+def local_time_after(resolver, coord):
+    return datetime.now(resolver.timezone(coord[0], coord[1]))
+
+
+def per_call(function, repeat):
+    # best of `repeat` runs over the route, divided by the number of calls
+    seconds = min(timeit.repeat(lambda: [function(coord) for coord in ROUTE], number=1, repeat=repeat))
+    return seconds / len(ROUTE)
+
+
+def main():
+    before = per_call(local_time_before, repeat=3)
+
+    # cold: a new resolver, so the first call pays for loading the data
+    resolver = TimezoneResolver()
+    cold = timeit.timeit(lambda: local_time_after(resolver, ROUTE[0]), number=1)
+    after = per_call(lambda coord: local_time_after(resolver, coord), repeat=50)
+
+    print(f"before (new TimezoneFinder per call): {before * 1e6:10.1f} us/call")
+    print(f"after, first call (loads data):       {cold * 1e6:10.1f} us")
+    print(f"after, steady state:                  {after * 1e6:10.1f} us/call")
+    print(f"speed-up:                             {before / after:10.0f}x")
+
+
+if __name__ == "__main__":
+    main()
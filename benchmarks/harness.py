@@ -0,0 +1,123 @@
+"""
+Minimal benchmark harness: registration, timing, baselines and comparison.
+
+Benchmarks are registered with :func:`benchmark` and timed like
+pytest-benchmark does: the number of calls per round is calibrated so a
+round takes at least ``min_time``, then several rounds are run and the
+per-call statistics are kept. Results can be stored as a baseline and later
+runs compared against it with a relative regression threshold.
+"""
+from statistics import median, stdev
+import platform
+import json
+import time
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Registers a benchmark.
+
+    The decorated function is called once as setup and returns the callable
+    that is timed, so fixtures are built outside of the measurement.
+
+    :param name: Unique name of the benchmark.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def measure(function, min_time=0.05, rounds=7):
+    """
+    Times a callable.
+
+    :param function: Callable without arguments.
+    :param min_time: Minimum duration of one round in seconds.
+    :param rounds: Number of timed rounds.
+    :return: Per-call statistics in seconds (min, median, mean, stdev) and
+        the number of calls per round.
+    :rtype: dict
+    """
+    # calibrate the calls per round, like timeit.Timer.autorange
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    return {
+        "min": min(times),
+        "median": median(times),
+        "mean": sum(times) / len(times),
+        "stdev": stdev(times) if len(times) > 1 else 0.0,
+        "calls": number,
+    }
+
+
+def machine_info():
+    """
+    Describes the machine the results were measured on, baselines are only
+    comparable on the same kind of machine.
+
+    :rtype: dict
+    """
+    return {
+        "node": platform.node(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "python": platform.python_version(),
+    }
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    with open(path, "w") as f:
+        json.dump({"machine": machine_info(), "results": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares results with a baseline on the median per-call time.
+
+    :param results: Results of this run, by benchmark name.
+    :param baseline: Stored baseline as written by :func:`save_baseline`.
+    :param threshold: Allowed relative slow-down, e.g. 0.1 for 10%.
+    :return: (name, baseline median, median, relative change) of every
+        benchmark in both, and the names that regressed.
+    :rtype: tuple[list, list]
+    """
+    rows = []
+    regressions = []
+    for name, result in results.items():
+        stored = baseline["results"].get(name)
+        if stored is None:
+            continue
+        change = result["median"] / stored["median"] - 1
+        rows.append((name, stored["median"], result["median"], change))
+        if change > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return "{:8.2f} {}".format(seconds / scale, unit)
+    return "{:8.1f} ns".format(seconds / 1e-9)
@@ -0,0 +1,73 @@
+"""
+Runs the micro-benchmarks and compares them with a stored baseline.
+
+Run from the repository root:
+
+    python -m benchmarks.run                  # run and compare with the baseline
+    python -m benchmarks.run --save           # run and store the baseline
+    python -m benchmarks.run -k upload        # only benchmarks matching "upload"
+    python -m benchmarks.run --threshold 0.2  # allow 20% slow-down
+
+The baseline is stored per machine; record it on the reference box (e.g.
+one of the in-vehicle units) with ``--save`` and commit it. The exit status
+is 1 when a benchmark is slower than the baseline by more than the
+threshold, so the run can gate a change in CI.
+"""
+import argparse
+import os
+import sys
+
+from benchmarks import harness
+from benchmarks import bench_hot_paths  # noqa: F401 (registers the benchmarks)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the CameraAI micro-benchmarks.")
+    parser.add_argument("-k", dest="pattern", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file (default: %(default)s)")
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slow-down of the median that counts as a regression (default: %(default)s)")
+    parser.add_argument("--min-time", type=float, default=0.05, help="minimum seconds per round")
+    parser.add_argument("--rounds", type=int, default=7, help="timed rounds per benchmark")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print("{:<48} {:>11} {:>11} {:>11}".format("benchmark", "min", "median", "stdev"))
+    for name, setup in harness.BENCHMARKS.items():
+        if args.pattern not in name:
+            continue
+        result = harness.measure(setup(), min_time=args.min_time, rounds=args.rounds)
+        results[name] = result
+        print("{:<48} {} {} {}".format(name, harness.format_time(result["min"]),
+                                       harness.format_time(result["median"]), harness.format_time(result["stdev"])))
+
+    if args.save:
+        harness.save_baseline(args.baseline, results)
+        print("\nbaseline saved to {}".format(args.baseline))
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("\nno baseline at {}, store one with --save".format(args.baseline))
+        return 0
+
+    baseline = harness.load_baseline(args.baseline)
+    if baseline["machine"] != harness.machine_info():
+        print("\nwarning: the baseline was measured on a different machine: {}".format(baseline["machine"]))
+    rows, regressions = harness.compare(results, baseline, args.threshold)
+    print("\n{:<48} {:>11} {:>11} {:>8}".format("compared with baseline", "baseline", "now", "change"))
+    for name, before, after, change in rows:
+        flag = "  REGRESSION" if name in regressions else ""
+        print("{:<48} {} {} {:+7.1%}{}".format(name, harness.format_time(before), harness.format_time(after),
+                                                change, flag))
+    if regressions:
+        print("\n{} benchmark(s) slower than the baseline by more than {:.0%}".format(len(regressions),
+                                                                                      args.threshold))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
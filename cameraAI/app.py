@@ -1,8 +1,42 @@
-from cameraAI.hardware import gps_manager
-from cameraAI.hardware import camera_manager
+import time
+# the startup report measures from here, before the imports
+_process_start = time.perf_counter()
 
-# Start the GPS manager.
-gps_manager.main()
+from cameraAI.application import Application, StartupReport
+from cameraAI.detection import config
+import argparse
 
-# Start the camera manager.
-camera_manager.main()
\ No newline at end of file
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Detect litter with the OAK camera and report it to the API.")
+    parser.add_argument("--record", metavar="PATH", help="record frames, detections and GPS fixes to a session file")
+    parser.add_argument("--replay", metavar="PATH", nargs="+",
+                        help="replay recorded sessions instead of using the cameras, one camera per session")
+    parser.add_argument("--cameras", default=config.CAMERAS, metavar="SPEC",
+                        help='OAK cameras to run: "all" or "left=MXID,right=MXID" (default: the first one found)')
+    parser.add_argument("--max-speed", action="store_true", help="replay as fast as possible instead of in real time")
+    parser.add_argument("--headless", action="store_true", default=config.HEADLESS,
+                        help="run without the preview window")
+    parser.add_argument("--no-video", dest="record_video", action="store_false", default=config.RECORD_VIDEO,
+                        help="do not write the output video file")
+    parser.add_argument("--raw-video", dest="annotate_video", action="store_false", default=config.ANNOTATE_VIDEO,
+                        help="record the camera video without annotations, encoded on the OAK device when possible")
+    parser.add_argument("--metrics-port", type=int, default=config.METRICS_PORT, metavar="PORT",
+                        help="serve metrics on http://127.0.0.1:PORT/metrics, 0 disables")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    application = Application(record_path=args.record, replay_paths=args.replay, realtime=not args.max_speed,
+                              display=not args.headless, record_video=args.record_video,
+                              annotate_video=args.annotate_video, metrics_port=args.metrics_port,
+                              startup=StartupReport(_process_start), cameras=args.cameras)
+    # Start the GPS reader, upload worker and metrics, then run the camera
+    # until it stops; the services are stopped again on the way out.
+    with application:
+        application.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import threading
+import time
+import os
+
+from cameraAI import metrics
+
+
+class StartupReport:
+    """
+    Records when the phases of the startup completed.
+
+    Times are measured from ``start``, the moment the process began
+    importing the application, and exported as the
+    ``cameraai_startup_seconds`` metric.
+
+    :ivar start: ``time.perf_counter()`` at process start.
+    :ivar phases: List of (phase, seconds since start).
+    :ivar done: True once the report was printed.
+    """
+    def __init__(self, start: float | None = None) -> None:
+        self.start = time.perf_counter() if start is None else start
+        self.phases = []
+        self.done = False
+        self._lock = threading.Lock()
+
+    def mark(self, phase: str) -> float:
+        """
+        Marks a phase as completed now.
+
+        :param phase: Name of the phase.
+        :return: Seconds since the start.
+        :rtype: float
+        """
+        elapsed = time.perf_counter() - self.start
+        with self._lock:
+            self.phases.append((phase, elapsed))
+        metrics.STARTUP_SECONDS.labels(phase).set(elapsed)
+        return elapsed
+
+    def finish(self) -> None:
+        """
+        Prints the report.
+
+        :return: None
+        """
+        self.done = True
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+        print("[INFO] startup time:")
+        for phase, elapsed in phases:
+            print("[INFO]   {:<24} {:7.3f}s".format(phase, elapsed))
+
+
+def preload() -> None:
+    """
+    Imports and initializes what is only needed after the first detection.
+
+    Runs on a background thread while the camera boots, so the HTTP stack,
+    the timezone data and the assignment solver of the tracker are ready
+    without delaying the first frame.
+
+    :return: None
+    """
+    import requests  # noqa: F401
+    from cameraAI.detection import tracker
+    from cameraAI.hardware.timezone_resolver import timezone_resolver
+    tracker._linear_sum_assignment()
+    timezone_resolver.preload()
+
+
+class Application:
+    """
+    Lifecycle of the detection application: GPS reader, upload worker,
+    metrics endpoint and the camera loops, one per camera.
+
+    Nothing is started by importing the modules; :meth:`start` starts the
+    background services, :meth:`run` runs the camera loop until it ends and
+    :meth:`stop` stops the services again. The application is also a context
+    manager that starts and stops it.
+
+    :ivar startup: The startup report.
+    """
+    def __init__(self, record_path=None, replay_paths=None, realtime=True, display=True, record_video=True,
+                 annotate_video=True, metrics_port=0, startup: StartupReport | None = None, cameras: str = "") -> None:
+        self.record_path = record_path
+        self.replay_paths = replay_paths or []
+        self.cameras = cameras
+        self.realtime = realtime
+        self.display = display
+        self.record_video = record_video
+        self.annotate_video = annotate_video
+        self.metrics_port = metrics_port
+        self.startup = startup or StartupReport()
+        self._metrics_server = None
+        self._started = False
+
+    def start(self) -> None:
+        """
+        Starts the metrics endpoint, the GPS reader (not for replays, which
+        bring their own fixes) and the upload worker.
+
+        :return: None
+        """
+        from cameraAI.hardware import gps_manager
+        from cameraAI.sender import send_to_api
+        if self._started:
+            return
+        self._started = True
+        self.startup.mark("imports")
+        if self.metrics_port:
+            self._metrics_server = metrics.start_http_server(self.metrics_port)
+            print("[INFO] serving metrics on http://127.0.0.1:{}/metrics".format(self.metrics_port))
+        if not os.getenv("GOOGLE_API_KEY"):
+            print("[INFO] GOOGLE_API_KEY is not set, addresses cannot be looked up")
+        if not self.replay_paths:
+            gps_manager.start()
+        send_to_api.start()
+        threading.Thread(target=preload, daemon=True).start()
+        self.startup.mark("services started")
+
+    def run(self) -> None:
+        """
+        Runs the camera loops until they end.
+
+        :return: None
+        """
+        from cameraAI.hardware import camera_manager
+        self.start()
+        cameras = camera_manager.find_cameras(self.replay_paths, self.cameras)
+        camera_manager.run_cameras(cameras, record_path=self.record_path, realtime=self.realtime,
+                                   display=self.display, record_video=self.record_video,
+                                   annotate_video=self.annotate_video, startup=self.startup)
+
+    def stop(self) -> None:
+        """
+        Stops the upload worker, the GPS reader and the metrics endpoint.
+
+        :return: None
+        """
+        from cameraAI.hardware import gps_manager
+        from cameraAI.sender import send_to_api
+        if not self._started:
+            return
+        self._started = False
+        send_to_api.stop()
+        gps_manager.stop()
+        if self._metrics_server is not None:
+            self._metrics_server.shutdown()
+            self._metrics_server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,269 @@
+# import the necessary packages
+from cameraAI.detection import config
+from cameraAI.detection import utils
+from cameraAI.detection import yolo_decode
+from cameraAI.detection import model_artifacts
+from pathlib import Path
+import numpy as np
+import cv2
+import os
+
+
+class InferenceBackend:
+    """
+    Base class for inference backends that run the YOLOv8 model on the host.
+
+    A backend loads the model thresholds and input size from the model config
+    (``best.json``), converts BGR frames into the model input tensor, runs the
+    model and decodes the raw ``(N, 4 + classes, anchors)`` output into
+    detections. Subclasses only have to implement :meth:`infer`.
+
+    :ivar num_classes: Number of classes the model predicts.
+    :ivar iou_threshold: IoU threshold used for non-maximum suppression.
+    :ivar confidence_threshold: Minimum class score for a detection to be kept.
+    :ivar input_size: Model input size as a (width, height) tuple.
+    """
+    name = "base"
+
+    def __init__(self, config_path, model_path) -> None:
+        # load model config file and fetch the same nn_config parameters
+        # that are used to configure the device YoloDetectionNetwork
+        model_config = utils.load_config(Path(config_path))
+        nnConfig = model_config.get("nn_config", {})
+        metadata = nnConfig.get("NN_specific_metadata", {})
+        self.num_classes = metadata.get("classes", len(config.LABELS))
+        self.iou_threshold = metadata.get("iou_threshold", 0.5)
+        self.confidence_threshold = metadata.get("confidence_threshold", 0.5)
+        self.input_size = parse_input_size(nnConfig.get("input_size"), config.CAMERA_PREV_DIM)
+        self.model_path = str(model_path)
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Runs the model on a preprocessed batch and returns the raw output.
+
+        :param batch: Float32 tensor of shape (N, 3, height, width).
+        :type batch: numpy.ndarray
+        :return: Raw model output of shape (N, 4 + classes, anchors).
+        :rtype: numpy.ndarray
+        """
+        raise NotImplementedError
+
+    def preprocess(self, images) -> np.ndarray:
+        """
+        Converts a list of BGR images into the model input tensor.
+
+        Every image is resized to the model input size, converted to RGB,
+        scaled to the <0..1> range and transposed to planar (CHW) layout, the
+        same preprocessing the model was exported with.
+
+        :param images: BGR images as returned by OpenCV.
+        :type images: list[numpy.ndarray]
+        :return: Float32 tensor of shape (N, 3, height, width).
+        :rtype: numpy.ndarray
+        """
+        resized = np.stack([cv2.resize(image, self.input_size) for image in images])
+        # BGR -> RGB, NHWC -> NCHW and scale to <0..1> in one pass
+        batch = resized[..., ::-1].transpose(0, 3, 1, 2).astype(np.float32)
+        batch *= 1.0 / 255.0
+        return batch
+
+    def detect(self, images) -> list:
+        """
+        Runs detection on a list of BGR images.
+
+        :param images: BGR images as returned by OpenCV.
+        :type images: list[numpy.ndarray]
+        :return: One detection array (``yolo_decode.DETECTION_DTYPE``) per
+            input image, with bounding boxes normalized to the <0..1> range.
+        :rtype: list[numpy.recarray]
+        """
+        if len(images) == 0:
+            return []
+        output = self.infer(self.preprocess(images))
+        detections = yolo_decode.decode_yolov8(output, self.input_size, self.confidence_threshold,
+                                               self.iou_threshold)
+        return yolo_decode.split_by_image(detections, len(images))
+
+    def close(self) -> None:
+        """
+        Releases the resources of the backend.
+
+        :return: None
+        """
+        pass
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """
+    Runs the exported ``best.onnx`` model with ONNX Runtime on the CPU.
+
+    The session uses all available cores for a single inference. Models that
+    were exported with a fixed batch size of 1 are run image by image.
+    """
+    name = "onnxruntime"
+
+    def __init__(self, config_path, model_path, num_threads: int | None = None) -> None:
+        super().__init__(config_path, model_path)
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The onnxruntime backend requires the 'onnxruntime' package.") from e
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads or os.cpu_count() or 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.model_path, sess_options=options,
+                                            providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # the input shape of the model takes precedence over the config
+        # file, an exported model only accepts the size it was exported with
+        shape = model_input.shape
+        if isinstance(shape[2], int) and isinstance(shape[3], int):
+            self.input_size = (shape[3], shape[2])
+        self.fixed_batch = shape[0] if isinstance(shape[0], int) else None
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        if self.fixed_batch == 1 and len(batch) > 1:
+            return np.concatenate([self.session.run(None, {self.input_name: batch[i:i + 1]})[0]
+                                   for i in range(len(batch))])
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVinoBackend(InferenceBackend):
+    """
+    Runs the OpenVINO IR model (``best.xml``/``best.bin``) on the CPU.
+
+    The model is compiled with the throughput performance hint and batches are
+    spread over an asynchronous request queue, so a batch of images keeps all
+    CPU cores busy.
+    """
+    name = "openvino"
+
+    def __init__(self, config_path, model_path, num_threads: int | None = None) -> None:
+        super().__init__(config_path, model_path)
+        try:
+            from openvino.runtime import Core, AsyncInferQueue
+        except ImportError as e:
+            raise ImportError("The openvino backend requires the 'openvino' package.") from e
+
+        core = Core()
+        model = core.read_model(model=self.model_path)
+        shape = model.input(0).get_partial_shape()
+        if shape[2].is_static and shape[3].is_static:
+            self.input_size = (shape[3].get_length(), shape[2].get_length())
+        properties = {"PERFORMANCE_HINT": "THROUGHPUT"}
+        if num_threads:
+            properties["INFERENCE_NUM_THREADS"] = num_threads
+        self.compiled_model = core.compile_model(model, "CPU", properties)
+        self.infer_queue = AsyncInferQueue(self.compiled_model)
+        self.infer_queue.set_callback(self._on_result)
+        self._results = {}
+
+    def _on_result(self, request, index):
+        self._results[index] = request.get_output_tensor(0).data.copy()
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        self._results = {}
+        # queue every image of the batch as its own request and wait for all
+        for i in range(len(batch)):
+            self.infer_queue.start_async({0: batch[i:i + 1]}, userdata=i)
+        self.infer_queue.wait_all()
+        return np.concatenate([self._results[i] for i in range(len(batch))])
+
+
+class BlobBackend(InferenceBackend):
+    """
+    Runs the compiled blob on the OAK device with a plain ``NeuralNetwork``
+    node and decodes the raw output on the host.
+
+    Unlike the ``YoloDetectionNetwork`` of the camera pipeline this returns
+    the same raw output as the host backends, so the blob can be evaluated
+    and compared with them. The images are sent as planar BGR bytes, exactly
+    like the image pipeline does. The device runs one image at a time.
+    """
+    name = "blob"
+
+    def __init__(self, config_path, model_path=None) -> None:
+        if model_path is None:
+            model_path = model_artifacts.resolve_blob(config_path)
+        super().__init__(config_path, model_path)
+        import depthai as dai
+        self._dai = dai
+        pipeline = dai.Pipeline()
+        nnIn = pipeline.create(dai.node.XLinkIn)
+        nnIn.setStreamName("nn_in")
+        network = pipeline.create(dai.node.NeuralNetwork)
+        network.setBlobPath(self.model_path)
+        network.input.setBlocking(True)
+        nnOut = pipeline.create(dai.node.XLinkOut)
+        nnOut.setStreamName("nn")
+        nnIn.out.link(network.input)
+        network.out.link(nnOut.input)
+        self.device = dai.Device(pipeline)
+        self.input_queue = self.device.getInputQueue("nn_in", maxSize=1, blocking=True)
+        self.output_queue = self.device.getOutputQueue("nn", maxSize=1, blocking=True)
+
+    def preprocess(self, images) -> np.ndarray:
+        return np.stack([utils.to_planar(image, self.input_size) for image in images])
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        outputs = []
+        for planar in batch:
+            nn_data = self._dai.NNData()
+            nn_data.setLayer("input", planar.flatten())
+            self.input_queue.send(nn_data)
+            outputs.append(yolo_decode.nn_data_to_output(self.output_queue.get(), self.num_classes))
+        return np.concatenate(outputs)
+
+    def close(self) -> None:
+        self.device.close()
+
+
+# backend name -> (backend class, default model path)
+BACKENDS = {
+    OnnxRuntimeBackend.name: (OnnxRuntimeBackend, config.YOLOV8N_ONNX),
+    OpenVinoBackend.name: (OpenVinoBackend, config.YOLOV8N_XML),
+    # the blob is resolved from the model config
+    BlobBackend.name: (BlobBackend, None),
+}
+
+
+def create_backend(name: str, config_path=config.YOLOV8N_CONFIG, model_path=None, **options) -> InferenceBackend:
+    """
+    Creates a host-side inference backend by name.
+
+    :param name: Name of the backend, one of the keys of ``BACKENDS``.
+    :type name: str
+    :param config_path: Path to the model config (``best.json``) holding the
+        thresholds and input size.
+    :param model_path: Path to the model artifact. Defaults to the artifact
+        configured for the backend in ``config``.
+    :param options: Passed to the backend class, e.g. ``num_threads`` for the
+        CPU backends.
+    :return: The initialized backend.
+    :rtype: InferenceBackend
+    :raises ValueError: If the backend name is unknown.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', choose from {', '.join(BACKENDS)}")
+    backend_class, default_model = BACKENDS[name]
+    print(f"[INFO] loading {name} inference backend...")
+    return backend_class(config_path, model_path or default_model, **options)
+
+
+def parse_input_size(input_size, default: tuple) -> tuple:
+    """
+    Parses the ``input_size`` entry of the model config.
+
+    :param input_size: Input size as a "WIDTHxHEIGHT" string, or None.
+    :param default: Size returned when the entry is missing.
+    :type default: tuple
+    :return: The input size as a (width, height) tuple.
+    :rtype: tuple
+    """
+    if not input_size:
+        return tuple(default)
+    width, height = str(input_size).lower().split("x")
+    return int(width), int(height)
+
@@ -11,20 +11,119 @@ YOLOV8N_CONFIG = os.path.join(
     "AImodel", "datasets", "solidwaste_project","yolov8n_v1_results", "weights","best.json"
     #"..","..","AImodel", "datasets", "solidwaste_project","yolov8n_v1_results", "weights","best.json"
 )
+# the same model exported for host-side inference, used by the
+# onnxruntime and openvino backends instead of the device blob
+YOLOV8N_ONNX = os.path.join(
+    "AImodel", "datasets", "solidwaste_project","yolov8n_v1_results", "weights","best.onnx"
+)
+YOLOV8N_XML = os.path.join(
+    "AImodel", "datasets", "solidwaste_project","yolov8n_v1_results", "weights","best.xml"
+)
+# the device blob is resolved from YOLOV8N_CONFIG when the pipeline is
+# built: converted once per model, config and conversion parameters and
+# cached in MODEL_CACHE_DIR; YOLOV8N_MODEL is only used when no model
+# files are found next to the config or the conversion is not possible
+MODEL_CACHE_DIR = os.getenv("CAMERAAI_MODEL_CACHE",
+                            os.path.join(os.path.expanduser("~"), ".cache", "cameraai", "blobs"))
+MODEL_DATA_TYPE = "FP16"
+MODEL_SHAVES = int(os.getenv("CAMERAAI_MODEL_SHAVES", "6"))
+MODEL_OPENVINO_VERSION = "2022.1"
+# select where inference runs: "depthai" on the OAK device, or
+# "onnxruntime" / "openvino" on the host CPU (no camera needed)
+INFERENCE_BACKEND = os.getenv("CAMERAAI_BACKEND", "depthai")
+# video source used by the host backends, a camera index or a video file
+CAMERA_SOURCE = os.getenv("CAMERAAI_SOURCE", "0")
+# OAK cameras to run, each on its own thread with a shared GPS reader and
+# uploader: empty for the first camera found, "all" for every connected
+# camera (named by MxId) or a list of named cameras, "left=MXID,right=MXID"
+CAMERAS = os.getenv("CAMERAAI_CAMERAS", "")
+# the inference rate follows the vehicle (camera and host video sources,
+# not replays): from SCHEDULER_FULL_SPEED m/s every camera frame is used,
+# slower the rate drops linearly down to SCHEDULER_MIN_FPS, and stopped
+# (below SCHEDULER_STOP_SPEED) for SCHEDULER_IDLE_DELAY seconds it drops to
+# SCHEDULER_IDLE_FPS; a mean frame difference (0..1) above
+# SCHEDULER_MOTION_THRESHOLD also counts as moving, it needs the frames
+# of a display, video or recording and 0 disables it
+SCHEDULER = os.getenv("CAMERAAI_SCHEDULER", "1") == "1"
+SCHEDULER_FULL_SPEED = float(os.getenv("CAMERAAI_SCHEDULER_FULL_SPEED", "3.0"))
+SCHEDULER_STOP_SPEED = 0.5
+SCHEDULER_MIN_FPS = float(os.getenv("CAMERAAI_SCHEDULER_MIN_FPS", "10"))
+SCHEDULER_IDLE_FPS = float(os.getenv("CAMERAAI_SCHEDULER_IDLE_FPS", "1"))
+SCHEDULER_IDLE_DELAY = 5.0
+SCHEDULER_MOTION_THRESHOLD = float(os.getenv("CAMERAAI_SCHEDULER_MOTION_THRESHOLD", "0"))
+# tiled detection of small litter: the full resolution frame is cut into
+# a grid of TILES ("COLSxROWS", empty disables) overlapping by TILE_OVERLAP
+# of a tile, every tile runs through the network at its input size and the
+# detections are merged across tiles with NMS at TILE_IOU_THRESHOLD; with
+# TILE_FULL_FRAME the whole frame is one more tile for large objects. More
+# tiles and overlap find smaller objects at a lower frame rate
+TILES = os.getenv("CAMERAAI_TILES", "")
+TILE_OVERLAP = float(os.getenv("CAMERAAI_TILE_OVERLAP", "0.2"))
+TILE_IOU_THRESHOLD = 0.5
+TILE_FULL_FRAME = os.getenv("CAMERAAI_TILE_FULL_FRAME", "1") == "1"
+# output sinks of the camera loop: headless mode disables the preview
+# window, the video file can be switched off or recorded without the
+# detections drawn on it; nothing is drawn when no sink needs it
+HEADLESS = os.getenv("CAMERAAI_HEADLESS", "0") == "1"
+RECORD_VIDEO = os.getenv("CAMERAAI_RECORD_VIDEO", "1") == "1"
+ANNOTATE_VIDEO = os.getenv("CAMERAAI_ANNOTATE_VIDEO", "1") == "1"
+# raw video of the OAK camera is encoded on the device ("h264" or
+# "mjpeg"), annotated video and the host backends use a background
+# writer thread; both write segments of VIDEO_SEGMENT_SECONDS into
+# OUTPUT_VIDEO_DIR and keep the last VIDEO_MAX_SEGMENTS (0 keeps all)
+VIDEO_ENCODER = os.getenv("CAMERAAI_VIDEO_ENCODER", "h264")
+VIDEO_SEGMENT_SECONDS = float(os.getenv("CAMERAAI_VIDEO_SEGMENT_SECONDS", "300"))
+VIDEO_MAX_SEGMENTS = int(os.getenv("CAMERAAI_VIDEO_MAX_SEGMENTS", "0"))
+# frames buffered for the background writer, and which frame is dropped
+# when it is full: "oldest" or "newest"
+VIDEO_QUEUE_SIZE = 64
+VIDEO_DROP_POLICY = "oldest"
+# local HTTP port serving /metrics (Prometheus text) and /metrics.json,
+# 0 disables the endpoint
+METRICS_PORT = int(os.getenv("CAMERAAI_METRICS_PORT", "9464"))
 
 CONFIDENCE = 0.8
+# tracker settings: minimum IoU to continue a track, frames needed to
+# confirm a track and frames a track survives without a detection
+TRACKER_IOU_THRESHOLD = 0.3
+TRACKER_MIN_HITS = 3
+TRACKER_MAX_AGE = 10
+# seconds between two reports of the same class at the same location
+# (cells of about 2 m, in decimal degrees), and of the same class while
+# there is no GPS fix; the tracker already reports each object once, this
+# only guards objects whose track was lost and picked up again, so it is
+# never class wide and different objects of a class are all reported
+THROTTLE_CLASS_COOLDOWN = 1.0
+THROTTLE_LOCATION_COOLDOWN = 60.0
+THROTTLE_CELL_SIZE = 0.00002
+# reported litter is remembered for REPORT_INDEX_TTL seconds in an SQLite
+# file (empty path keeps it in memory), a detection of the same class
+# within REPORT_INDEX_RADIUS meters of a report is not reported again;
+# with REPORT_INDEX_SEED=1 the index is seeded with the server's reports
+REPORT_INDEX_PATH = os.getenv("REPORT_INDEX_PATH", "report_index.sqlite3")
+REPORT_INDEX_RADIUS = float(os.getenv("REPORT_INDEX_RADIUS", "10"))
+REPORT_INDEX_TTL = float(os.getenv("REPORT_INDEX_TTL", str(7 * 24 * 3600)))
+REPORT_INDEX_SEED = os.getenv("REPORT_INDEX_SEED", "0") == "1"
 
-TEST_DATA = glob.glob("AImodel/datasets/litter_dataset-1/test/images/*.jpg")
-#TEST_DATA = glob.glob("../../AImodel/datasets/litter_dataset-1/test/images/*.jpg")
+TEST_DATA_PATTERN = "AImodel/datasets/litter_dataset-1/test/images/*.jpg"
+#TEST_DATA_PATTERN = "../../AImodel/datasets/litter_dataset-1/test/images/*.jpg"
 OUTPUT_IMAGES_YOLOv8n = os.path.join("results", "gesture_pred_images_v8n")
 OUTPUT_IMAGES_YOLOv8s = os.path.join("results", "gesture_pred_images_v8s")
 OUTPUT_VIDEO_YOLOv8n = os.path.join("results", "gesture_camera_v8n.mp4")
 OUTPUT_VIDEO_YOLOv8s = os.path.join("results", "gesture_camera_v8s.mp4")
+OUTPUT_VIDEO_DIR = os.path.join("results", "video")
 # define camera preview dimensions same as YOLOv8 model input size
 CAMERA_PREV_DIM = (416, 416)
+CAMERA_FPS = 40
 # define the class label names list
 LABELS = [
     "cans", "cardboard", "colored glass bottles", "face mask", "glass bottle",
     "HDPE", "LDPE", "PET", "PVC", "paper bag", "paper cup",
     "paperboard", "peel", "pile of leaves", "rags", "styrofoam", "tetra pak"
-]
\ No newline at end of file
+]
+
+def __getattr__(name):
+    # TEST_DATA is globbed when it is used, not when config is imported
+    if name == "TEST_DATA":
+        return glob.glob(TEST_DATA_PATTERN)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
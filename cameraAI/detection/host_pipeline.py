@@ -0,0 +1,273 @@
+# import the necessary packages
+from cameraAI.detection import config
+from cameraAI.hardware.motion_scheduler import read_interval
+from collections import deque
+from datetime import timedelta
+import threading
+import time
+import cv2
+
+
+class HostImgFrame:
+    """
+    Host-side stand-in for ``depthai.ImgFrame``.
+
+    Exposes the subset of the ImgFrame API used by the camera loop so frames
+    captured on the host can flow through the same code as device frames.
+    """
+    __slots__ = ("_frame", "_sequence_num", "_timestamp")
+
+    def __init__(self, frame, sequence_num: int, timestamp: timedelta) -> None:
+        self._frame = frame
+        self._sequence_num = sequence_num
+        self._timestamp = timestamp
+
+    def getCvFrame(self):
+        return self._frame
+
+    def getFrame(self):
+        return self._frame
+
+    def getSequenceNum(self) -> int:
+        return self._sequence_num
+
+    def getTimestamp(self) -> timedelta:
+        return self._timestamp
+
+
+class HostImgDetections:
+    """
+    Host-side stand-in for ``depthai.ImgDetections``.
+
+    :ivar detections: The detections of one frame, bounding boxes normalized
+        to the <0..1> range.
+    """
+    __slots__ = ("detections", "_sequence_num", "_timestamp")
+
+    def __init__(self, detections, sequence_num: int, timestamp: timedelta) -> None:
+        self.detections = detections
+        self._sequence_num = sequence_num
+        self._timestamp = timestamp
+
+    def getSequenceNum(self) -> int:
+        return self._sequence_num
+
+    def getTimestamp(self) -> timedelta:
+        return self._timestamp
+
+
+class HostBuffer:
+    """
+    Host-side stand-in for ``depthai.Buffer``, a message with raw data.
+    """
+    __slots__ = ("_data",)
+
+    def __init__(self) -> None:
+        self._data = []
+
+    def setData(self, data) -> None:
+        self._data = list(data)
+
+    def getData(self):
+        return self._data
+
+
+class HostOutputQueue:
+    """
+    Host-side stand-in for ``depthai.DataOutputQueue``.
+
+    A bounded queue that either drops the oldest message when full
+    (non-blocking) or makes the producer wait (blocking), like the device
+    output queues.
+    """
+    def __init__(self, name: str, maxSize: int = 4, blocking: bool = False) -> None:
+        self.name = name
+        self.maxSize = maxSize
+        self.blocking = blocking
+        self._messages = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def send(self, message) -> None:
+        """
+        Adds a message to the queue, called by the producing thread.
+
+        :param message: The message to queue.
+        :return: None
+        """
+        with self._condition:
+            while self.blocking and len(self._messages) >= self.maxSize and not self._closed:
+                self._condition.wait()
+            if len(self._messages) >= self.maxSize:
+                self._messages.popleft()
+            self._messages.append(message)
+            self._condition.notify_all()
+
+    def get(self):
+        """
+        Waits for the next message. Returns None once the queue is closed
+        and empty.
+        """
+        with self._condition:
+            while not self._messages and not self._closed:
+                self._condition.wait()
+            return self._pop()
+
+    def tryGet(self):
+        """
+        Returns the next message, or None if the queue is empty.
+        """
+        with self._condition:
+            return self._pop()
+
+    def setMaxSize(self, maxSize: int) -> None:
+        with self._condition:
+            self.maxSize = maxSize
+            self._condition.notify_all()
+
+    def setBlocking(self, blocking: bool) -> None:
+        with self._condition:
+            self.blocking = blocking
+            self._condition.notify_all()
+
+    def has(self) -> bool:
+        with self._condition:
+            return len(self._messages) > 0
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def isClosed(self) -> bool:
+        return self._closed
+
+    def _pop(self):
+        if not self._messages:
+            return None
+        message = self._messages.popleft()
+        self._condition.notify_all()
+        return message
+
+
+class HostDevice:
+    """
+    Host-side stand-in for ``depthai.Device`` running a camera pipeline.
+
+    Frames are read from an OpenCV video source (camera index or video file),
+    resized to the camera preview size and run through a host inference
+    backend on a background thread. The results are published on the "rgb"
+    and "nn" output queues with matching sequence numbers, so
+    ``camera_manager`` can consume them exactly like the device queues.
+    Like the rate control of the camera pipeline, the "control" input queue
+    selects every how many frames inference runs; the other frames are read
+    and discarded.
+
+    Like the streams of a device pipeline, the queues are created with the
+    device, so no frame is published before its queue exists and every
+    queue is closed when the source is exhausted.
+
+    :ivar backend: The inference backend used for detection.
+    :ivar source: OpenCV video source, a camera index or a file path.
+    :ivar tiler: Optional ``tiling.TiledDetector`` that detects on tiles of
+        the full resolution frame instead of the resized frame.
+    :ivar streams: Output queues that are published, frames are not sent
+        without "rgb".
+    """
+    def __init__(self, backend, source=0, tiler=None, streams=("rgb", "nn")) -> None:
+        self.backend = backend
+        self.tiler = tiler
+        # camera indices arrive as strings from the environment
+        self.source = int(source) if str(source).isdigit() else source
+        self.streams = tuple(streams)
+        self._queues = {name: HostOutputQueue(name) for name in self.streams}
+        self._queues["control"] = HostOutputQueue("control", maxSize=1)
+        self._thread = None
+        self._running = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def getOutputQueue(self, name: str, maxSize: int = 4, blocking: bool = False) -> HostOutputQueue:
+        """
+        Returns the output queue with the given stream name ("rgb" or "nn").
+
+        :raises RuntimeError: If the device has no stream with that name.
+        """
+        if name not in self._queues:
+            raise RuntimeError("the host device has no stream named {!r}".format(name))
+        queue = self._queues[name]
+        queue.setMaxSize(maxSize)
+        queue.setBlocking(blocking)
+        return queue
+
+    def getInputQueue(self, name: str, maxSize: int = 4, blocking: bool = False) -> HostOutputQueue:
+        """
+        Returns the input queue with the given stream name ("control").
+        """
+        return self.getOutputQueue(name, maxSize, blocking)
+
+    def start(self) -> None:
+        """
+        Starts the capture and inference thread.
+
+        :return: None
+        """
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """
+        Stops the capture thread and closes the output queues.
+
+        :return: None
+        """
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        for queue in self._queues.values():
+            queue.close()
+
+    def isClosed(self) -> bool:
+        return not self._running
+
+    def _run(self) -> None:
+        capture = cv2.VideoCapture(self.source)
+        sequence_num = 0
+        interval = 1
+        count = 0
+        try:
+            while self._running:
+                ok, image = capture.read()
+                if not ok:
+                    print("[INFO] host video source exhausted")
+                    break
+                control = self._queues["control"].tryGet()
+                if control is not None:
+                    interval = read_interval(control)
+                # frames between two inferences are read and discarded
+                skip = count % interval
+                count += 1
+                if skip:
+                    continue
+                timestamp = timedelta(seconds=time.monotonic())
+                frame = cv2.resize(image, config.CAMERA_PREV_DIM)
+                if self.tiler is not None:
+                    detections = self.tiler.detect(image)
+                else:
+                    detections = self.backend.detect([frame])[0]
+                if "rgb" in self._queues:
+                    self._queues["rgb"].send(HostImgFrame(frame, sequence_num, timestamp))
+                if "nn" in self._queues:
+                    self._queues["nn"].send(HostImgDetections(detections, sequence_num, timestamp))
+                sequence_num += 1
+        finally:
+            capture.release()
+            self._running = False
+            for queue in self._queues.values():
+                queue.close()
@@ -1,55 +1,315 @@
 # import the necessary packages
 import config
 import utils
+import yolo_decode
+import model_artifacts
+from concurrent.futures import ThreadPoolExecutor
 import argparse
+import glob
+import json
+import csv
+import os
 import cv2
-import depthai as dai
-
-
-# initialize a depthai camera pipeline
-print("[INFO] initializing a depthai images pipeline...")
-
-
-pipeline = utils.create_image_pipeline(config_path=config.YOLOV8N_CONFIG,
-                                        model_path=config.YOLOV8N_MODEL)
-output_image_path = config.OUTPUT_IMAGES_YOLOv8n
-
-# pipeline defined, now the device is assigned and pipeline is started
-with dai.Device(pipeline) as device:
-   # define the queues that will be used in order to communicate with
-   # depthai and then send our input image for predictions
-   detectionIN = device.getInputQueue("detection_in")
-   detectionNN = device.getOutputQueue("nn")
-   print("[INFO] loading image from disk...")
-   for img_path in config.TEST_DATA:
-       # load the input image and then resize it
-       image = cv2.imread(img_path)
-       image_res = cv2.resize(image, config.CAMERA_PREV_DIM)
-       # create a copy of image for inference
-       image_copy = image.copy()
-       # initialize depthai NNData() class which is fed with the
-       # image data resized and transposed to model input shape
-       nn_data = dai.NNData()
-       nn_data.setLayer(
-           "input",
-           utils.to_planar(image_copy, config.CAMERA_PREV_DIM)
-       )
-       # send the image to detectionIN queue further passed
-       # to the detection network for inference as defined in pipeline
-       detectionIN.send(nn_data)
-
-       print("[INFO] fetching neural network output for {}".
-           format(img_path.split('/')[2]))
-       # fetch the neural network output
-       inDet = detectionNN.get()
-       # if detection is available for given image, fetch the detections
-       if inDet is not None:
-           detections = inDet.detections
-           # if object detected, annotate the image
-           image_res = utils.annotateFrame(image_res, detections, "image")
-       # finally write the image to the output path
-       print(output_image_path +"\\"+img_path.split('/')[2])
-       cv2.imwrite(
-           "C:\\Users\\lvgra\\Documents\\school\\projecten\\CameraAI-1.4\\AImodel\\result.png",
-           image_res
-       )
\ No newline at end of file
+
+
+def collect_images(pattern):
+   """
+   Collects the image paths to process.
+
+   :param pattern: A directory (all .jpg, .jpeg and .png files in it are
+       used), a glob pattern, or None to use ``config.TEST_DATA``.
+   :type pattern: str | None
+   :return: Sorted list of image paths.
+   :rtype: list[str]
+   """
+   if pattern is None:
+       return sorted(config.TEST_DATA)
+   if os.path.isdir(pattern):
+       paths = []
+       for extension in ("*.jpg", "*.jpeg", "*.png"):
+           paths.extend(glob.glob(os.path.join(pattern, extension)))
+       return sorted(paths)
+   return sorted(glob.glob(pattern, recursive=True))
+
+
+def source_root(pattern):
+   """
+   Returns the directory the collected images are relative to.
+
+   :param pattern: The ``pattern`` passed to :func:`collect_images`.
+   :type pattern: str | None
+   :return: The directory itself, or the leading part of the glob pattern
+       without wildcards.
+   :rtype: str
+   """
+   if pattern is None:
+       pattern = config.TEST_DATA_PATTERN
+   if os.path.isdir(pattern):
+       return pattern
+   parts = []
+   for part in os.path.dirname(pattern).split(os.sep):
+       if glob.has_magic(part):
+           break
+       parts.append(part)
+   return os.sep.join(parts) or "."
+
+
+def prefetch_images(paths, pool, depth):
+   """
+   Reads and decodes images on a thread pool ahead of the consumer.
+
+   At most ``depth`` images are decoded ahead, so memory stays bounded no
+   matter how many paths are given.
+
+   :param paths: Image paths to read, in order.
+   :param pool: Thread pool used for decoding.
+   :type pool: concurrent.futures.ThreadPoolExecutor
+   :param depth: Number of images decoded ahead of the consumer.
+   :type depth: int
+   :return: Generator of (path, image) tuples in input order, image is None
+       when the file could not be read.
+   """
+   futures = []
+   paths = iter(paths)
+   for path in paths:
+       futures.append((path, pool.submit(cv2.imread, path)))
+       if len(futures) >= depth:
+           break
+   while futures:
+       path, future = futures.pop(0)
+       # keep the pool busy before handing out the decoded image
+       next_path = next(paths, None)
+       if next_path is not None:
+           futures.append((next_path, pool.submit(cv2.imread, next_path)))
+       yield path, future.result()
+
+
+class ResultWriter:
+   """
+   Writes annotated images, a JSON results file per image and a CSV file
+   with all detections to the output directory.
+
+   Annotating and encoding run on a thread pool so the inference loop is
+   never blocked by disk writes.
+
+   The outputs mirror the path of each image relative to ``root``, so images
+   with the same name in different directories do not overwrite each other.
+
+   :ivar output_dir: Directory the results are written to.
+   :ivar root: Directory the image paths are relative to.
+   """
+   def __init__(self, output_dir, pool, root="."):
+       self.output_dir = output_dir
+       self.root = root
+       self.pool = pool
+       self.futures = []
+       os.makedirs(output_dir, exist_ok=True)
+       self.csv_file = open(os.path.join(output_dir, "results.csv"), "w", newline="")
+       self.csv_writer = csv.writer(self.csv_file)
+       self.csv_writer.writerow(["image", "output", "label", "confidence", "xmin", "ymin", "xmax", "ymax"])
+
+   def write(self, img_path, image, detections):
+       """
+       Queues the results of one image for writing.
+
+       :param img_path: Path of the input image.
+       :param image: The decoded input image.
+       :param detections: Detections of the image, objects with the
+           ``depthai.ImgDetection`` attributes or a detection array.
+       :return: None
+       """
+       detections = yolo_decode.to_detection_array(detections)
+       name = self.output_name(img_path)
+       for detection in detections:
+           self.csv_writer.writerow([img_path, name, config.LABELS[detection.label], f"{detection.confidence:.4f}",
+                                     f"{detection.xmin:.4f}", f"{detection.ymin:.4f}",
+                                     f"{detection.xmax:.4f}", f"{detection.ymax:.4f}"])
+       self.futures.append(self.pool.submit(self._write_image, img_path, name, image, detections))
+       # drop finished futures so the list does not grow with the batch
+       if len(self.futures) > 64:
+           self.futures = [future for future in self.futures if not future.done()]
+
+   def output_name(self, img_path):
+       """
+       Returns the output path of an image without extension, relative to
+       the output directory.
+
+       :param img_path: Path of the input image.
+       :rtype: str
+       """
+       name = os.path.relpath(img_path, self.root)
+       # images outside the root keep their file name only
+       if name.startswith(os.pardir + os.sep):
+           name = os.path.basename(img_path)
+       return os.path.splitext(name)[0]
+
+   def close(self):
+       """
+       Waits for all pending writes and closes the CSV file.
+
+       :return: None
+       """
+       for future in self.futures:
+           future.result()
+       self.csv_file.close()
+
+   def _write_image(self, img_path, name, image, detections):
+       results = {
+           "image": img_path,
+           "detections": [
+               {
+                   "label": config.LABELS[detection.label],
+                   "confidence": float(detection.confidence),
+                   "bbox": [float(detection.xmin), float(detection.ymin),
+                            float(detection.xmax), float(detection.ymax)],
+               }
+               for detection in detections
+           ]
+       }
+       os.makedirs(os.path.dirname(os.path.join(self.output_dir, name)), exist_ok=True)
+       with open(os.path.join(self.output_dir, name + ".json"), "w") as f:
+           json.dump(results, f, indent=2)
+       # annotate the full resolution image, the boxes are normalized
+       image = utils.annotateFrame(image, detections, "image")
+       cv2.imwrite(os.path.join(self.output_dir, name + ".png"), image)
+
+
+def run_device(images, writer, in_flight):
+   """
+   Runs the images through the YOLO network on the OAK device.
+
+   Up to ``in_flight`` frames are queued on the device at once, so the
+   network never waits for a host round trip. Every frame is tagged with a
+   sequence number, which is used to match the detections back to the image.
+
+   :param images: Iterable of (path, image) tuples.
+   :param writer: Receives the results of every image.
+   :type writer: ResultWriter
+   :param in_flight: Maximum number of frames queued on the device.
+   :type in_flight: int
+   :return: Number of processed images.
+   :rtype: int
+   """
+   import depthai as dai
+
+   # initialize a depthai images pipeline
+   print("[INFO] initializing a depthai images pipeline...")
+   pipeline = utils.create_image_pipeline(config_path=config.YOLOV8N_CONFIG,
+                                          model_path=model_artifacts.resolve_blob(config.YOLOV8N_CONFIG),
+                                          in_flight=in_flight)
+   processed = 0
+   # pipeline defined, now the device is assigned and pipeline is started
+   with dai.Device(pipeline) as device:
+       # define the queues that will be used in order to communicate with
+       # depthai and then send our input images for predictions
+       detectionIN = device.getInputQueue("detection_in", maxSize=in_flight, blocking=True)
+       detectionNN = device.getOutputQueue("nn", maxSize=in_flight, blocking=True)
+       # sequence number -> (path, image) of the frames on the device
+       pending = {}
+
+       def receive():
+           # fetch the neural network output and match it to its image
+           inDet = detectionNN.get()
+           img_path, image = pending.pop(inDet.getSequenceNum())
+           writer.write(img_path, image, inDet.detections)
+
+       for sequence_num, (img_path, image) in enumerate(images):
+           if image is None:
+               print("[WARN] could not read {}".format(img_path))
+               continue
+           # initialize depthai NNData() class which is fed with the
+           # image data resized and transposed to model input shape
+           nn_data = dai.NNData()
+           nn_data.setLayer("input", utils.to_planar(image, config.CAMERA_PREV_DIM))
+           nn_data.setSequenceNum(sequence_num)
+           # wait for a result before exceeding the in-flight window
+           while len(pending) >= in_flight:
+               receive()
+               processed += 1
+           pending[sequence_num] = (img_path, image)
+           detectionIN.send(nn_data)
+       # drain the frames still on the device
+       while pending:
+           receive()
+           processed += 1
+   return processed
+
+
+def run_backend(images, writer, batch_size):
+   """
+   Runs the images through a host CPU backend in batches.
+
+   :param images: Iterable of (path, image) tuples.
+   :param writer: Receives the results of every image.
+   :type writer: ResultWriter
+   :param batch_size: Number of images per inference batch.
+   :type batch_size: int
+   :return: Number of processed images.
+   :rtype: int
+   """
+   import backends
+
+   backend = backends.create_backend(config.INFERENCE_BACKEND)
+   processed = 0
+   batch = []
+
+   def flush():
+       results = backend.detect([image for _, image in batch])
+       for (img_path, image), detections in zip(batch, results):
+           writer.write(img_path, image, detections)
+       batch.clear()
+
+   for img_path, image in images:
+       if image is None:
+           print("[WARN] could not read {}".format(img_path))
+           continue
+       batch.append((img_path, image))
+       if len(batch) >= batch_size:
+           processed += len(batch)
+           flush()
+   if batch:
+       processed += len(batch)
+       flush()
+   return processed
+
+
+def main():
+   """
+   Runs detection over a directory or glob of images.
+
+   Images are decoded on a prefetch thread pool, several frames are kept in
+   flight on the device (or batched on a host backend), and the annotated
+   images plus a JSON results file per image and a ``results.csv`` with all
+   detections are written to the output directory.
+
+   :return: None
+   """
+   parser = argparse.ArgumentParser(description="Run litter detection on a batch of images.")
+   parser.add_argument("-i", "--input", default=None,
+                       help="directory or glob pattern of images (default: the test dataset)")
+   parser.add_argument("-o", "--output", default=config.OUTPUT_IMAGES_YOLOv8n,
+                       help="directory for annotated images and results")
+   parser.add_argument("--in-flight", type=int, default=8,
+                       help="frames queued on the device, or the batch size of a host backend")
+   parser.add_argument("--workers", type=int, default=4,
+                       help="threads used to decode and write images")
+   args = parser.parse_args()
+
+   paths = collect_images(args.input)
+   print("[INFO] processing {} images...".format(len(paths)))
+   with ThreadPoolExecutor(max_workers=args.workers) as read_pool, \
+           ThreadPoolExecutor(max_workers=args.workers) as write_pool:
+       images = prefetch_images(paths, read_pool, depth=2 * args.in_flight)
+       writer = ResultWriter(args.output, write_pool, root=source_root(args.input))
+       try:
+           if config.INFERENCE_BACKEND == "depthai":
+               processed = run_device(images, writer, args.in_flight)
+           else:
+               processed = run_backend(images, writer, args.in_flight)
+       finally:
+           writer.close()
+   print("[INFO] wrote results for {} images to {}".format(processed, args.output))
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,195 @@
+# import the necessary packages
+from cameraAI.detection import config
+from pathlib import Path
+import tempfile
+import hashlib
+import shutil
+import json
+import time
+import os
+
+
+def file_digest(path, chunk_size=1 << 20) -> str:
+    """
+    Returns the SHA-256 of a file, read in chunks.
+
+    :param path: Path of the file.
+    :return: The hex digest.
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_sources(config_path) -> list[Path]:
+    """
+    Finds the model files that belong to a model config.
+
+    The ``model`` section of ``best.json`` names the OpenVINO IR (xml and
+    bin) relative to the config file; when those are missing an ONNX export
+    next to the config (``best.onnx`` for ``best.json``) is used.
+
+    :param config_path: Path of the model config (best.json).
+    :return: The IR [xml, bin] or [onnx] paths, empty when none exist.
+    :rtype: list[pathlib.Path]
+    """
+    config_path = Path(config_path)
+    with config_path.open() as f:
+        model = json.load(f).get("model", {})
+    xml = config_path.parent / model["xml"] if "xml" in model else None
+    weights = config_path.parent / model["bin"] if "bin" in model else None
+    if xml is not None and weights is not None and xml.exists() and weights.exists():
+        return [xml, weights]
+    onnx = config_path.with_suffix(".onnx")
+    if onnx.exists():
+        return [onnx]
+    return []
+
+
+class ModelArtifactCache:
+    """
+    Local cache of compiled model blobs, addressed by their content.
+
+    The key of an artifact is a SHA-256 over the source model files, the
+    ``nn_config`` of ``best.json`` and the conversion parameters (data type,
+    shaves, input size and OpenVINO version). A blob is therefore only reused
+    for exactly the model and config it was converted from: any change to the
+    weights, the JSON or the parameters resolves to a new artifact, and
+    unchanged models are never converted twice. Each blob is stored with a
+    ``.json`` sidecar describing what it was built from.
+
+    :ivar directory: Directory of the cache.
+    :ivar data_type: Precision of the blob, "FP16" for the Myriad X.
+    :ivar shaves: Number of SHAVE cores the blob is compiled for.
+    :ivar version: OpenVINO version of the compiler.
+    """
+    def __init__(self, directory=config.MODEL_CACHE_DIR, data_type: str = config.MODEL_DATA_TYPE,
+                 shaves: int = config.MODEL_SHAVES, version: str = config.MODEL_OPENVINO_VERSION) -> None:
+        self.directory = Path(directory)
+        self.data_type = data_type
+        self.shaves = shaves
+        self.version = version
+
+    def parameters(self, config_path) -> dict:
+        """
+        Returns the conversion parameters of a model config.
+
+        :param config_path: Path of the model config (best.json).
+        :rtype: dict
+        """
+        with Path(config_path).open() as f:
+            nn_config = json.load(f).get("nn_config", {})
+        return {
+            "data_type": self.data_type,
+            "shaves": self.shaves,
+            "version": self.version,
+            "input_size": nn_config.get("input_size"),
+            "nn_config": nn_config,
+        }
+
+    def key(self, sources, parameters: dict) -> str:
+        """
+        Computes the content address of an artifact.
+
+        :param sources: The source model files.
+        :param parameters: The conversion parameters.
+        :return: Hex SHA-256 key.
+        :rtype: str
+        """
+        digest = hashlib.sha256()
+        for source in sources:
+            digest.update(Path(source).suffix.encode("utf-8"))
+            digest.update(file_digest(source).encode("ascii"))
+        digest.update(json.dumps(parameters, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def path(self, key: str) -> Path:
+        """
+        Returns where the blob with the given key is stored.
+
+        :param key: Artifact key.
+        :rtype: pathlib.Path
+        """
+        return self.directory / key[:2] / "{}.blob".format(key)
+
+    def resolve(self, config_path, convert: bool = True) -> Path:
+        """
+        Returns the blob for a model config, converting it on a cache miss.
+
+        :param config_path: Path of the model config (best.json).
+        :param convert: Convert missing blobs with blobconverter, otherwise
+            a miss raises FileNotFoundError.
+        :return: Path of the cached blob.
+        :rtype: pathlib.Path
+        :raises FileNotFoundError: If the config has no source model, or the
+            blob is not cached and ``convert`` is False.
+        """
+        sources = model_sources(config_path)
+        if not sources:
+            raise FileNotFoundError("no model files found for {}".format(config_path))
+        parameters = self.parameters(config_path)
+        key = self.key(sources, parameters)
+        blob = self.path(key)
+        if blob.exists():
+            return blob
+        if not convert:
+            raise FileNotFoundError("no cached blob {} for {}".format(key, config_path))
+        print("[INFO] converting {} to a blob ({} shaves, {})...".format(sources[0].name, self.shaves,
+                                                                          self.data_type))
+        self._store(self._convert(sources, parameters), blob, {
+            "key": key,
+            "config": str(config_path),
+            "sources": {str(source): file_digest(source) for source in sources},
+            "parameters": parameters,
+            "created": time.time(),
+        })
+        return blob
+
+    def _convert(self, sources, parameters: dict) -> Path:
+        import blobconverter
+        output_dir = tempfile.mkdtemp(prefix="cameraai-blob-")
+        common = dict(data_type=parameters["data_type"], shaves=parameters["shaves"],
+                      version=parameters["version"], output_dir=output_dir, use_cache=False)
+        if sources[0].suffix == ".onnx":
+            optimizer_params = []
+            if parameters["input_size"]:
+                width, height = parameters["input_size"].split("x")
+                optimizer_params.append("--input_shape=[1,3,{},{}]".format(height, width))
+            return Path(blobconverter.from_onnx(model=str(sources[0]), optimizer_params=optimizer_params, **common))
+        return Path(blobconverter.from_openvino(xml=str(sources[0]), bin=str(sources[1]), **common))
+
+    def _store(self, converted: Path, blob: Path, metadata: dict) -> None:
+        # write next to the target and rename, so a crash never leaves a
+        # partial blob under a valid key
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        partial = blob.with_suffix(".partial")
+        shutil.copyfile(converted, partial)
+        with open(blob.with_suffix(".json"), "w") as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(partial, blob)
+        shutil.rmtree(converted.parent, ignore_errors=True)
+
+
+def resolve_blob(config_path, fallback=config.YOLOV8N_MODEL) -> str:
+    """
+    Resolves the blob to load for a model config at pipeline build time.
+
+    The blob comes from the artifact cache (converted on a miss). Only when
+    the config has no source model, or the conversion is not possible
+    (blobconverter missing, no network), the ``fallback`` blob is used, with
+    a warning that it may not match the config.
+
+    :param config_path: Path of the model config (best.json).
+    :param fallback: Blob used when no artifact can be resolved.
+    :return: Path of the blob.
+    :rtype: str
+    """
+    try:
+        return str(ModelArtifactCache().resolve(config_path))
+    except Exception as e:
+        print("[INFO] could not resolve a blob for {}: {}".format(config_path, e))
+        print("[INFO] falling back to {}, which may not match the config".format(fallback))
+        return str(fallback)
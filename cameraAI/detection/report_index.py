@@ -0,0 +1,186 @@
+# import the necessary packages
+import threading
+import sqlite3
+import time
+import numpy as np
+import h3
+
+EARTH_RADIUS = 6371000.0
+
+
+def haversine(lat, lon, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Great-circle distance from one point to many, in meters.
+
+    :param lat: Latitude of the point in decimal degrees.
+    :param lon: Longitude of the point in decimal degrees.
+    :param lats: Latitudes of the other points.
+    :param lons: Longitudes of the other points.
+    :return: The distances in meters.
+    :rtype: numpy.ndarray
+    """
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class ReportIndex:
+    """
+    Spatial index of recently reported litter, to avoid reporting the same
+    object again on the next lap or by the next vehicle.
+
+    Reports are bucketed by H3 cell. A lookup gathers the reports of the
+    same class in the cell and its direct neighbours and checks their
+    distance with one vectorized haversine, so it stays cheap however many
+    reports are indexed. Reports expire after ``ttl`` seconds. With a
+    ``path`` the index is kept in an SQLite file and survives restarts, and
+    it can be seeded with the reports other vehicles sent to the server.
+
+    :ivar radius: Distance in meters within which a report of the same class
+        counts as a duplicate, at most the H3 cell edge length.
+    :ivar ttl: Seconds after which a report no longer suppresses duplicates.
+    :ivar resolution: H3 resolution of the buckets.
+    :ivar suppressed: Number of duplicates found.
+    """
+    def __init__(self, path: str | None = None, radius: float = 10.0, ttl: float = 7 * 24 * 3600,
+                 resolution: int = 11) -> None:
+        if radius > h3.average_hexagon_edge_length(resolution, unit="m"):
+            raise ValueError("radius {} m is larger than the cells of resolution {}".format(radius, resolution))
+        self.radius = radius
+        self.ttl = ttl
+        self.resolution = resolution
+        self.suppressed = 0
+        # cell -> list of (label, lat, lon, reported)
+        self._cells = {}
+        self._lock = threading.Lock()
+        self._next_eviction = 0.0
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS reports (label TEXT NOT NULL, lat REAL NOT NULL, lon REAL NOT NULL, "
+                "reported REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM reports WHERE reported <= ?", (time.time() - ttl,))
+            self._db.commit()
+            for label, lat, lon, reported in self._db.execute("SELECT label, lat, lon, reported FROM reports"):
+                self._insert(label, lat, lon, reported)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._cells.values())
+
+    def contains(self, label, lat: float, lon: float, now: float | None = None) -> bool:
+        """
+        Checks whether the same class was reported within ``radius`` meters.
+
+        :param label: Class of the detection.
+        :param lat: Latitude in decimal degrees.
+        :param lon: Longitude in decimal degrees.
+        :param now: Current Unix time, looked up when omitted.
+        :return: True if a report that has not expired is nearby.
+        :rtype: bool
+        """
+        if now is None:
+            now = time.time()
+        cell = self._cell(lat, lon)
+        with self._lock:
+            candidates = [(entry[1], entry[2]) for neighbour in h3.grid_disk(cell, 1)
+                          for entry in self._cells.get(neighbour, ())
+                          if entry[0] == label and now - entry[3] < self.ttl]
+        if not candidates:
+            return False
+        candidates = np.asarray(candidates)
+        return bool((haversine(lat, lon, candidates[:, 0], candidates[:, 1]) <= self.radius).any())
+
+    def add(self, label, lat: float, lon: float, reported: float | None = None) -> None:
+        """
+        Indexes a report.
+
+        :param label: Class of the report.
+        :param lat: Latitude in decimal degrees.
+        :param lon: Longitude in decimal degrees.
+        :param reported: Unix time of the report, now when omitted.
+        :return: None
+        """
+        if reported is None:
+            reported = time.time()
+        with self._lock:
+            self._insert(label, lat, lon, reported)
+            if self._db is not None:
+                self._db.execute("INSERT INTO reports (label, lat, lon, reported) VALUES (?, ?, ?, ?)",
+                                 (label, lat, lon, reported))
+                self._db.commit()
+            self._evict(reported)
+
+    def seen(self, label, coords: tuple[float, float] | None, now: float | None = None) -> bool:
+        """
+        Checks whether a detection duplicates a report, and counts it if so.
+
+        :param label: Class of the detection.
+        :param coords: (latitude, longitude), or None without GPS; a
+            detection without a location is never a duplicate.
+        :param now: Current Unix time, looked up when omitted.
+        :return: True if the detection should not be reported.
+        :rtype: bool
+        """
+        if coords is None or not self.contains(label, coords[0], coords[1], now):
+            return False
+        self.suppressed += 1
+        return True
+
+    def seed(self, reports) -> int:
+        """
+        Adds reports made elsewhere, e.g. fetched from the server.
+
+        :param reports: Iterable of (label, lat, lon, reported Unix time).
+        :return: Number of reports added, expired ones are skipped.
+        :rtype: int
+        """
+        now = time.time()
+        rows = []
+        with self._lock:
+            for label, lat, lon, reported in reports:
+                row = (label, lat, lon, reported)
+                # skip expired reports and reports seeded on an earlier start
+                if now - reported >= self.ttl or row in self._cells.get(self._cell(lat, lon), ()):
+                    continue
+                self._insert(*row)
+                rows.append(row)
+            if self._db is not None:
+                self._db.executemany("INSERT INTO reports (label, lat, lon, reported) VALUES (?, ?, ?, ?)", rows)
+                self._db.commit()
+        return len(rows)
+
+    def close(self) -> None:
+        """
+        Closes the SQLite file.
+
+        :return: None
+        """
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _cell(self, lat: float, lon: float) -> str:
+        return h3.latlng_to_cell(lat, lon, self.resolution)
+
+    def _insert(self, label, lat: float, lon: float, reported: float) -> None:
+        self._cells.setdefault(self._cell(lat, lon), []).append((label, lat, lon, reported))
+
+    def _evict(self, now: float) -> None:
+        # drop expired reports at most once an hour, so the cost is amortized
+        if now < self._next_eviction:
+            return
+        self._next_eviction = now + min(self.ttl, 3600.0)
+        cutoff = now - self.ttl
+        cells = {}
+        for cell, entries in self._cells.items():
+            alive = [entry for entry in entries if entry[3] > cutoff]
+            if alive:
+                cells[cell] = alive
+        self._cells = cells
+        if self._db is not None:
+            self._db.execute("DELETE FROM reports WHERE reported <= ?", (cutoff,))
+            self._db.commit()
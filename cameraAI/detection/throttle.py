@@ -0,0 +1,70 @@
+# import the necessary packages
+import math
+import time
+
+
+class DetectionThrottle:
+    """
+    Non-blocking rate limiter for reported detections.
+
+    A detection is allowed when the same class has not been reported in the
+    same location cell for ``location_cooldown`` seconds. Without GPS there
+    is no cell and the class must not have been reported without GPS for
+    ``class_cooldown`` seconds. The cooldowns are not class wide, two
+    different objects of the same class in different cells are both
+    reported. Both checks are dictionary lookups, so the camera loop can
+    call :meth:`allow` for every detection without ever waiting.
+
+    :ivar class_cooldown: Seconds between two reports of the same class
+        without GPS.
+    :ivar location_cooldown: Seconds between two reports of the same class
+        in the same location cell.
+    :ivar cell_size: Size of a location cell in decimal degrees (about 11 m
+        at the default).
+    :ivar suppressed: Number of detections that were throttled.
+    """
+    def __init__(self, class_cooldown: float = 5.0, location_cooldown: float = 60.0,
+                 cell_size: float = 0.0001) -> None:
+        self.class_cooldown = class_cooldown
+        self.location_cooldown = location_cooldown
+        self.cell_size = cell_size
+        self.suppressed = 0
+        self._last_class = {}
+        self._last_location = {}
+        self._next_eviction = 0.0
+
+    def allow(self, label, coords: tuple[float, float] | None, now: float | None = None) -> bool:
+        """
+        Decides whether a detection is reported, and records it if it is.
+
+        :param label: Class of the detection.
+        :param coords: (latitude, longitude) of the detection, or None
+            without GPS, then the class cooldown applies instead.
+        :param now: Current ``time.monotonic()``, looked up when omitted.
+        :return: True if the detection should be reported.
+        :rtype: bool
+        """
+        if now is None:
+            now = time.monotonic()
+        if coords is None:
+            if now - self._last_class.get(label, -math.inf) < self.class_cooldown:
+                self.suppressed += 1
+                return False
+            self._last_class[label] = now
+            return True
+        location = (label, round(coords[0] / self.cell_size), round(coords[1] / self.cell_size))
+        if now - self._last_location.get(location, -math.inf) < self.location_cooldown:
+            self.suppressed += 1
+            return False
+        self._last_location[location] = now
+        self._evict(now)
+        return True
+
+    def _evict(self, now: float) -> None:
+        # drop cells whose cooldown has passed, at most once per cooldown so
+        # the cost is amortized over many calls
+        if now < self._next_eviction:
+            return
+        self._next_eviction = now + self.location_cooldown
+        self._last_location = {location: last for location, last in self._last_location.items()
+                               if now - last < self.location_cooldown}
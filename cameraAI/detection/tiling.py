@@ -0,0 +1,187 @@
+# import the necessary packages
+from cameraAI.detection import yolo_decode
+from cameraAI.detection.host_pipeline import HostImgDetections
+from cameraAI import metrics
+from collections import deque
+import numpy as np
+
+
+def parse_tiles(spec: str) -> tuple | None:
+    """
+    Parses a tile grid specification.
+
+    :param spec: "COLSxROWS", e.g. "3x2", or an empty string.
+    :return: (columns, rows), or None when tiling is disabled.
+    :rtype: tuple | None
+    :raises ValueError: If the specification is malformed.
+    """
+    if not spec:
+        return None
+    columns, rows = (int(value) for value in str(spec).lower().split("x"))
+    if columns < 1 or rows < 1:
+        raise ValueError("invalid tile grid {!r}".format(spec))
+    return columns, rows
+
+
+def tile_rois(columns: int, rows: int, overlap: float = 0.2, full_frame: bool = False) -> np.ndarray:
+    """
+    Computes the regions of a grid of overlapping tiles.
+
+    The tiles are equally sized and cover the frame exactly, neighbouring
+    tiles share ``overlap`` of a tile, so an object on a tile border is fully
+    inside at least one tile when it is smaller than the overlap.
+
+    :param columns: Tiles per row.
+    :param rows: Tiles per column.
+    :param overlap: Fraction of a tile shared with its neighbour, 0..<1.
+    :param full_frame: Add the whole frame as a last tile, so objects larger
+        than a tile are still detected.
+    :return: Array of shape (K, 4) with (xmin, ymin, xmax, ymax) normalized
+        to the <0..1> range of the frame.
+    :rtype: numpy.ndarray
+    """
+    if not 0 <= overlap < 1:
+        raise ValueError("the tile overlap must be in the range 0..<1")
+
+    def spans(count):
+        size = 1.0 / (count - (count - 1) * overlap)
+        starts = np.arange(count) * size * (1 - overlap)
+        return np.stack((starts, np.minimum(starts + size, 1.0)), axis=1)
+
+    rois = [(x[0], y[0], x[1], y[1]) for y in spans(rows) for x in spans(columns)]
+    if full_frame:
+        rois.append((0.0, 0.0, 1.0, 1.0))
+    return np.asarray(rois, dtype=np.float32)
+
+
+def merge_tiles(tile_detections, rois: np.ndarray, iou_threshold: float = 0.5) -> np.recarray:
+    """
+    Merges the detections of the tiles of a frame.
+
+    The boxes are mapped from tile to frame coordinates and duplicates of an
+    object seen by overlapping tiles are removed with non-maximum
+    suppression per class.
+
+    :param tile_detections: One detection array (or list of
+        ``depthai.ImgDetection``) per tile, boxes normalized to the tile.
+    :param rois: The tile regions, as returned by :func:`tile_rois`.
+    :param iou_threshold: Boxes of the same class with a higher IoU are
+        merged into the one with the highest confidence.
+    :return: Detections normalized to the frame, ordered by decreasing
+        confidence.
+    :rtype: numpy.recarray
+    """
+    arrays = []
+    for detections, roi in zip(tile_detections, rois):
+        detections = yolo_decode.to_detection_array(detections).copy()
+        width, height = roi[2] - roi[0], roi[3] - roi[1]
+        detections.xmin = roi[0] + detections.xmin * width
+        detections.xmax = roi[0] + detections.xmax * width
+        detections.ymin = roi[1] + detections.ymin * height
+        detections.ymax = roi[1] + detections.ymax * height
+        arrays.append(detections)
+    if not arrays:
+        return yolo_decode.empty_detections()
+    detections = np.concatenate(arrays).view(np.recarray)
+    boxes = np.stack((detections.xmin, detections.ymin, detections.xmax, detections.ymax), axis=1)
+    keep = yolo_decode.batched_nms(boxes, detections.confidence, detections.label, iou_threshold)
+    return detections[keep]
+
+
+class TiledDetector:
+    """
+    Runs a host inference backend on overlapping tiles of a frame.
+
+    The tiles are cropped from the full resolution frame, detected in one
+    batch and merged with :func:`merge_tiles`, so small objects keep the
+    resolution of the camera instead of being scaled down with the frame.
+
+    :ivar backend: The inference backend.
+    :ivar rois: The tile regions, see :func:`tile_rois`.
+    :ivar iou_threshold: IoU above which detections of overlapping tiles are
+        merged.
+    """
+    def __init__(self, backend, rois: np.ndarray, iou_threshold: float = 0.5) -> None:
+        self.backend = backend
+        self.rois = rois
+        self.iou_threshold = iou_threshold
+
+    def detect(self, image) -> np.recarray:
+        """
+        Detects objects on a BGR frame.
+
+        :param image: BGR frame at full resolution.
+        :type image: numpy.ndarray
+        :return: Detections normalized to the frame.
+        :rtype: numpy.recarray
+        """
+        height, width = image.shape[:2]
+        scale = np.array((width, height, width, height), dtype=np.float32)
+        crops = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in np.rint(self.rois * scale).astype(int)]
+        return merge_tiles(self.backend.detect(crops), self.rois, self.iou_threshold)
+
+
+class TileMerger:
+    """
+    Merges the per-tile detections of the tiled camera pipeline.
+
+    The network of the device runs on every tile and sends one detections
+    message per tile, in tile order, all with the sequence number of the
+    frame. This wraps the "nn" output queue and returns one merged
+    ``HostImgDetections`` per frame, so the camera loop consumes it like the
+    queue of the untiled pipeline. A frame that lost a tile on the queue is
+    discarded, its remaining tiles cannot be placed.
+
+    :param queue: The "nn" output queue of the device.
+    :param rois: The tile regions the pipeline was built with.
+    :param iou_threshold: IoU above which detections of overlapping tiles are
+        merged.
+    :ivar incomplete: Frames discarded because a tile was lost.
+    """
+    def __init__(self, queue, rois: np.ndarray, iou_threshold: float = 0.5) -> None:
+        self.queue = queue
+        self.rois = rois
+        self.iou_threshold = iou_threshold
+        self.incomplete = 0
+        self._tiles = []
+        self._ready = deque()
+        self._dropped = metrics.DROPPED_FRAMES.labels("tiles")
+
+    def get(self):
+        """
+        Waits for the merged detections of the next frame. Returns None once
+        the queue is closed.
+        """
+        while not self._ready:
+            message = self.queue.get()
+            if message is None:
+                return None
+            self._add(message)
+        return self._ready.popleft()
+
+    def tryGet(self):
+        """
+        Returns the merged detections of the next frame, or None if no frame
+        is complete yet.
+        """
+        while not self._ready:
+            message = self.queue.tryGet()
+            if message is None:
+                return None
+            self._add(message)
+        return self._ready.popleft()
+
+    def _add(self, message) -> None:
+        if self._tiles and message.getSequenceNum() != self._tiles[0].getSequenceNum():
+            self._discard()
+        self._tiles.append(message)
+        if len(self._tiles) == len(self.rois):
+            first = self._tiles[0]
+            detections = merge_tiles([tile.detections for tile in self._tiles], self.rois, self.iou_threshold)
+            self._ready.append(HostImgDetections(detections, first.getSequenceNum(), first.getTimestamp()))
+            self._tiles = []
+
+    def _discard(self) -> None:
+        self.incomplete += 1
+        self._dropped.inc()
+        self._tiles = []
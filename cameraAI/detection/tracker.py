@@ -0,0 +1,246 @@
+# import the necessary packages
+from cameraAI.detection import yolo_decode
+from typing import NamedTuple
+import numpy as np
+
+_assignment = None
+
+
+def _linear_sum_assignment():
+    # scipy is optional and slow to import, so it is only imported when the
+    # first frame needs an assignment; None falls back to greedy matching
+    global _assignment
+    if _assignment is None:
+        try:
+            from scipy.optimize import linear_sum_assignment
+            _assignment = linear_sum_assignment
+        except ImportError:
+            _assignment = False
+    return _assignment or None
+
+
+class ConfirmedTrack(NamedTuple):
+    """
+    A confirmed track that was not reported yet.
+
+    The box attributes match ``depthai.ImgDetection`` and are normalized to
+    the <0..1> range.
+    """
+    track_id: int
+    label: int
+    confidence: float
+    xmin: float
+    ymin: float
+    xmax: float
+    ymax: float
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Computes the pairwise IoU between two sets of boxes.
+
+    :param boxes_a: Array of shape (A, 4) in (x1, y1, x2, y2) format.
+    :param boxes_b: Array of shape (B, 4) in (x1, y1, x2, y2) format.
+    :return: Array of shape (A, B) with the IoU of every pair.
+    :rtype: numpy.ndarray
+    """
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    width = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    height = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersection = width * height
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-9)
+
+
+def _to_state(boxes: np.ndarray) -> np.ndarray:
+    # (x1, y1, x2, y2) -> (cx, cy, area, aspect ratio)
+    width = boxes[:, 2] - boxes[:, 0]
+    height = boxes[:, 3] - boxes[:, 1]
+    return np.stack((boxes[:, 0] + width / 2, boxes[:, 1] + height / 2,
+                     width * height, width / np.maximum(height, 1e-9)), axis=1)
+
+
+def _to_boxes(state: np.ndarray) -> np.ndarray:
+    # (cx, cy, area, aspect ratio, ...) -> (x1, y1, x2, y2)
+    area = np.clip(state[:, 2], 1e-9, None)
+    width = np.sqrt(area * np.clip(state[:, 3], 1e-9, None))
+    height = area / width
+    return np.stack((state[:, 0] - width / 2, state[:, 1] - height / 2,
+                     state[:, 0] + width / 2, state[:, 1] + height / 2), axis=1)
+
+
+class SortTracker:
+    """
+    SORT-style multi-object tracker over the detections of consecutive frames.
+
+    Every track has a constant-velocity Kalman filter over the box center,
+    area and aspect ratio. Each frame the filters of all tracks are predicted
+    at once, matched to the new detections of the same class by IoU
+    (vectorized IoU matrix, Hungarian assignment when scipy is available,
+    greedy otherwise) and updated in one batched step. A track is confirmed
+    after ``min_hits`` matched frames with a confidence of at least
+    ``min_confidence``. It is returned by :meth:`update` every frame until
+    the caller marks it with :meth:`mark_reported`, so a track the caller
+    could not report yet (e.g. throttled) is offered again.
+
+    :ivar iou_threshold: Minimum IoU for a detection to match a track.
+    :ivar min_hits: Matched frames needed to confirm a track.
+    :ivar max_age: Frames a track survives without a match.
+    :ivar min_confidence: Best confidence a track needs to be reported.
+    """
+    # constant velocity model: state (cx, cy, s, r, vx, vy, vs)
+    F = np.eye(7)
+    F[0, 4] = F[1, 5] = F[2, 6] = 1
+    H = np.eye(4, 7)
+    Q = np.diag([1, 1, 1, 1, 0.01, 0.01, 0.0001]) * 1e-4
+    R = np.diag([1, 1, 10, 10]) * 1e-4
+
+    def __init__(self, iou_threshold: float = 0.3, min_hits: int = 3, max_age: int = 10,
+                 min_confidence: float = 0.0) -> None:
+        self.iou_threshold = iou_threshold
+        self.min_hits = min_hits
+        self.max_age = max_age
+        self.min_confidence = min_confidence
+        self._next_id = 1
+        self.state = np.zeros((0, 7))
+        self.covariance = np.zeros((0, 7, 7))
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.labels = np.zeros(0, dtype=np.int64)
+        self.confidence = np.zeros(0)
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.misses = np.zeros(0, dtype=np.int64)
+        self.reported = np.zeros(0, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def update(self, detections) -> list:
+        """
+        Advances the tracker by one frame.
+
+        :param detections: The detections of the frame, ``depthai.ImgDetection``
+            objects or a detection array.
+        :return: Confirmed tracks that were not marked as reported yet.
+        :rtype: list[ConfirmedTrack]
+        """
+        detections = yolo_decode.to_detection_array(detections)
+        boxes = np.stack((detections.xmin, detections.ymin, detections.xmax, detections.ymax),
+                         axis=1).astype(np.float64)
+        labels = detections.label.astype(np.int64)
+        scores = detections.confidence.astype(np.float64)
+
+        self._predict()
+        track_index, detection_index = self._match(boxes, labels)
+
+        # batched Kalman update of the matched tracks
+        if len(track_index):
+            self._correct(track_index, _to_state(boxes[detection_index]))
+            self.confidence[track_index] = np.maximum(self.confidence[track_index], scores[detection_index])
+            self.hits[track_index] += 1
+            self.misses[track_index] = 0
+
+        # unmatched detections start new tracks
+        unmatched = np.ones(len(boxes), dtype=bool)
+        unmatched[detection_index] = False
+        if unmatched.any():
+            self._spawn(boxes[unmatched], labels[unmatched], scores[unmatched])
+
+        # drop tracks that have not been seen for too long
+        alive = self.misses <= self.max_age
+        if not alive.all():
+            self._keep(alive)
+
+        # confirmed tracks stay candidates until they are marked as reported
+        confirmed = (~self.reported) & (self.hits >= self.min_hits) & (self.confidence >= self.min_confidence)
+        track_boxes = _to_boxes(self.state[confirmed])
+        return [ConfirmedTrack(int(track_id), int(label), float(confidence), *map(float, box))
+                for track_id, label, confidence, box in zip(self.ids[confirmed], self.labels[confirmed],
+                                                             self.confidence[confirmed], track_boxes)]
+
+    def mark_reported(self, track_ids) -> None:
+        """
+        Marks tracks as reported, they are not returned by :meth:`update`
+        again.
+
+        :param track_ids: Ids of the reported tracks.
+        :return: None
+        """
+        self.reported |= np.isin(self.ids, list(track_ids))
+
+    def _predict(self) -> None:
+        if not len(self.ids):
+            return
+        # keep the predicted area positive
+        shrinking = self.state[:, 2] + self.state[:, 6] <= 0
+        self.state[shrinking, 6] = 0
+        self.state = self.state @ self.F.T
+        self.covariance = self.F @ self.covariance @ self.F.T + self.Q
+        self.misses += 1
+
+    def _match(self, boxes: np.ndarray, labels: np.ndarray):
+        empty = np.zeros(0, dtype=np.int64)
+        if not len(self.ids) or not len(boxes):
+            return empty, empty
+        iou = iou_matrix(_to_boxes(self.state), boxes)
+        # tracks only match detections of their own class
+        iou[self.labels[:, None] != labels[None, :]] = 0
+        linear_sum_assignment = _linear_sum_assignment()
+        if linear_sum_assignment is not None:
+            rows, cols = linear_sum_assignment(-iou)
+        else:
+            rows, cols = self._greedy(iou)
+        valid = iou[rows, cols] >= self.iou_threshold
+        return rows[valid].astype(np.int64), cols[valid].astype(np.int64)
+
+    @staticmethod
+    def _greedy(iou: np.ndarray):
+        # highest IoU pairs first, each track and detection used once
+        order = np.argsort(-iou, axis=None)
+        rows, cols = np.unravel_index(order, iou.shape)
+        used_rows = np.zeros(iou.shape[0], dtype=bool)
+        used_cols = np.zeros(iou.shape[1], dtype=bool)
+        keep = []
+        for i, (row, col) in enumerate(zip(rows, cols)):
+            if iou[row, col] <= 0:
+                break
+            if not used_rows[row] and not used_cols[col]:
+                used_rows[row] = used_cols[col] = True
+                keep.append(i)
+        return rows[keep], cols[keep]
+
+    def _correct(self, index: np.ndarray, measurement: np.ndarray) -> None:
+        P = self.covariance[index]
+        x = self.state[index]
+        S = self.H @ P @ self.H.T + self.R
+        K = P @ self.H.T @ np.linalg.inv(S)
+        innovation = measurement - x @ self.H.T
+        self.state[index] = x + np.einsum("nij,nj->ni", K, innovation)
+        self.covariance[index] = (np.eye(7) - K @ self.H) @ P
+
+    def _spawn(self, boxes: np.ndarray, labels: np.ndarray, scores: np.ndarray) -> None:
+        count = len(boxes)
+        state = np.zeros((count, 7))
+        state[:, :4] = _to_state(boxes)
+        # large initial uncertainty on the unobserved velocities
+        covariance = np.tile(np.diag([1e-3, 1e-3, 1e-3, 1e-2, 1.0, 1.0, 1.0]), (count, 1, 1))
+        self.state = np.concatenate((self.state, state))
+        self.covariance = np.concatenate((self.covariance, covariance))
+        self.ids = np.concatenate((self.ids, np.arange(self._next_id, self._next_id + count)))
+        self._next_id += count
+        self.labels = np.concatenate((self.labels, labels))
+        self.confidence = np.concatenate((self.confidence, scores))
+        self.hits = np.concatenate((self.hits, np.ones(count, dtype=np.int64)))
+        self.misses = np.concatenate((self.misses, np.zeros(count, dtype=np.int64)))
+        self.reported = np.concatenate((self.reported, np.zeros(count, dtype=bool)))
+
+    def _keep(self, mask: np.ndarray) -> None:
+        self.state = self.state[mask]
+        self.covariance = self.covariance[mask]
+        self.ids = self.ids[mask]
+        self.labels = self.labels[mask]
+        self.confidence = self.confidence[mask]
+        self.hits = self.hits[mask]
+        self.misses = self.misses[mask]
+        self.reported = self.reported[mask]
@@ -1,13 +1,14 @@
 # import the necessary packages
 from cameraAI.detection import config
+from cameraAI.detection import yolo_decode
+from functools import lru_cache
 import json
 import numpy as np
 import cv2
 from pathlib import Path
-import depthai as dai
 
 
-def create_image_pipeline(config_path, model_path):
+def create_image_pipeline(config_path, model_path, in_flight=1):
    """
    Creates and configures a DepthAI pipeline for YOLO-based image detection.
 
@@ -25,11 +26,18 @@ def create_image_pipeline(config_path, model_path):
    :param model_path:
        Path to the model blob file containing the weights and trained parameters
        for the YOLO neural network.
+   :param in_flight:
+       Number of frames the host may queue on the detection network at once.
+       The network input blocks instead of dropping frames, so every image
+       sent is processed.
    :return:
        A configured DepthAI pipeline ready for execution with nodes set up for
        YOLO image detection.
    :rtype: dai.Pipeline
    """
+   # depthai is only needed to build device pipelines, the host-side
+   # inference backends can run on machines without it installed
+   import depthai as dai
    # initialize a depthai pipeline
    pipeline = dai.Pipeline()
    # load model config file and fetch nn_config parameters
@@ -74,7 +82,9 @@ def create_image_pipeline(config_path, model_path):
    detectionNetwork.setIouThreshold(iouThreshold)
    detectionNetwork.setBlobPath(model_path)
    detectionNetwork.setNumInferenceThreads(2)
-   detectionNetwork.input.setBlocking(False)
+   # images are sent by the host, so queue them instead of dropping
+   detectionNetwork.input.setBlocking(True)
+   detectionNetwork.input.setQueueSize(in_flight)
 
    print("[INFO] creating links...")
    # linking the nodes - image node output is linked to detection node
@@ -84,7 +94,65 @@ def create_image_pipeline(config_path, model_path):
    # return the pipeline to the calling function
    return pipeline
 
-def create_camera_pipeline(config_path, model_path):
+# runs on the device between the camera and the network, forwards every
+# `interval`-th preview frame, the interval is sent by the host to the
+# "control" input; forwarded frames are numbered consecutively so skipped
+# frames are not counted as dropped by the host
+RATE_CONTROL_SCRIPT = """
+interval = 1
+count = 0
+sent = 0
+while True:
+    control = node.io["control"].tryGet()
+    if control is not None:
+        data = control.getData()
+        interval = max(1, data[0] | data[1] << 8)
+    frame = node.io["frames"].get()
+    if count % interval == 0:
+        frame.setSequenceNum(sent)
+        node.io["nn"].send(frame)
+        sent += 1
+    count += 1
+"""
+
+# tiled variant of the rate control script: every forwarded full resolution
+# frame is cropped into the tiles by an ImageManip in front of the network,
+# all tiles keep the sequence number of the frame; the preview frame for the
+# host is scaled from the same frame by a second ImageManip
+TILING_SCRIPT = """
+interval = 1
+count = 0
+sent = 0
+while True:
+    control = node.io["control"].tryGet()
+    if control is not None:
+        data = control.getData()
+        interval = max(1, data[0] | data[1] << 8)
+    frame = node.io["frames"].get()
+    count += 1
+    if (count - 1) % interval:
+        continue
+    frame.setSequenceNum(sent)
+    sent += 1
+    for xmin, ymin, xmax, ymax in ROIS:
+        cfg = ImageManipConfig()
+        cfg.setCropRect(xmin, ymin, xmax, ymax)
+        cfg.setResize(WIDTH, HEIGHT)
+        cfg.setKeepAspectRatio(False)
+        cfg.setFrameType(ImgFrame.Type.BGR888p)
+        node.io["tile_cfg"].send(cfg)
+        node.io["tile_img"].send(frame)
+    if PREVIEW:
+        cfg = ImageManipConfig()
+        cfg.setResize(WIDTH, HEIGHT)
+        cfg.setKeepAspectRatio(False)
+        cfg.setFrameType(ImgFrame.Type.BGR888p)
+        node.io["preview_cfg"].send(cfg)
+        node.io["preview_img"].send(frame)
+"""
+
+def create_camera_pipeline(config_path, model_path, video_encoder=None, rgb_output=True, rate_control=False,
+                           tiles=None):
    """
    Creates and configures a DepthAI pipeline utilizing an OAK camera for object
    detection. The function initializes a depthai pipeline, sets up sources,
@@ -101,11 +169,32 @@ def create_camera_pipeline(config_path, model_path):
        DepthAI.
    :type model_path: str
 
+   :param video_encoder: "h264" or "mjpeg" to encode the full resolution
+       camera video on the device and send the bitstream to the "video"
+       output, or None to only output the preview frames.
+   :type video_encoder: str
+
+   :param rgb_output: Send the preview frames the network ran on to the
+       "rgb" output. Without it only the detections cross the USB link.
+   :type rgb_output: bool
+
+   :param rate_control: Run the network on every n-th preview frame only,
+       n is sent to the "control" input at runtime (see
+       ``motion_scheduler.MotionScheduler``).
+   :type rate_control: bool
+
+   :param tiles: Tile regions (xmin, ymin, xmax, ymax normalized to the
+       full resolution frame, see ``tiling.tile_rois``) to run the network on
+       instead of the scaled down preview, or None. The "nn" output then has
+       one detections message per tile, merged by ``tiling.TileMerger``.
+   :type tiles: numpy.ndarray
+
    :return: A depthai.Pipeline object that is ready to be used with a DepthAI
        device. The pipeline includes a camera source, a YOLO object detection
        network, and the required data outputs for frames and detections.
    :rtype: dai.Pipeline
    """
+   import depthai as dai
    # initialize a depthai pipeline
    pipeline = dai.Pipeline()
    # load model config file and fetch nn_config parameters
@@ -135,13 +224,14 @@ def create_camera_pipeline(config_path, model_path):
    camRgb = pipeline.create(dai.node.ColorCamera)
    # create a Yolo detection node
    detectionNetwork = pipeline.create(dai.node.YoloDetectionNetwork)
-   xoutRgb = pipeline.create(dai.node.XLinkOut)
    # create a XLinkOut node for getting the detection results to host
    nnOut = pipeline.create(dai.node.XLinkOut)
    print("[INFO] setting stream names for queues...")
    # set stream names used in queue to fetch data when the pipeline is started
-   xoutRgb.setStreamName("rgb")
    nnOut.setStreamName("nn")
+   if rgb_output:
+       xoutRgb = pipeline.create(dai.node.XLinkOut)
+       xoutRgb.setStreamName("rgb")
 
    print("[INFO] setting camera properties...")
    # setting camera properties like the output preview size,
@@ -150,7 +240,24 @@ def create_camera_pipeline(config_path, model_path):
    camRgb.setResolution(dai.ColorCameraProperties.SensorResolution.THE_1080_P)
    camRgb.setInterleaved(False)
    camRgb.setColorOrder(dai.ColorCameraProperties.ColorOrder.BGR)
-   camRgb.setFps(40)
+   camRgb.setFps(config.CAMERA_FPS)
+
+   if video_encoder is not None:
+       print("[INFO] configuring {} video encoder...".format(video_encoder))
+       # the hardware encoder compresses the camera video on the device,
+       # only the bitstream is sent to the host for recording
+       profiles = {
+           "h264": dai.VideoEncoderProperties.Profile.H264_MAIN,
+           "mjpeg": dai.VideoEncoderProperties.Profile.MJPEG,
+       }
+       videoEncoder = pipeline.create(dai.node.VideoEncoder)
+       videoEncoder.setDefaultProfilePreset(config.CAMERA_FPS, profiles[video_encoder])
+       # a keyframe every second, segments are rotated on keyframes
+       videoEncoder.setKeyframeFrequency(config.CAMERA_FPS)
+       xoutVideo = pipeline.create(dai.node.XLinkOut)
+       xoutVideo.setStreamName("video")
+       camRgb.video.link(videoEncoder.input)
+       videoEncoder.bitstream.link(xoutVideo.input)
 
    print("[INFO] setting YOLO network properties...")
    # network specific settings - parameters read from config file
@@ -163,16 +270,68 @@ def create_camera_pipeline(config_path, model_path):
    detectionNetwork.setAnchorMasks(anchorMasks)
    detectionNetwork.setIouThreshold(iouThreshold)
    detectionNetwork.setBlobPath(model_path)
-   detectionNetwork.setNumInferenceThreads(2)
-   detectionNetwork.input.setBlocking(False)
+   if tiles is None:
+       detectionNetwork.setNumInferenceThreads(2)
+       detectionNetwork.input.setBlocking(False)
+   else:
+       # a single inference thread on both compute engines keeps the tiles
+       # of a frame in order, and none of them may be dropped
+       detectionNetwork.setNumInferenceThreads(1)
+       detectionNetwork.setNumNCEPerInferenceThread(2)
+       detectionNetwork.input.setBlocking(True)
+       detectionNetwork.input.setQueueSize(len(tiles))
    print("[INFO] creating links...")
    # linking the nodes - camera stream output is linked to detection node
    # RGB frame is passed through detection node linked with XLinkOut
    # used for annotating the frame with detection output
    # detection network node output is linked to XLinkOut input
-   camRgb.preview.link(detectionNetwork.input)
+   if tiles is not None:
+       print("[INFO] configuring {} detection tiles...".format(len(tiles)))
+       width, height = config.CAMERA_PREV_DIM
+       tiling = pipeline.create(dai.node.Script)
+       tiling.setScript("ROIS = {}\nWIDTH, HEIGHT = {}, {}\nPREVIEW = {}\n".format(
+           [tuple(float(value) for value in roi) for roi in tiles], width, height, rgb_output) + TILING_SCRIPT)
+       tiling.inputs["frames"].setBlocking(False)
+       tiling.inputs["frames"].setQueueSize(1)
+       camRgb.video.link(tiling.inputs["frames"])
+       if rate_control:
+           controlIn = pipeline.create(dai.node.XLinkIn)
+           controlIn.setStreamName("control")
+           controlIn.out.link(tiling.inputs["control"])
+       tileManip = pipeline.create(dai.node.ImageManip)
+       tileManip.setWaitForConfigInput(True)
+       tileManip.setMaxOutputFrameSize(width * height * 3)
+       tileManip.inputImage.setQueueSize(len(tiles))
+       tileManip.inputConfig.setQueueSize(len(tiles))
+       tiling.outputs["tile_cfg"].link(tileManip.inputConfig)
+       tiling.outputs["tile_img"].link(tileManip.inputImage)
+       tileManip.out.link(detectionNetwork.input)
+       if rgb_output:
+           previewManip = pipeline.create(dai.node.ImageManip)
+           previewManip.setWaitForConfigInput(True)
+           previewManip.setMaxOutputFrameSize(width * height * 3)
+           tiling.outputs["preview_cfg"].link(previewManip.inputConfig)
+           tiling.outputs["preview_img"].link(previewManip.inputImage)
+           previewManip.out.link(xoutRgb.input)
+   elif rate_control:
+       print("[INFO] configuring inference rate control...")
+       # the script forwards the preview frames the network should run on,
+       # it always takes the latest frame
+       rateControl = pipeline.create(dai.node.Script)
+       rateControl.setScript(RATE_CONTROL_SCRIPT)
+       rateControl.inputs["frames"].setBlocking(False)
+       rateControl.inputs["frames"].setQueueSize(1)
+       controlIn = pipeline.create(dai.node.XLinkIn)
+       controlIn.setStreamName("control")
+       controlIn.out.link(rateControl.inputs["control"])
+       camRgb.preview.link(rateControl.inputs["frames"])
+       rateControl.outputs["nn"].link(detectionNetwork.input)
+   else:
+       camRgb.preview.link(detectionNetwork.input)
 
-   detectionNetwork.passthrough.link(xoutRgb.input)
+   # the tiled pipeline sends the scaled frame instead of the passthrough
+   if rgb_output and tiles is None:
+       detectionNetwork.passthrough.link(xoutRgb.input)
    detectionNetwork.out.link(nnOut.input)
    # return the pipeline to the calling function
    return pipeline
@@ -203,37 +362,57 @@ def annotateFrame(frame, detections, model_name):
    Annotates a given video or image frame with detection results including the model name,
    class labels, confidence scores, and bounding boxes around detected objects.
 
-   This function processes each detection in the provided frame by normalizing bounding
-   box coordinates, adding text annotations for model name, detection class, confidence
-   percentage, and drawing a bounding box around objects. The annotations are styled
-   with red color for better visibility.
+   All boxes of the frame are scaled to pixels in one operation (see
+   ``frameNormBatch``), the model name is drawn once per frame and the label
+   texts use precomputed sizes to stay inside the frame. The annotations are
+   styled with red color for better visibility.
 
    :param frame: The video or image frame to annotate.
    :type frame: numpy.ndarray
-   :param detections: A list of detection objects. Each detection contains details
-                      about the bounding box, confidence score, and class label.
-   :type detections: list[detection]
+   :param detections: The detections of the frame, a detection array or a list of
+                      detection objects with the bounding box, confidence score and
+                      class label.
+   :type detections: numpy.recarray | list[detection]
    :param model_name: The name of the model used for predictions, which will be displayed
                       on the annotated frame.
    :type model_name: str
    :return: The annotated frame with all detection results visualized.
    :rtype: numpy.ndarray
    """
-   # loops over all detections in a given frame
-   # annotates the frame with model name, class label,
-   # confidence score, and draw bounding box on the object
+   detections = yolo_decode.to_detection_array(detections)
+   if not len(detections):
+     return frame
+   # annotates the frame with model name once, then class label,
+   # confidence score, and a bounding box for every object
    color = (0, 0, 255)
-   for detection in detections:
-     bbox = frameNorm(frame, (detection.xmin, detection.ymin, detection.xmax, detection.ymax))
-     cv2.putText(frame, model_name, (20, 40), cv2.FONT_HERSHEY_TRIPLEX, 1,
-                 color)
-     cv2.putText(frame, config.LABELS[detection.label], (bbox[0] + 10, bbox[1] + 25), cv2.FONT_HERSHEY_TRIPLEX, 1,
-                 color)
-     cv2.putText(frame, f"{int(detection.confidence * 100)}%", (bbox[0] + 10, bbox[1] + 60),
-                 cv2.FONT_HERSHEY_TRIPLEX, 1, color)
-     cv2.rectangle(frame, (bbox[0], bbox[1]), (bbox[2], bbox[3]), color, 2)
+   width = frame.shape[1]
+   boxes = frameNormBatch(frame, detectionBoxes(detections))
+   percents = np.clip((detections.confidence * 100).astype(int), 0, 100)
+   cv2.putText(frame, model_name, (20, 40), cv2.FONT_HERSHEY_TRIPLEX, 1, color)
+   for (x1, y1, x2, y2), label, percent in zip(boxes.tolist(), detections.label.tolist(), percents.tolist()):
+     text = config.LABELS[label]
+     # keep the label inside the frame for boxes at the right edge
+     x = max(0, min(x1 + 10, width - labelTextSize(text)[0]))
+     cv2.putText(frame, text, (x, y1 + 25), cv2.FONT_HERSHEY_TRIPLEX, 1, color)
+     cv2.putText(frame, PERCENT_TEXT[percent], (x, y1 + 60), cv2.FONT_HERSHEY_TRIPLEX, 1, color)
+     cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
    return frame
 
+# confidence texts are the same for every frame, build them once
+PERCENT_TEXT = ["{}%".format(percent) for percent in range(101)]
+
+@lru_cache(maxsize=None)
+def labelTextSize(text):
+   """
+   Returns the (width, height) in pixels of a label drawn by ``annotateFrame``,
+   computed once per label.
+
+   :param text: The label text.
+   :type text: str
+   :rtype: tuple[int, int]
+   """
+   return cv2.getTextSize(text, cv2.FONT_HERSHEY_TRIPLEX, 1, 1)[0]
+
 def to_planar(arr: np.ndarray, shape: tuple) -> np.ndarray:
    """
    Resize the given NumPy array to the specified shape and modify its channel
@@ -268,4 +447,31 @@ def frameNorm(frame, bbox):
    # normalized them with frame width/height
    normVals = np.full(len(bbox), frame.shape[0])
    normVals[::2] = frame.shape[1]
-   return (np.clip(np.array(bbox), 0, 1) * normVals).astype(int)
\ No newline at end of file
+   return (np.clip(np.array(bbox), 0, 1) * normVals).astype(int)
+
+
+def detectionBoxes(detections):
+   """
+   Collects the bounding boxes of all detections of a frame in one array.
+
+   :param detections: A detection array or a list of detection objects.
+   :return: Array of shape (N, 4) with (xmin, ymin, xmax, ymax) in the <0..1> range.
+   :rtype: numpy.ndarray
+   """
+   detections = yolo_decode.to_detection_array(detections)
+   return np.stack((detections.xmin, detections.ymin, detections.xmax, detections.ymax), axis=1)
+
+
+def frameNormBatch(frame, boxes):
+   """
+   Scales all normalized bounding boxes of a frame to pixel coordinates at once,
+   the batched form of ``frameNorm``.
+
+   :param frame: The input frame, typically as a NumPy array representing an image.
+   :param boxes: Array of shape (N, 4) with boxes in the <0..1> range.
+   :return: Integer array of shape (N, 4) with the boxes in pixels.
+   :rtype: numpy.ndarray
+   """
+   height, width = frame.shape[:2]
+   scale = np.array((width, height, width, height), dtype=np.float32)
+   return (np.clip(boxes, 0, 1) * scale).astype(int)
@@ -0,0 +1,218 @@
+# import the necessary packages
+import numpy as np
+
+# one row per detection; the field names match depthai.ImgDetection so the
+# records can be used by utils.annotateFrame and the camera loop directly
+DETECTION_DTYPE = np.dtype([
+    ("image", np.int32),
+    ("label", np.int32),
+    ("confidence", np.float32),
+    ("xmin", np.float32),
+    ("ymin", np.float32),
+    ("xmax", np.float32),
+    ("ymax", np.float32),
+])
+
+
+def empty_detections() -> np.recarray:
+    """
+    Returns an empty detection array.
+
+    :return: A record array of length 0 with ``DETECTION_DTYPE``.
+    :rtype: numpy.recarray
+    """
+    return np.recarray(0, dtype=DETECTION_DTYPE)
+
+
+def to_detection_array(detections) -> np.recarray:
+    """
+    Converts detections to a detection array.
+
+    :param detections: A detection array, or a sequence of objects with the
+        ``depthai.ImgDetection`` attributes (label, confidence, xmin, ymin,
+        xmax, ymax).
+    :return: A record array with ``DETECTION_DTYPE``. Detection arrays are
+        returned unchanged.
+    :rtype: numpy.recarray
+    """
+    if isinstance(detections, np.ndarray) and detections.dtype == DETECTION_DTYPE:
+        return detections.view(np.recarray)
+    array = np.recarray(len(detections), dtype=DETECTION_DTYPE)
+    array[:] = [(0, d.label, d.confidence, d.xmin, d.ymin, d.xmax, d.ymax) for d in detections]
+    return array
+
+
+def xywh_to_xyxy(boxes: np.ndarray) -> np.ndarray:
+    """
+    Converts boxes from center x, center y, width, height to corner format.
+
+    :param boxes: Array of shape (..., 4) in (cx, cy, w, h) format.
+    :type boxes: numpy.ndarray
+    :return: Array of shape (..., 4) in (x1, y1, x2, y2) format.
+    :rtype: numpy.ndarray
+    """
+    half = boxes[..., 2:] / 2
+    return np.concatenate((boxes[..., :2] - half, boxes[..., :2] + half), axis=-1)
+
+
+def box_iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """
+    Computes the IoU between one box and an array of boxes.
+
+    :param box: Array of shape (4,) in (x1, y1, x2, y2) format.
+    :param boxes: Array of shape (K, 4) in (x1, y1, x2, y2) format.
+    :return: Array of shape (K,) with the IoU of every box with ``box``.
+    :rtype: numpy.ndarray
+    """
+    xx1 = np.maximum(box[0], boxes[:, 0])
+    yy1 = np.maximum(box[1], boxes[:, 1])
+    xx2 = np.minimum(box[2], boxes[:, 2])
+    yy2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return intersection / np.maximum(area + areas - intersection, 1e-9)
+
+
+def batched_nms(boxes: np.ndarray, scores: np.ndarray, groups: np.ndarray, iou_threshold: float,
+                images: np.ndarray | None = None, max_per_image: int | None = None) -> np.ndarray:
+    """
+    Greedy non-maximum suppression applied independently per group.
+
+    Boxes of different groups (e.g. different images or classes) are shifted
+    apart by a per-group offset so they can never overlap, which lets a single
+    NMS pass handle every group at once. The loop runs once per *kept* box,
+    every IoU computation against the remaining candidates is vectorized.
+
+    :param boxes: Array of shape (K, 4) in (x1, y1, x2, y2) format.
+    :param scores: Array of shape (K,) with the box scores.
+    :param groups: Integer array of shape (K,), boxes are only suppressed by
+        boxes of the same group.
+    :param iou_threshold: Boxes with an IoU above this value are suppressed.
+    :param images: Optional image index per box, used with ``max_per_image``.
+    :param max_per_image: Stop keeping boxes for an image once it has this
+        many, its remaining candidates are dropped without further work.
+    :return: Indices of the kept boxes, ordered by decreasing score.
+    :rtype: numpy.ndarray
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+    offset = (boxes.max() - boxes.min() + 1) * groups.astype(boxes.dtype)
+    shifted = boxes + offset[:, None]
+    order = np.argsort(-scores, kind="stable")
+    limit = images is not None and max_per_image is not None
+    kept_per_image = np.zeros(int(images.max()) + 1 if limit else 0, dtype=np.int64)
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        order = rest[box_iou(shifted[i], shifted[rest]) <= iou_threshold]
+        if limit:
+            kept_per_image[images[i]] += 1
+            if kept_per_image[images[i]] >= max_per_image:
+                order = order[images[order] != images[i]]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def decode_yolov8(output: np.ndarray, input_size: tuple, confidence_threshold: float = 0.5,
+                  iou_threshold: float = 0.5, max_detections: int = 300,
+                  max_candidates: int = 3000) -> np.recarray:
+    """
+    Decodes raw YOLOv8 output into detections, fully vectorized over the batch.
+
+    The raw output holds, per anchor, the box as center x, center y, width and
+    height in input pixels followed by one score per class (YOLOv8 has no
+    separate objectness score). Decoding takes the best class per anchor,
+    drops anchors below the confidence threshold, converts the boxes to
+    normalized corner coordinates and runs per-image, per-class NMS.
+
+    :param output: Raw model output of shape (N, 4 + classes, anchors), or
+        (4 + classes, anchors) for a single image.
+    :type output: numpy.ndarray
+    :param input_size: Model input size as a (width, height) tuple, used to
+        normalize the boxes to the <0..1> range.
+    :param confidence_threshold: Minimum class score for a detection.
+    :param iou_threshold: IoU threshold for non-maximum suppression.
+    :param max_detections: Maximum number of detections kept per image.
+    :param max_candidates: Maximum number of candidates per image passed to
+        NMS, the highest scoring ones are kept.
+    :return: A record array with ``DETECTION_DTYPE``, sorted by image and by
+        decreasing confidence within an image. The ``image`` field holds the
+        index of the image in the batch.
+    :rtype: numpy.recarray
+    """
+    if output.ndim == 2:
+        output = output[None]
+    width, height = input_size
+
+    # best class per anchor: (N, C, A) -> (N, A)
+    class_scores = output[:, 4:, :]
+    labels = class_scores.argmax(axis=1)
+    confidences = np.take_along_axis(class_scores, labels[:, None, :], axis=1)[:, 0, :]
+
+    # keep only the highest scoring anchors of every image before masking,
+    # so NMS never sees more than max_candidates boxes per image
+    if confidences.shape[1] > max_candidates:
+        top = np.argpartition(-confidences, max_candidates, axis=1)[:, :max_candidates]
+        mask = np.zeros(confidences.shape, dtype=bool)
+        np.put_along_axis(mask, top, True, axis=1)
+        mask &= confidences >= confidence_threshold
+    else:
+        mask = confidences >= confidence_threshold
+
+    # threshold masking, the surviving candidates are flattened over the batch
+    images, anchors = np.nonzero(mask)
+    if images.size == 0:
+        return empty_detections()
+    scores = confidences[images, anchors]
+    labels = labels[images, anchors]
+
+    # (cx, cy, w, h) in input pixels -> normalized (x1, y1, x2, y2)
+    boxes = xywh_to_xyxy(output[images, :4, anchors])
+    boxes /= np.array([width, height, width, height], dtype=boxes.dtype)
+
+    # one NMS pass over all images and classes at once
+    num_classes = class_scores.shape[1]
+    keep = batched_nms(boxes, scores, images * num_classes + labels, iou_threshold,
+                       images=images, max_per_image=max_detections)
+    # keep is ordered by score, a stable sort on the image index keeps that
+    # order within every image
+    keep = keep[np.argsort(images[keep], kind="stable")]
+
+    detections = np.recarray(keep.size, dtype=DETECTION_DTYPE)
+    detections.image = images[keep]
+    detections.label = labels[keep]
+    detections.confidence = scores[keep]
+    detections.xmin = boxes[keep, 0]
+    detections.ymin = boxes[keep, 1]
+    detections.xmax = boxes[keep, 2]
+    detections.ymax = boxes[keep, 3]
+    return detections
+
+
+def split_by_image(detections: np.recarray, num_images: int) -> list:
+    """
+    Splits a batch of decoded detections into one array per image.
+
+    :param detections: Output of :func:`decode_yolov8`, sorted by image.
+    :param num_images: Number of images in the batch.
+    :return: A list of ``num_images`` record arrays (views, no copies).
+    :rtype: list[numpy.recarray]
+    """
+    bounds = np.searchsorted(detections.image, np.arange(num_images + 1))
+    return [detections[bounds[i]:bounds[i + 1]] for i in range(num_images)]
+
+
+def nn_data_to_output(nn_data, num_classes: int) -> np.ndarray:
+    """
+    Reshapes the raw output of a generic depthai ``NeuralNetwork`` node.
+
+    :param nn_data: The ``depthai.NNData`` message returned by the node.
+    :param num_classes: Number of classes the model predicts.
+    :return: Raw model output of shape (1, 4 + classes, anchors), ready for
+        :func:`decode_yolov8`.
+    :rtype: numpy.ndarray
+    """
+    layer = np.asarray(nn_data.getFirstLayerFp16(), dtype=np.float32)
+    return layer.reshape(1, 4 + num_classes, -1)
@@ -13,12 +13,19 @@ class DetectionRecordDto:
         geographic coordinates of the detection.
     :ivar location: A textual description of the location of detection.
     :ivar time: Datetime object indicating when the detection occurred.
+    :ivar idempotency_key: Unique key of the detection, lets the server
+        discard duplicates when an upload is retried. Optional.
+    :ivar camera_id: Identifies the camera of the vehicle that made the
+        detection, e.g. "left" or "right". Optional.
     """
-    def __init__(self, type_of_trash: str, coordinates: tuple[float, float], location: str, time: datetime.datetime) -> None:
+    def __init__(self, type_of_trash: str, coordinates: tuple[float, float], location: str, time: datetime.datetime,
+                 idempotency_key: str | None = None, camera_id: str | None = None) -> None:
         self.typeOfTrash = type_of_trash
         self.coordinates = coordinates
         self.location = location
         self.time = time
+        self.idempotency_key = idempotency_key
+        self.camera_id = camera_id
 
     def to_dict(self):
         """
@@ -27,16 +34,22 @@ class DetectionRecordDto:
         This method creates and returns a dictionary containing specific attributes
         of the class, such as 'typeOfTrash', 'coordinates', 'location', and 'time'.
         The 'time' attribute will be serialized into an ISO 8601 string format to
-        ensure JSON-compatible data output.
+        ensure JSON-compatible data output. The idempotency key is included
+        as 'idempotencyKey' and the camera id as 'cameraId' when they are set.
 
         :return: A dictionary representing the object's data with attributes
             properly serialized, including 'typeOfTrash', 'coordinates',
             'location', and 'time'.
         :rtype: dict
         """
-        return {
+        data = {
             "typeOfTrash": self.typeOfTrash,
             "Coordinates": self.coordinates,
             "Location": self.location,
             "Time": self.time.isoformat()  # JSON-serialiseerbare tijd
         }
+        if self.idempotency_key is not None:
+            data["idempotencyKey"] = self.idempotency_key
+        if self.camera_id is not None:
+            data["cameraId"] = self.camera_id
+        return data
@@ -1,15 +1,63 @@
-import requests
+import threading
 import os
 from dotenv import load_dotenv
+from cameraAI.external_api.geocode_cache import GeocodeCache
+from cameraAI import metrics
 
 # Load in the environment secrets
 load_dotenv()
 API_KEY = os.getenv("GOOGLE_API_KEY")
-if not API_KEY:
-    raise ValueError("API key niet gevonden. Voeg GOOGLE_API_KEY toe.")
+
+# Addresses are cached per H3 cell, in memory and in an SQLite file that
+# survives restarts. Set GEOCODE_CACHE_PATH to an empty value to keep the
+# cache in memory only. The cache is opened on the first lookup.
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", "geocode_cache.sqlite3")
+GEOCODE_CACHE_RESOLUTION = int(os.getenv("GEOCODE_CACHE_RESOLUTION", "11"))
+GEOCODE_CACHE_TTL = float(os.getenv("GEOCODE_CACHE_TTL", str(30 * 24 * 3600)))
+# (connect, read) timeout in seconds of a Geocoding API request, so a stalled
+# connection cannot hold up the upload worker.
+GEOCODE_TIMEOUT = (float(os.getenv("GEOCODE_CONNECT_TIMEOUT", "5")), float(os.getenv("GEOCODE_READ_TIMEOUT", "10")))
+
+_geocode_cache: GeocodeCache | None = None
+_geocode_cache_lock = threading.Lock()
+
+
+def get_geocode_cache() -> GeocodeCache:
+    """
+    Returns the shared geocode cache, opening it on first use.
+
+    :return: The geocode cache.
+    :rtype: GeocodeCache
+    """
+    global _geocode_cache
+    with _geocode_cache_lock:
+        if _geocode_cache is None:
+            _geocode_cache = GeocodeCache(path=GEOCODE_CACHE_PATH, resolution=GEOCODE_CACHE_RESOLUTION,
+                                          ttl=GEOCODE_CACHE_TTL,
+                                          on_lookup=lambda result: metrics.GEOCODE_CACHE.labels(result).inc())
+        return _geocode_cache
 
 
 def get_address_from_coordinates(lat: float,lng: float) -> str:
+    """
+    Get a formatted address from geographic coordinates, using the geocode cache.
+
+    Coordinates that fall in an H3 cell that was geocoded before are answered
+    from the cache, only misses are sent to the Google Geocoding API.
+
+    :param lat: Latitude of the location for which the address is being searched.
+    :type lat: float
+    :param lng: Longitude of the location for which the address is being searched.
+    :type lng: float
+    :return: The formatted address corresponding to the provided latitude and longitude.
+    :rtype: str
+    :raises Exception: If the Geocoding API operation fails or an address cannot be
+        retrieved from the response.
+    """
+    return get_geocode_cache().get_or_fetch(lat, lng, fetch_address_from_coordinates)
+
+
+def fetch_address_from_coordinates(lat: float,lng: float) -> str:
     """
     Get a formatted address from geographic coordinates using Google's Geocoding API.
 
@@ -24,13 +72,19 @@ def get_address_from_coordinates(lat: float,lng: float) -> str:
     :type lng: float
     :return: The formatted address corresponding to the provided latitude and longitude.
     :rtype: str
+    :raises ValueError: If GOOGLE_API_KEY is not set.
+    :raises requests.Timeout: If the API does not answer within ``GEOCODE_TIMEOUT``.
     :raises Exception: If the Geocoding API operation fails or an address cannot be
         retrieved from the response.
     """
+    if not API_KEY:
+        raise ValueError("API key niet gevonden. Voeg GOOGLE_API_KEY toe.")
+    import requests
     url = "https://maps.googleapis.com/maps/api/geocode/json"
 
     params = {"latlng": f"{lat},{lng}", "key": API_KEY}
-    response = requests.get(url, params=params)
+    with metrics.GEOCODE_SECONDS.time():
+        response = requests.get(url, params=params, timeout=GEOCODE_TIMEOUT)
     data = response.json()
     if data["status"] == "OK" and data["results"]:
         return data["results"][0]["formatted_address"]
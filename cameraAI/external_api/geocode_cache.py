@@ -0,0 +1,171 @@
+from collections import OrderedDict
+import threading
+import sqlite3
+import time
+import h3
+
+
+class GeocodeCache:
+    """
+    Two-tier cache for reverse-geocoded addresses, keyed on an H3 cell.
+
+    Coordinates are quantized to an H3 cell, so every detection within the
+    same cell (about 25 m across at resolution 11) shares one address. The
+    first tier is an in-memory LRU, the second an SQLite file that survives
+    restarts. Entries expire after ``ttl`` seconds in both tiers; expired
+    entries are removed when the cache is opened and then every
+    ``purge_interval`` seconds, so the file does not grow without bound.
+
+    :ivar resolution: H3 resolution used to quantize the coordinates.
+    :ivar max_entries: Maximum number of entries kept in memory.
+    :ivar ttl: Time in seconds after which an address is fetched again.
+    :ivar purge_interval: Seconds between two removals of expired entries.
+    :ivar on_lookup: Optional function called with "hits", "disk_hits" or
+        "misses" after every lookup, e.g. to count them in a metric.
+    :ivar hits: Number of lookups answered from memory.
+    :ivar disk_hits: Number of lookups answered from the SQLite file.
+    :ivar misses: Number of lookups that had to be fetched.
+    """
+    def __init__(self, path: str | None = None, resolution: int = 11, max_entries: int = 4096,
+                 ttl: float = 30 * 24 * 3600, purge_interval: float = 3600.0, on_lookup=None) -> None:
+        self.resolution = resolution
+        self.on_lookup = on_lookup
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS addresses (cell TEXT PRIMARY KEY, address TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self._db.commit()
+        self.purge_expired()
+
+    def key(self, lat: float, lng: float) -> str:
+        """
+        Returns the H3 cell the coordinates fall in.
+
+        :param lat: Latitude in decimal degrees.
+        :param lng: Longitude in decimal degrees.
+        :return: The H3 cell index.
+        :rtype: str
+        """
+        return h3.latlng_to_cell(lat, lng, self.resolution)
+
+    def get(self, lat: float, lng: float) -> str | None:
+        """
+        Looks up the cached address for the coordinates.
+
+        :param lat: Latitude in decimal degrees.
+        :param lng: Longitude in decimal degrees.
+        :return: The cached address, or None if it is missing or expired.
+        :rtype: str | None
+        """
+        address, result = self._lookup(self.key(lat, lng))
+        if self.on_lookup is not None:
+            self.on_lookup(result)
+        return address
+
+    def _lookup(self, cell: str) -> tuple:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(cell)
+            if entry is not None and entry[1] > now:
+                self._memory.move_to_end(cell)
+                self.hits += 1
+                return entry[0], "hits"
+            if self._db is not None:
+                row = self._db.execute("SELECT address, expires FROM addresses WHERE cell = ?", (cell,)).fetchone()
+                if row is not None and row[1] > now:
+                    self._remember(cell, row[0], row[1])
+                    self.disk_hits += 1
+                    return row[0], "disk_hits"
+            self.misses += 1
+            return None, "misses"
+
+    def put(self, lat: float, lng: float, address: str) -> None:
+        """
+        Stores the address for the cell of the coordinates in both tiers.
+
+        :param lat: Latitude in decimal degrees.
+        :param lng: Longitude in decimal degrees.
+        :param address: The address to store.
+        :return: None
+        """
+        cell = self.key(lat, lng)
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._remember(cell, address, expires)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO addresses (cell, address, expires) VALUES (?, ?, ?)",
+                                 (cell, address, expires))
+                self._db.commit()
+        if time.time() >= self._next_purge:
+            self.purge_expired()
+
+    def get_or_fetch(self, lat: float, lng: float, fetch) -> str:
+        """
+        Returns the cached address, fetching and storing it on a miss.
+
+        :param lat: Latitude in decimal degrees.
+        :param lng: Longitude in decimal degrees.
+        :param fetch: Function called with (lat, lng) on a miss. Exceptions
+            are passed on and nothing is cached.
+        :return: The address.
+        :rtype: str
+        """
+        address = self.get(lat, lng)
+        if address is None:
+            address = fetch(lat, lng)
+            self.put(lat, lng, address)
+        return address
+
+    def purge_expired(self) -> None:
+        """
+        Removes expired entries from both tiers.
+
+        :return: None
+        """
+        now = time.time()
+        with self._lock:
+            self._next_purge = now + self.purge_interval
+            for cell in [cell for cell, entry in self._memory.items() if entry[1] <= now]:
+                del self._memory[cell]
+            if self._db is not None:
+                self._db.execute("DELETE FROM addresses WHERE expires <= ?", (now,))
+                self._db.commit()
+
+    def stats(self) -> dict:
+        """
+        Returns the hit and miss counters.
+
+        :return: Dictionary with the memory hits, disk hits, misses, hit
+            ratio and the number of entries in memory.
+        :rtype: dict
+        """
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "entries": len(self._memory),
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, cell: str, address: str, expires: float) -> None:
+        self._memory[cell] = (address, expires)
+        self._memory.move_to_end(cell)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
@@ -2,18 +2,231 @@ from cameraAI.hardware import gps_manager
 from cameraAI.sender import send_to_api
 from cameraAI.detection import config
 from cameraAI.detection import utils
+from cameraAI.detection import yolo_decode
+from cameraAI.detection import model_artifacts
+from cameraAI.detection import tiling
+from cameraAI import metrics
+from cameraAI.detection.throttle import DetectionThrottle
+from cameraAI.detection.report_index import ReportIndex
+from cameraAI.detection.tracker import SortTracker
+from cameraAI.hardware.sinks import DisplaySink, SharedDisplay
+from cameraAI.hardware.message_sync import MessageSynchronizer
+from cameraAI.hardware.motion_scheduler import MotionScheduler
+from cameraAI.hardware.video_recorder import AsyncVideoWriter, BitstreamRecorder
 import cv2
-import depthai as dai
 from imutils.video import FPS
+from pathlib import Path
+import threading
 import time
 
-def main():
+
+def open_device(replay_path=None, realtime=True, video_encoder=None, device_info=None, model_path=None,
+                rgb_output=True, rate_control=False, tiles=None, gps_data=None):
+    """
+    Opens the device that produces the "rgb" and "nn" output queues.
+
+    With the default "depthai" backend this builds the camera pipeline and
+    opens the OAK device. With a host backend ("onnxruntime" or "openvino")
+    frames are read from ``config.CAMERA_SOURCE`` and inference runs on the
+    host CPU, so no OAK device is needed. When a recorded session is given it
+    is replayed instead, including its GPS fixes.
+
+    :param replay_path: Path of a session file to replay, or None.
+    :param realtime: Replay at the recorded pace instead of at maximum speed.
+    :param video_encoder: "h264" or "mjpeg" to add a "video" output with the
+        camera video encoded on the OAK device, or None.
+    :param device_info: ``dai.DeviceInfo`` of the OAK camera to open, or
+        None for the first one found.
+    :param model_path: The blob to load, resolved from the model config when
+        omitted.
+    :param rgb_output: Provide the "rgb" queue; without it only detections
+        are sent by the OAK device or replay.
+    :param rate_control: Add the "control" input that selects the inference
+        rate of the OAK camera, see :func:`create_scheduler`. The host
+        device always has it, replays never.
+    :param tiles: Tile regions to detect on, see :func:`detection_tiles`,
+        or None. Replays contain the merged detections.
+    :param gps_data: ``GPSData`` a replay writes its recorded fixes to,
+        ``gps_manager.gps_data`` when omitted.
+    :return: A device object usable as a context manager that provides
+        ``getOutputQueue``.
+    """
+    if replay_path is not None:
+        from cameraAI.hardware.session import ReplayDevice
+        return ReplayDevice(replay_path, realtime=realtime, gps_data=gps_data or gps_manager.gps_data,
+                            streams=("rgb", "nn") if rgb_output else ("nn",))
+
+    if config.INFERENCE_BACKEND == "depthai":
+        import depthai as dai
+        print("[INFO] initializing a depthai camera pipeline...")
+        if model_path is None:
+            model_path = model_artifacts.resolve_blob(config.YOLOV8N_CONFIG)
+        pipeline = utils.create_camera_pipeline(config_path=config.YOLOV8N_CONFIG, model_path=model_path,
+                                                video_encoder=video_encoder, rgb_output=rgb_output,
+                                                rate_control=rate_control, tiles=tiles)
+        if device_info is not None:
+            return dai.Device(pipeline, device_info, usb2Mode=True)
+        return dai.Device(pipeline, usb2Mode=True)
+
+    from cameraAI.detection import backends
+    from cameraAI.detection.host_pipeline import HostDevice
+    print("[INFO] initializing a host {} pipeline...".format(config.INFERENCE_BACKEND))
+    backend = backends.create_backend(config.INFERENCE_BACKEND)
+    tiler = None
+    if tiles is not None:
+        tiler = tiling.TiledDetector(backend, tiles, iou_threshold=config.TILE_IOU_THRESHOLD)
+    return HostDevice(backend, source=config.CAMERA_SOURCE, tiler=tiler,
+                      streams=("rgb", "nn") if rgb_output else ("nn",))
+
+
+def device_video_encoder(replay_path=None, record_video=True, annotate_video=True):
+    """
+    Selects the on-device video encoder for the recording, if it can be used.
+
+    Only raw video of a live OAK camera can be encoded on the device, the
+    annotations are drawn on the host.
+
+    :return: "h264" or "mjpeg", or None to record on the host.
+    :rtype: str | None
+    """
+    if (record_video and not annotate_video and replay_path is None
+            and config.INFERENCE_BACKEND == "depthai" and config.VIDEO_ENCODER in ("h264", "mjpeg")):
+        return config.VIDEO_ENCODER
+    return None
+
+
+def detection_tiles(replay_path=None):
+    """
+    Returns the tiles of the tiled detection mode, see ``config.TILES``.
+
+    :param replay_path: Path of a replayed session, which is never tiled.
+    :return: Tile regions normalized to the frame, or None without tiling.
+    :rtype: numpy.ndarray | None
+    """
+    grid = tiling.parse_tiles(config.TILES)
+    if grid is None or replay_path is not None:
+        return None
+    return tiling.tile_rois(*grid, overlap=config.TILE_OVERLAP, full_frame=config.TILE_FULL_FRAME)
+
+
+def create_scheduler(device):
+    """
+    Creates the scheduler that adapts the inference rate of a live device
+    to the speed of the vehicle.
+
+    :param device: The OAK device opened with ``rate_control``, or a
+        ``HostDevice``.
+    :return: The scheduler.
+    :rtype: MotionScheduler
+    """
+    if config.INFERENCE_BACKEND == "depthai":
+        import depthai as dai
+        message_type = dai.Buffer
+    else:
+        from cameraAI.detection.host_pipeline import HostBuffer
+        message_type = HostBuffer
+    return MotionScheduler(device.getInputQueue("control", maxSize=1, blocking=False), message_type)
+
+
+def video_prefix(camera_id=None):
+    """
+    Returns the file name prefix of the video segments of a camera.
+
+    :param camera_id: Id of the camera, or None for a single camera.
+    :rtype: str
+    """
+    return "camera_v8n" if camera_id is None else "camera_v8n_{}".format(camera_id)
+
+
+def create_sinks(display=True, record_video=True, annotate_video=True, camera_id=None, display_sink=None):
+    """
+    Creates the output sinks of the camera loop.
+
+    :param display: Show the annotated frames in a window.
+    :param record_video: Write the frames to segments in ``config.OUTPUT_VIDEO_DIR``
+        on a background thread.
+    :param annotate_video: Write annotated frames instead of the raw frames.
+    :param camera_id: Id of the camera, names the window and video files.
+    :param display_sink: Sink to show the frames with instead of a window
+        of this loop, e.g. of a ``SharedDisplay``.
+    :return: The sinks, empty in headless mode without video.
+    :rtype: list[FrameSink]
+    """
+    sinks = []
+    if display:
+        sinks.append(display_sink or DisplaySink(camera_id or "video"))
+    if record_video:
+        sinks.append(AsyncVideoWriter(config.OUTPUT_VIDEO_DIR, prefix=video_prefix(camera_id), fps=config.CAMERA_FPS,
+                                      annotate=annotate_video, segment_seconds=config.VIDEO_SEGMENT_SECONDS,
+                                      max_segments=config.VIDEO_MAX_SEGMENTS, queue_size=config.VIDEO_QUEUE_SIZE,
+                                      drop_policy=config.VIDEO_DROP_POLICY))
+    return sinks
+
+
+def create_report_index():
+    """
+    Opens the index of reported litter, and seeds it from the server in the
+    background when ``config.REPORT_INDEX_SEED`` is set.
+
+    :return: The report index.
+    :rtype: ReportIndex
+    """
+    index = ReportIndex(path=config.REPORT_INDEX_PATH or None, radius=config.REPORT_INDEX_RADIUS,
+                        ttl=config.REPORT_INDEX_TTL)
+    if config.REPORT_INDEX_SEED:
+        threading.Thread(target=seed_report_index, args=(index,), daemon=True).start()
+    return index
+
+
+def seed_report_index(index):
+    """
+    Adds the litter reported to the server within the TTL of the index.
+
+    :param index: The report index to seed.
+    :return: None
+    """
+    try:
+        added = index.seed(send_to_api.fetch_recent_reports(time.time() - index.ttl))
+        print("[INFO] seeded the report index with {} reports from the server".format(added))
+    except Exception as e:
+        print("[INFO] could not seed the report index:", e)
+
+
+def main(record_path=None, replay_path=None, realtime=True, display=not config.HEADLESS,
+         record_video=config.RECORD_VIDEO, annotate_video=config.ANNOTATE_VIDEO, startup=None, camera_id=None,
+         device_info=None, model_path=None, report_index=None, display_sink=None, stop=None, gps_data=None):
     """
     Main function to initialize and run DepthAI camera pipeline for real-time
-    inference using YOLOv8. Processes video frames and detections, annotates
-    frames with results, calculates FPS, and optionally sends detection data to
-    an API. The function uses a video writer to output the processed video and
-    allows exiting via the 'q' key.
+    inference using YOLOv8. Processes video frames and detections, calculates
+    FPS, and sends detection data to an API. Annotated frames are shown in a
+    window (exit via the 'q' key) and written to a video file, each of which
+    can be switched off; in headless mode without video nothing is drawn.
+
+    :param record_path: Path of a session file to record the frames,
+        detections and GPS fixes of this run to, or None.
+    :param replay_path: Path of a recorded session to run instead of the
+        camera, or None.
+    :param realtime: Replay at the recorded pace instead of at maximum speed.
+    :param display: Show the annotated frames in a window.
+    :param record_video: Write the frames to a video file.
+    :param annotate_video: Draw the detections on the recorded video.
+    :param startup: Optional ``StartupReport`` in which the device boot and
+        the first frame are marked.
+    :param camera_id: Id of the camera, sent with its detections and used in
+        the names of its window and video files; None for a single camera.
+    :param device_info: ``dai.DeviceInfo`` of the OAK camera, or None for the
+        first one found.
+    :param model_path: The blob to load, resolved from the model config when
+        omitted.
+    :param report_index: ``ReportIndex`` shared with other cameras, or None
+        to open one for this loop.
+    :param display_sink: Sink that shows the frames instead of a window of
+        this loop.
+    :param stop: Optional ``threading.Event`` that ends the loop when set.
+    :param gps_data: ``GPSData`` the positions are looked up in. Defaults to
+        the shared ``gps_manager.gps_data`` of the GPS reader for a camera,
+        and to a new one for a replay, so the fixes of replays running side
+        by side are not mixed in one track.
 
     :raises RuntimeError: If there are issues initializing or starting the DepthAI
         device.
@@ -22,95 +235,330 @@ def main():
 
     :return: None
     """
-    # initialize a depthai camera pipeline
-    print("[INFO] initializing a depthai images pipeline...")
+    # tracks objects over consecutive frames, so each piece of litter is
+    # reported once when its track is confirmed instead of every frame
+    tracker = SortTracker(iou_threshold=config.TRACKER_IOU_THRESHOLD, min_hits=config.TRACKER_MIN_HITS,
+                          max_age=config.TRACKER_MAX_AGE, min_confidence=config.CONFIDENCE)
+    # rate limiting of reports, evaluated per detection without blocking
+    # the loop, so frames keep being consumed at the camera rate
+    throttle = DetectionThrottle(class_cooldown=config.THROTTLE_CLASS_COOLDOWN,
+                                 location_cooldown=config.THROTTLE_LOCATION_COOLDOWN,
+                                 cell_size=config.THROTTLE_CELL_SIZE)
+    # litter reported before, on an earlier lap or by another vehicle, is
+    # not reported again
+    owns_report_index = report_index is None
+    if owns_report_index:
+        report_index = create_report_index()
+    # raw video of the OAK camera is encoded on the device, everything
+    # else is encoded by a background writer
+    video_encoder = device_video_encoder(replay_path, record_video, annotate_video)
+    sinks = create_sinks(display, record_video and video_encoder is None, annotate_video, camera_id, display_sink)
+    # frames are only drawn on when a sink shows or stores them annotated
+    raw_sinks = [sink for sink in sinks if not sink.needs_annotation]
+    annotated_sinks = [sink for sink in sinks if sink.needs_annotation]
 
+    recorder = None
+    if record_path is not None:
+        from cameraAI.hardware.session import SessionRecorder
+        print("[INFO] recording session to {}...".format(record_path))
+        recorder = SessionRecorder(record_path)
 
-    pipeline = utils.create_camera_pipeline(config_path=config.YOLOV8N_CONFIG,
-                                            model_path=config.YOLOV8N_MODEL)
+    # pipeline defined, now the device is assigned and pipeline is started
+    detection_queue = send_to_api.get_detection_queue()
 
-    output_video = config.OUTPUT_VIDEO_YOLOv8n
-    previous_coords = (0,0)
-    # set the video codec to use with video writer
-    fourcc = cv2.VideoWriter_fourcc(*'MJPG')
+    # the device only sends frames when something consumes them, otherwise
+    # only the detections cross the USB link
+    needFrames = bool(sinks) or recorder is not None
+    streams = ("rgb", "nn") if needFrames else ("nn",)
+    # a replay runs at the rate it was recorded with
+    rateControl = config.SCHEDULER and replay_path is None
+    tiles = detection_tiles(replay_path)
+    if tiles is not None:
+        print("[INFO] detecting on {} tiles of the full resolution frame...".format(len(tiles)))
 
-    out = cv2.VideoWriter(
-       output_video,
-       fourcc,
-       20.0,
-       config.CAMERA_PREV_DIM
-    )
+    if gps_data is None:
+        gps_data = gps_manager.GPSData() if replay_path is not None else gps_manager.gps_data
 
-    # pipeline defined, now the device is assigned and pipeline is started
-    with dai.Device(pipeline, usb2Mode=True) as device:
-        # output queues will be used to get the rgb frames
-        # and nn data from the outputs defined above
-        qRgb = device.getOutputQueue(name="rgb", maxSize=4, blocking=False)
-        qDet = device.getOutputQueue(name="nn", maxSize=4, blocking=False)
+    with open_device(replay_path, realtime, video_encoder, device_info, model_path, needFrames,
+                     rateControl, tiles, gps_data) as device:
+        if startup is not None:
+            startup.mark("device ready")
+        scheduler = create_scheduler(device) if rateControl else None
+        queues = {name: device.getOutputQueue(name=name, maxSize=4, blocking=False) for name in streams}
+        if tiles is not None and config.INFERENCE_BACKEND == "depthai":
+            # the device sends the detections of every tile, merged here
+            queues["nn"] = tiling.TileMerger(device.getOutputQueue(name="nn", maxSize=4 * len(tiles), blocking=False),
+                                             tiles, iou_threshold=config.TILE_IOU_THRESHOLD)
+        # frames and detections are paired by sequence number, when the loop
+        # falls behind the camera it continues with the newest pair; a replay
+        # waits for the loop, so every pair is processed
+        synchronizer = MessageSynchronizer(queues, anchor="nn", latest=replay_path is None)
+        video_recorder = None
+        if video_encoder is not None:
+            video_recorder = BitstreamRecorder(device.getOutputQueue(name="video", maxSize=30, blocking=False),
+                                               config.OUTPUT_VIDEO_DIR, prefix=video_prefix(camera_id),
+                                               codec=video_encoder,
+                                               segment_seconds=config.VIDEO_SEGMENT_SECONDS,
+                                               max_segments=config.VIDEO_MAX_SEGMENTS)
         # initialize variables like frame, start time for NN FPS
         # also start the FPS module timer, define color pattern for FPS text
-        # frame = None
+        frame = None
         startTime = time.monotonic()
         fps = FPS().start()
         counter = 0
         color2 = (255, 255, 255)
 
+        # tracks waiting for the throttle
+        throttledTracks = set()
+        # device timestamps of a replay are from the recording, not this run
+        measureLatency = replay_path is None
+        stages = {}
+
+        def stage(name):
+            # times a stage of the loop, the labelled histograms are cached
+            if name not in stages:
+                stages[name] = metrics.STAGE_SECONDS.labels(name)
+            return stages[name].time()
+
         print("[INFO] starting inference with OAK camera...")
         while True:
-            # fetch the RGB frames and YOLO detections for the frame
-            inRgb = qRgb.get()
-            inDet = qDet.get()
+            # fetch the YOLO detections and the RGB frame they were made on,
+            # the time spent waiting here is time the host waits on the device
+            with stage("wait"):
+                messages = synchronizer.get()
+            # the device, replay or host video source has no more messages
+            if messages is None:
+                break
+            inRgb = messages.get("rgb")
+            inDet = messages["nn"]
+            frameTime = inDet.getTimestamp().total_seconds()
+            if measureLatency:
+                # device timestamps are synced to the host monotonic clock
+                metrics.CAPTURE_LATENCY.labels("nn").observe(time.monotonic() - frameTime)
             if inRgb is not None:
-                pass
-                #used to show video
-
                 # convert inRgb output to a format OpenCV library can work
-                frame = inRgb.getCvFrame()
-                # annotate the frame with FPS information
-                cv2.putText(frame, "NN fps: {:.2f}".format(counter / (time.monotonic() - startTime)),
-                            (2, frame.shape[0] - 4), cv2.FONT_HERSHEY_TRIPLEX, 0.8, color2)
-                # update the FPS counter
-                fps.update()
-            if inDet is not None:
-                # if inDet is not none, fetch all the detections for a frame
-                detections = inDet.detections
-
-                coords = gps_manager.gps_data.get()
-
-                if len(detections) >= 0 and (
-                        previous_coords is None or coords is None or gps_manager.get_distance_between(coords, previous_coords) >= 2):
-                    for detection in detections:
-                        result = config.LABELS[detection.label]
-                        print("type: " + result)
-                        print("confidence: " + str(detection.confidence))
-                        if detection.confidence < config.CONFIDENCE:
-                            continue
+                with stage("convert"):
+                    frame = inRgb.getCvFrame()
+                if recorder is not None:
+                    with stage("record"):
+                        recorder.write_frame(inRgb.getSequenceNum(), frameTime, frame)
+            # update the FPS counter
+            fps.update()
+            if startup is not None and not startup.done:
+                startup.mark("first frame")
+                startup.finish()
 
-                        previous_coords = coords
+            # fetch all the detections for the frame, converted once to an
+            # array shared by the tracker and annotation
+            detections = yolo_decode.to_detection_array(inDet.detections)
+            # the position when the frame was captured, device timestamps
+            # are on the host monotonic clock like the GPS fixes
+            coords = gps_data.get(frameTime)
+            if scheduler is not None:
+                # fewer inferences while the vehicle stands still
+                scheduler.update(gps_data.get_fix(), frame)
+            if recorder is not None:
+                with stage("record"):
+                    recorder.write_gps(frameTime, coords)
+                    recorder.write_detections(inDet.getSequenceNum(), frameTime, detections)
 
-                        send_to_api.detection_queue.put((result, coords))
-                        time.sleep(5)
+            # confirmed tracks are offered until they are reported
+            with stage("track"):
+                confirmed = tracker.update(detections)
+            # forget throttled tracks the tracker no longer offers
+            throttledTracks.intersection_update(track.track_id for track in confirmed)
+            for track in confirmed:
+                result = config.LABELS[track.label]
+                if report_index.seen(result, coords):
+                    # the litter was reported before, the track is done with
+                    metrics.SUPPRESSED_DETECTIONS.labels("duplicate").inc()
+                    tracker.mark_reported([track.track_id])
+                    continue
+                # device time, so replays at max speed throttle like the live
+                # run; a throttled track is offered again on the next frame
+                if not throttle.allow(track.label, coords, now=frameTime):
+                    # counted once per track, not for every frame it waits
+                    if track.track_id not in throttledTracks:
+                        throttledTracks.add(track.track_id)
+                        metrics.SUPPRESSED_DETECTIONS.labels("throttle").inc()
+                    continue
+                print("type: " + result)
+                print("confidence: " + str(track.confidence))
+                if coords is not None:
+                    report_index.add(result, coords[0], coords[1])
 
-                counter += 1
+                with stage("report"):
+                    detection_queue.put((result, coords, camera_id))
+                tracker.mark_reported([track.track_id])
+                metrics.REPORTED_DETECTIONS.inc()
 
-
-            #This is used to show the video
+            counter += 1
 
             if frame is not None:
-                # annotate frame with detection results
-                frame = utils.annotateFrame(frame, detections, "video")
-                # display the frame with gesture output on the screen
-                cv2.imshow("video", frame)
-            # write the annotated frame to the file
-            out.write(frame)
-            # break out of the while loop if `q` key is pressed
-            if cv2.waitKey(1) == ord('q'):
+                with stage("sinks"):
+                    for sink in raw_sinks:
+                        sink.write(frame, frameTime)
+                if annotated_sinks:
+                    with stage("annotate"):
+                        # the raw frame may still be queued for writing
+                        if raw_sinks:
+                            frame = frame.copy()
+                        # annotate the frame with FPS information and detection results
+                        cv2.putText(frame, "NN fps: {:.2f}".format(counter / (time.monotonic() - startTime)),
+                                    (2, frame.shape[0] - 4), cv2.FONT_HERSHEY_TRIPLEX, 0.8, color2)
+                        frame = utils.annotateFrame(frame, detections, "video")
+                    with stage("sinks"):
+                        for sink in annotated_sinks:
+                            sink.write(frame, frameTime)
+                # every frame is handed to the sinks once
+                frame = None
+            # a sink asked to stop, e.g. `q` pressed in the preview window
+            if any(sink.quit_requested for sink in sinks) or (stop is not None and stop.is_set()):
                 break
+        if video_recorder is not None:
+            video_recorder.close()
 
     #stop the timer and display FPS information
     fps.stop()
-    print("[INFO] elapsed time: {:.2f}".format(fps.elapsed()))
-    print("[INFO] approx. FPS: {:.2f}".format(fps.fps()))
+    name = "" if camera_id is None else "{}: ".format(camera_id)
+    print("[INFO] {}elapsed time: {:.2f}".format(name, fps.elapsed()))
+    print("[INFO] {}approx. FPS: {:.2f}".format(name, fps.fps()))
+    if tiles is not None:
+        print("[INFO] {}approx. tiles per second: {:.2f}".format(name, fps.fps() * len(tiles)))
     # do a bit of cleanup
-    out.release()
-    cv2.destroyAllWindows()
+    if recorder is not None:
+        recorder.close()
+    if owns_report_index:
+        report_index.close()
+    for sink in sinks:
+        sink.close()
+
+
+def find_cameras(replay_paths=None, cameras=config.CAMERAS):
+    """
+    Lists the cameras to run.
+
+    Every replayed session is a camera named after its file. Otherwise
+    ``cameras`` selects the connected OAK cameras (see ``config.CAMERAS``);
+    the host backends have a single camera.
+
+    :param replay_paths: Paths of sessions to replay, or None.
+    :param cameras: "" for the first camera found, "all" for every connected
+        camera or a list of named cameras, "left=MXID,right=MXID".
+    :return: List of (camera id, replay path, ``dai.DeviceInfo``) tuples;
+        a single camera has the id None.
+    :rtype: list[tuple]
+    :raises RuntimeError: If a selected camera is not connected.
+    """
+    if replay_paths:
+        if len(replay_paths) == 1:
+            return [(None, replay_paths[0], None)]
+        return [(Path(path).stem, path, None) for path in replay_paths]
+    if not cameras or config.INFERENCE_BACKEND != "depthai":
+        return [(None, None, None)]
+
+    import depthai as dai
+    devices = {device.getMxId(): device for device in dai.Device.getAllAvailableDevices()}
+    if cameras == "all":
+        if not devices:
+            raise RuntimeError("no OAK cameras found")
+        return [(mx_id, None, device) for mx_id, device in devices.items()]
+    found = []
+    for entry in cameras.split(","):
+        camera_id, _, mx_id = entry.strip().partition("=")
+        if mx_id not in devices:
+            raise RuntimeError("camera {} ({}) is not connected, found: {}".format(camera_id, mx_id,
+                                                                                  ", ".join(devices) or "none"))
+        found.append((camera_id, None, devices[mx_id]))
+    return found
+
+
+def camera_path(path, camera_id=None):
+    """
+    Returns the per-camera variant of a file path, "session.bin" becomes
+    "session_left.bin" for camera "left".
+
+    :param path: The path, or None.
+    :param camera_id: Id of the camera, or None for a single camera.
+    :rtype: str | None
+    """
+    if path is None or camera_id is None:
+        return path
+    path = Path(path)
+    return str(path.with_name("{}_{}{}".format(path.stem, camera_id, path.suffix)))
+
+
+def _run_camera(camera_id, **kwargs):
+    # a camera that fails or is unplugged stops, the others keep running
+    try:
+        main(camera_id=camera_id, **kwargs)
+    except Exception as e:
+        print("[INFO] camera {} stopped: {}".format(camera_id, e))
+
+
+def _stop_when_done(threads, stop):
+    # sets the stop event once every camera thread has ended
+    for thread in threads:
+        thread.join()
+    stop.set()
+
+
+def run_cameras(cameras, record_path=None, realtime=True, display=not config.HEADLESS,
+                record_video=config.RECORD_VIDEO, annotate_video=config.ANNOTATE_VIDEO, startup=None):
+    """
+    Runs the camera loop of every camera until they end.
+
+    A single camera runs on the calling thread exactly like :func:`main`.
+    Several cameras each run on their own thread; they share the GPS reader,
+    the uploader and the report index, so litter seen by two cameras is
+    reported once. Their preview windows are shown on the calling thread and
+    'q' in any window stops all cameras. Sessions and videos are recorded per
+    camera.
+
+    :param cameras: Cameras as returned by :func:`find_cameras`.
+    :param record_path: Path of a session file to record to, or None.
+    :param realtime: Replay at the recorded pace instead of at maximum speed.
+    :param display: Show the annotated frames in a window per camera.
+    :param record_video: Write the frames to video files.
+    :param annotate_video: Draw the detections on the recorded video.
+    :param startup: Optional ``StartupReport``, marked by the first camera.
+    :return: None
+    """
+    if len(cameras) == 1:
+        camera_id, replay_path, device_info = cameras[0]
+        main(record_path=camera_path(record_path, camera_id), replay_path=replay_path, realtime=realtime,
+             display=display, record_video=record_video, annotate_video=annotate_video, startup=startup,
+             camera_id=camera_id, device_info=device_info)
+        return
+
+    # resolve the blob once instead of once per camera thread
+    model_path = None
+    if config.INFERENCE_BACKEND == "depthai" and any(replay_path is None for _, replay_path, _ in cameras):
+        model_path = model_artifacts.resolve_blob(config.YOLOV8N_CONFIG)
+    report_index = create_report_index()
+    shared_display = SharedDisplay() if display else None
+    stop = threading.Event()
+    threads = []
+    for index, (camera_id, replay_path, device_info) in enumerate(cameras):
+        kwargs = dict(record_path=camera_path(record_path, camera_id), replay_path=replay_path, realtime=realtime,
+                      display=display, record_video=record_video, annotate_video=annotate_video,
+                      startup=startup if index == 0 else None, device_info=device_info, model_path=model_path,
+                      report_index=report_index, stop=stop,
+                      display_sink=shared_display.sink(camera_id) if shared_display else None)
+        threads.append(threading.Thread(target=_run_camera, args=(camera_id,), kwargs=kwargs,
+                                        name="camera-{}".format(camera_id), daemon=True))
+    print("[INFO] running {} cameras: {}".format(len(cameras), ", ".join(camera_id for camera_id, _, _ in cameras)))
+    for thread in threads:
+        thread.start()
+    # ends the wait below once every camera has stopped
+    threading.Thread(target=_stop_when_done, args=(threads, stop), daemon=True).start()
+    try:
+        if shared_display is not None:
+            shared_display.run(stop)
+        else:
+            stop.wait()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        report_index.close()
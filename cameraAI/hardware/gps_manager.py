@@ -1,29 +1,35 @@
-import zoneinfo
+from collections import deque
 from datetime import datetime
 from math import radians, sin, cos, sqrt, atan2
-from serial import Serial
-from pyubx2 import UBXReader, NMEA_PROTOCOL, UBX_PROTOCOL
-import timezonefinder
 import threading
 import time
-
-import requests
 import os
-from dotenv import load_dotenv
 
-# Load in the environment variables
-load_dotenv()
-API_KEY = os.getenv("GOOGLE_API_KEY")
-if not API_KEY:
-    raise ValueError("API key niet gevonden. Voeg GOOGLE_API_KEY toe.")
+import numpy as np
+
+from cameraAI.hardware.timezone_resolver import timezone_resolver
+from cameraAI.hardware.gps_reader import GPSReader, GPSFix
+
+# Serial port and baud rate of the GNSS receiver
+GPS_PORT = os.getenv("GPS_PORT", "/dev/ttyACM0")
+GPS_BAUDRATE = int(os.getenv("GPS_BAUDRATE", "9600"))
+# Fixes are placed on the host clock by their UTC epoch (see GPSData), which
+# removes the varying delay of the serial port. GPS_LATENCY is the remaining
+# shortest delay between an epoch and the reception of its first message,
+# by default the transfer time of an 80 byte NMEA sentence (0.083 s at 9600
+# baud). To calibrate it, log time.time() - fix.utc_time.timestamp() for
+# every fix on an NTP synchronised host and use the smallest value.
+GPS_LATENCY = float(os.getenv("GPS_LATENCY", str(80 * 10 / GPS_BAUDRATE)))
+# number of recent fixes the offset between UTC and the host clock is taken from
+GPS_CLOCK_WINDOW = 64
 
 
 def get_address_from_coordinates(lat: float,lng: float) -> str:
     """
-    Fetches a formatted address as a string from coordinates (latitude and longitude)
-    by making a request to the Google Maps Geocoding API. It converts the given coordinate
-    pair into a readable address. The function expects valid float values for the
-    latitude and longitude within their acceptable ranges.
+    Fetches a formatted address as a string from coordinates (latitude and longitude).
+
+    Kept for existing callers, this delegates to
+    ``external_api.get_address_from_coordinates`` so both share one geocode cache.
 
     :param lat: The latitude of the coordinate pair.
     :type lat: float
@@ -33,15 +39,102 @@ def get_address_from_coordinates(lat: float,lng: float) -> str:
     :rtype: str
     :raises Exception: If the geocoding request fails or does not return expected results.
     """
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
+    from cameraAI.external_api import external_api
+    return external_api.get_address_from_coordinates(lat, lng)
+
+class GPSTrack:
+  """
+  Fixed-size ring buffer of timestamped positions.
+
+  Every entry is written twice, at ``i`` and ``i + capacity``, so the last
+  ``capacity - 1`` entries are always one contiguous, time-ordered slice
+  and a lookup is a binary search on it. There is one writer (the GPS
+  reader thread); readers never take a lock, they check that no entry was
+  written while they read and retry otherwise, so a lookup never waits for
+  the serial thread and the serial thread never waits for a lookup.
+
+  Positions between two fixes are interpolated linearly; after the newest
+  fix the last movement is extrapolated for at most ``max_extrapolation``
+  seconds. A lost fix is stored as NaN and yields None.
+
+  :ivar capacity: Number of entries kept.
+  :ivar max_extrapolation: Seconds a position is extrapolated past the
+      newest fix.
+  """
+  def __init__(self, capacity: int = 256, max_extrapolation: float = 1.0):
+    self.capacity = capacity
+    self.max_extrapolation = max_extrapolation
+    self._times = np.zeros(2 * capacity)
+    self._positions = np.zeros((2 * capacity, 2))
+    self._count = 0
 
-    params = {"latlng": f"{lat},{lng}", "key": API_KEY}
-    response = requests.get(url, params=params)
-    data = response.json()
-    if data["status"] == "OK" and data["results"]:
-        return data["results"][0]["formatted_address"]
-    else:
-        raise Exception(f"Geocoding mislukt: {data.get('status')} - {data.get('error_message', 'Geen extra info')}")
+  def __len__(self) -> int:
+    return min(self._count, self.capacity - 1)
+
+  def append(self, timestamp: float, lat: float | None, lon: float | None):
+    """
+    Adds a fix, called by the single writer thread.
+
+    :param timestamp: Host ``time.monotonic()`` of the fix, not older than
+        the previous one.
+    :param lat: Latitude in decimal degrees, None without a position.
+    :param lon: Longitude in decimal degrees, None without a position.
+    :return: None
+    """
+    index = self._count % self.capacity
+    position = (np.nan, np.nan) if lat is None or lon is None else (lat, lon)
+    for slot in (index, index + self.capacity):
+      self._times[slot] = timestamp
+      self._positions[slot] = position
+    # publish the entry only once it is written
+    self._count += 1
+
+  def at(self, timestamp: float) -> tuple[float, float] | None:
+    """
+    Returns the position at a time.
+
+    :param timestamp: Host ``time.monotonic()``, e.g. a device timestamp.
+    :return: (latitude, longitude), or None without a position at that time.
+    :rtype: tuple[float, float] | None
+    """
+    while True:
+      count = self._count
+      position = self._lookup(count, timestamp)
+      if self._count == count:
+        return position
+
+  def _lookup(self, count: int, timestamp: float) -> tuple[float, float] | None:
+    # the slot written next may hold the oldest entry, it is left out
+    size = min(count, self.capacity - 1)
+    if size == 0:
+      return None
+    start = (count - size) % self.capacity
+    times = self._times[start:start + size]
+    positions = self._positions[start:start + size]
+    index = int(np.searchsorted(times, timestamp, side="right"))
+    if index == 0:
+      # before the oldest fix kept
+      return self._position(positions[0])
+    if index == size:
+      # after the newest fix: continue the last movement for a short while
+      if size == 1 or timestamp - times[-1] > self.max_extrapolation:
+        return self._position(positions[-1])
+      index -= 1
+    t0, t1 = times[index - 1], times[index]
+    if t1 <= t0:
+      return self._position(positions[index])
+    weight = (timestamp - t0) / (t1 - t0)
+    position = positions[index - 1] + weight * (positions[index] - positions[index - 1])
+    # NaN when either fix had no position, then the nearest fix decides
+    if np.isnan(position).any():
+      return self._position(positions[index - 1] if weight < 0.5 else positions[index])
+    return float(position[0]), float(position[1])
+
+  @staticmethod
+  def _position(position) -> tuple[float, float] | None:
+    if np.isnan(position).any():
+      return None
+    return float(position[0]), float(position[1])
 
 class GPSData:
   """
@@ -55,23 +148,43 @@ class GPSData:
   :ivar coords: Holds the current GPS coordinates as a tuple of latitude
       and longitude. It is None if no coordinates are set.
   :type coords: Tuple[float, float] | None
+  :ivar fix: The latest full fix from the GPS reader (speed, heading,
+      fix quality, HDOP, UTC time), or None.
+  :type fix: GPSFix | None
+  :ivar track: The recent fixes with their timestamps, to look up the
+      position at the time a frame was captured.
+  :type track: GPSTrack
+
+  A fix is stamped when its message is parsed, which at 9600 baud is
+  anywhere up to a second after the epoch, depending on which messages are
+  sent before it. Fixes with a UTC date and time are therefore placed on
+  the host clock as their UTC time plus the smallest reception delay of the
+  last ``GPS_CLOCK_WINDOW`` fixes, minus ``GPS_LATENCY``. The window lets
+  the offset follow the drift of the host clock.
   """
   def __init__(self):
     self._lock = threading.Lock()
     self.coords: tuple[float, float] | None = None
+    self.fix: GPSFix | None = None
+    self.track = GPSTrack()
+    self._epoch = None
+    self._offsets = deque(maxlen=GPS_CLOCK_WINDOW)
+    self._last_time = float("-inf")
 
-  def unset(self):
+  def unset(self, timestamp: float | None = None):
     """
     Unset the `coords` attribute safely within a thread-safe context using
     a lock. This method ensures that the `coords` attribute is set to None
     in a thread-safe manner by acquiring a lock before modification.
 
+    :param timestamp: ``time.monotonic()`` of the loss, now when omitted.
     :return: None
     """
     with self._lock:
       self.coords = None
+      self.track.append(time.monotonic() if timestamp is None else timestamp, None, None)
 
-  def set(self, lat: float, lon: float):
+  def set(self, lat: float, lon: float, timestamp: float | None = None):
     """
     Sets the coordinates using the provided latitude and longitude values.
 
@@ -81,68 +194,90 @@ class GPSData:
 
     :param lat: The latitude value to set.
     :param lon: The longitude value to set.
+    :param timestamp: ``time.monotonic()`` of the fix, now when omitted.
     :return: None
     """
     with self._lock:
       self.coords = (lat, lon)
+      self.track.append(time.monotonic() if timestamp is None else timestamp, lat, lon)
 
-  def get(self) -> tuple[float, float] | None:
+  def get(self, timestamp: float | None = None) -> tuple[float, float] | None:
     """
-    Retrieves the current coordinates stored in the object.
+    Retrieves the coordinates, the latest or those at a given time.
 
-    If the coordinates are available, they are returned as a tuple
-    containing two float values. If the coordinates are not available,
-    None is returned. This method ensures thread-safe access to the
-    coordinate data by using a lock.
+    With a timestamp the position is interpolated between the fixes around
+    it (see :class:`GPSTrack`), without taking the lock, so a frame is
+    tagged with where the camera was when it was captured rather than with
+    the last fix, which may be a second old at 9600 baud.
 
+    :param timestamp: ``time.monotonic()`` to look up, e.g. the device
+        timestamp of a frame, or None for the latest coordinates.
     :returns: A tuple containing two float values representing the
               coordinates in the format: [Latitude, Longitude] if available, otherwise None.
     :rtype: tuple[float, float] | None
     """
+    if timestamp is not None:
+      return self.track.at(timestamp)
     with self._lock:
       return self.coords
 
-def get_gps_coordinates():
-  """
-  Retrieve GPS coordinates using the Serial interface and parse relevant data
-  using the UBXReader. Continuously attempts to read data from the GPS device
-  and update the `gps_data` with latitude and longitude if available. Handles
-  parsing and validation to ensure proper GPS data retrieval.
+  def set_fix(self, fix: GPSFix):
+    """
+    Stores a full fix from the GPS reader and updates the coordinates.
 
-  The function operates indefinitely, retrying upon failure and waiting
-  between retries. Errors encountered during reading or parsing are logged,
-  allowing the process to continue.
+    The coordinates are unset when the fix has no position (no signal).
 
-  :raises Exception: Captures and logs all exceptions encountered during
-      device reading or parsing.
+    :param fix: The fix to store.
+    :return: None
+    """
+    with self._lock:
+      self.fix = fix
+      self.coords = (fix.lat, fix.lon) if fix.has_position else None
+      # the GGA, RMC and NAV-PVT messages of one epoch are one entry, at the
+      # time the first of them arrived
+      if fix.utc_time is not None and fix.utc_time == self._epoch:
+        return
+      self._epoch = fix.utc_time
+      lat, lon = self.coords or (None, None)
+      # a faster reception lowers the offset, the track stays time-ordered
+      self._last_time = max(self._epoch_time(fix) - GPS_LATENCY, self._last_time)
+      self.track.append(self._last_time, lat, lon)
+
+  def _epoch_time(self, fix: GPSFix) -> float:
+    # the UTC time of a fix on the monotonic clock; without a date (before
+    # the first RMC message) the reception time is used
+    if not isinstance(fix.utc_time, datetime):
+      return fix.timestamp
+    epoch = fix.utc_time.timestamp()
+    self._offsets.append(fix.timestamp - epoch)
+    return epoch + min(self._offsets)
+
+  def get_fix(self) -> GPSFix | None:
+    """
+    Retrieves the latest full fix.
+
+    :return: The latest fix, or None if no fix was received yet.
+    :rtype: GPSFix | None
+    """
+    with self._lock:
+      return self.fix
+
+def get_gps_coordinates(stream=None):
+  """
+  Read GPS fixes from the receiver and store them in `gps_data`.
+
+  A single `GPSReader` keeps the serial port open and parses the GGA, RMC and
+  UBX NAV-PVT messages as they stream in, instead of reopening the port for
+  every message. The reader reconnects with back-off when the port fails.
 
+  :param stream: Optional binary stream used instead of the serial port,
+      e.g. a file or pseudo-terminal with recorded receiver output.
   :return: This function does not return any value; it updates shared data
       structures as its primary operation.
   """
   print("Running...")
-  while True:
-    try:
-      # Open a data stream on the gps usb.
-      with Serial('/dev/ttyACM0', 9600, timeout=3) as stream:
-        ubr = UBXReader(stream, protfilter=NMEA_PROTOCOL | UBX_PROTOCOL)
-        raw_data, parsed_data = ubr.read()
-        if parsed_data is not None:
-          payload = parsed_data.payload
-          # If the length is shorter than 6 something has gone wrong with the GPS retrieval (probably because there is no signal).
-          if len(payload) < 6:
-            print("Couldn't get location!")
-            gps_data.unset()
-            continue
-          # if on the other side of UTC meridian or southern hemisphere multiply latitude/longitude by -1.
-          latitude = payload[2] if payload[3] == 'N' else payload[2] * -1
-          longitude = payload[4] if payload[5] == 'E' else payload[4] * -1
-          if latitude is not None and longitude is not None and latitude != "" and longitude != "":
-            gps_data.set(float(latitude) / 100, float(longitude) / 100)
-            continue
-        continue
-    except Exception as e:
-      print(f"Error reading GPS: {e}")
-    time.sleep(5)
+  reader = GPSReader(GPS_PORT, GPS_BAUDRATE, on_fix=gps_data.set_fix, stream=stream)
+  reader.run()
 
 def get_distance_between(coord1, coord2) -> float:
   """
@@ -173,52 +308,76 @@ def get_distance_between(coord1, coord2) -> float:
 
   return earth_radius * c
 
-def get_local_time(coord) -> datetime:
+def get_local_time(coord, timestamp: float | None = None) -> datetime:
   """
   Determine the local time at a specified geographical coordinate.
 
   This function calculates the local time for a given geographical coordinate using
   the associated timezone. If no coordinate is supplied, it defaults to returning
-  the current local time in the system's timezone.
+  the current local time in the system's timezone. The timezone lookup goes
+  through the shared ``timezone_resolver``, which caches it per coordinate cell.
 
   :param coord: A tuple containing latitude and longitude in decimal degrees.
   :type coord: tuple[float, float] | None
+  :param timestamp: Unix time to convert instead of the current time.
+  :type timestamp: float | None
   :return: The current local time for the specified location or the system's
       local time if no location is provided.
   :rtype: datetime
   """
   if coord is None:
-    return datetime.now()
-  tzf = timezonefinder.TimezoneFinder()
-  tz_name = tzf.timezone_at(lat=coord[0], lng=coord[1])
-  tz = zoneinfo.ZoneInfo(tz_name)
-  now = datetime.now(tz)
+    return datetime.now() if timestamp is None else datetime.fromtimestamp(timestamp)
+  tz = timezone_resolver.timezone(coord[0], coord[1])
+  if tz is None:
+    # no timezone at this location (e.g. open sea), use the system's
+    return datetime.now() if timestamp is None else datetime.fromtimestamp(timestamp)
+  now = datetime.now(tz) if timestamp is None else datetime.fromtimestamp(timestamp, tz)
   return now
 
-gps_data: GPSData
+# shared GPS data, filled once the reader is started
+gps_data = GPSData()
+_reader: GPSReader | None = None
 
-def main():
+def start(stream=None, stop_at_eof: bool | None = None) -> GPSReader:
   """
-  Initializes and runs the main execution loop for the program.
+  Starts reading the GPS receiver on a background thread.
 
-  This function starts a separate thread to continuously fetch GPS coordinates
-  using the `get_gps_coordinates` function. It sets up a global `gps_data` object,
-  which is an instance of the `GPSData` class. The main thread then enters an
-  infinite loop, which can be interrupted by a keyboard interrupt to terminate
-  the program gracefully.
+  Importing this module does not touch the serial port, the reader only runs
+  after this call. Calling it again while the reader runs has no effect.
+
+  :param stream: Optional binary stream used instead of the serial port.
+  :param stop_at_eof: Stop reading at the end of the stream, by default
+      when a stream (e.g. a recorded file) is given. Pass False for a stream
+      that is still being written, like a pseudo-terminal.
+  :return: The running reader.
+  :rtype: GPSReader
+  """
+  global _reader
+  if _reader is None:
+    if stop_at_eof is None:
+      stop_at_eof = stream is not None
+    _reader = GPSReader(GPS_PORT, GPS_BAUDRATE, on_fix=gps_data.set_fix, stream=stream, stop_at_eof=stop_at_eof)
+    _reader.start()
+  return _reader
+
+def stop():
+  """
+  Stops the GPS reader and closes the serial port.
 
-  :global gps_data: A global instance of the `GPSData` class used to store GPS
-                    data collected by the program.
-  :raises KeyboardInterrupt: Raised when the user manually interrupts the
-                             program's execution, e.g., pressing Ctrl+C.
   :return: None
   """
-  global gps_data
-  gps_data = GPSData()
-  # Start a thread
-  threading.Thread(target=get_gps_coordinates, daemon=True).start()
+  global _reader
+  if _reader is not None:
+    _reader.stop()
+    _reader = None
 
-main()
+def main():
+  """
+  Starts the GPS reader, kept for existing callers of the former entry point.
+
+  :return: None
+  """
+  start()
 
 
 
@@ -0,0 +1,221 @@
+from datetime import datetime, time as dtime, timezone
+from typing import NamedTuple
+import threading
+import time
+
+KNOTS_TO_MPS = 0.514444
+
+
+class GPSFix(NamedTuple):
+  """
+  A GPS fix merged from the GGA, RMC and UBX NAV-PVT messages.
+
+  :ivar lat: Latitude in decimal degrees, None without a position.
+  :ivar lon: Longitude in decimal degrees, None without a position.
+  :ivar speed: Ground speed in m/s, None if unknown.
+  :ivar heading: Course over ground in degrees, None if unknown.
+  :ivar fix_quality: 0 for no fix, 1 for a GNSS fix, 2 for a differential
+      fix, 4/5 for RTK fixed/float (the NMEA GGA quality values).
+  :ivar hdop: Horizontal dilution of precision (PDOP for NAV-PVT), None if
+      unknown.
+  :ivar utc_time: UTC time of the fix as reported by the receiver, a
+      datetime when the date is known, otherwise a time.
+  :ivar timestamp: Host ``time.monotonic()`` when the fix was received.
+  """
+  lat: float | None = None
+  lon: float | None = None
+  speed: float | None = None
+  heading: float | None = None
+  fix_quality: int = 0
+  hdop: float | None = None
+  utc_time: datetime | dtime | None = None
+  timestamp: float = 0.0
+
+  @property
+  def has_position(self) -> bool:
+    return self.fix_quality > 0 and self.lat is not None and self.lon is not None
+
+
+def _number(value):
+  # pynmeagps returns "" for empty NMEA fields
+  return None if value == "" or value is None else value
+
+
+class GPSReader:
+  """
+  Long-lived reader for a GNSS receiver streaming NMEA and UBX messages.
+
+  The serial port is opened once and kept open; every GGA, RMC and
+  UBX NAV-PVT message updates a merged :class:`GPSFix` that is handed to
+  ``on_fix``. Malformed messages are skipped without reopening the port,
+  only I/O errors cause a reconnect with exponential back-off.
+
+  Any binary stream can stand in for the receiver (a file, a pseudo-terminal
+  or ``serial.serial_for_url("loop://")``) by passing ``stream``.
+
+  :ivar port: Serial port of the receiver.
+  :ivar baudrate: Baud rate of the serial port.
+  :ivar fix: The latest merged fix.
+  :ivar messages: Number of messages parsed.
+  :ivar errors: Number of I/O errors (reconnects).
+  :ivar parse_errors: Number of messages skipped because they could not be
+      parsed or handled.
+  :ivar stop_at_eof: Stop when the stream has no more data, e.g. at the end
+      of a recorded file, instead of polling it every ``poll_interval``
+      seconds.
+  """
+  def __init__(self, port: str = "/dev/ttyACM0", baudrate: int = 9600, on_fix=None, stream=None,
+               stop_at_eof: bool = False, reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0,
+               poll_interval: float = 0.1):
+    self.port = port
+    self.baudrate = baudrate
+    self.on_fix = on_fix
+    self.stop_at_eof = stop_at_eof
+    self.poll_interval = poll_interval
+    self.reconnect_delay = reconnect_delay
+    self.max_reconnect_delay = max_reconnect_delay
+    self.fix = GPSFix()
+    self.messages = 0
+    self.errors = 0
+    self.parse_errors = 0
+    self._stream = stream
+    self._running = False
+    self._stopped = threading.Event()
+    self._thread = None
+    self._date = None
+
+  def start(self):
+    """
+    Starts reading on a daemon thread.
+
+    :return: None
+    """
+    self._running = True
+    self._stopped.clear()
+    self._thread = threading.Thread(target=self.run, daemon=True)
+    self._thread.start()
+
+  def stop(self):
+    """
+    Stops the reader and closes the port.
+
+    :return: None
+    """
+    self._running = False
+    # wakes up a reconnect back-off
+    self._stopped.set()
+    if self._thread is not None:
+      self._thread.join(timeout=5)
+
+  def run(self):
+    """
+    Reads messages until stopped, reconnecting on I/O errors.
+
+    :return: None
+    """
+    from pyubx2 import UBXReader, NMEA_PROTOCOL, UBX_PROTOCOL, ERR_LOG
+    self._running = True
+    delay = self.reconnect_delay
+    while self._running:
+      stream = None
+      try:
+        stream = self._open()
+        reader = UBXReader(stream, protfilter=NMEA_PROTOCOL | UBX_PROTOCOL, quitonerror=ERR_LOG)
+        delay = self.reconnect_delay
+        while self._running:
+          try:
+            raw_data, parsed_data = reader.read()
+            if parsed_data is None:
+              if raw_data is None:
+                if self.stop_at_eof:
+                  self._running = False
+                else:
+                  # end of the stream or a read timeout, wait instead of spinning
+                  self._stopped.wait(self.poll_interval)
+              continue
+            self.messages += 1
+            fix = self.update(parsed_data)
+            if fix is not None and self.on_fix is not None:
+              self.on_fix(fix)
+          except OSError:
+            raise
+          except Exception as e:
+            # a malformed message is skipped, the port stays open
+            self.parse_errors += 1
+            print(f"Error parsing GPS message: {e}")
+      except OSError as e:
+        self.errors += 1
+        print(f"Error reading GPS: {e}, reconnecting in {delay:.0f}s")
+        self._stopped.wait(delay)
+        delay = min(delay * 2, self.max_reconnect_delay)
+      finally:
+        if stream is not None and self._stream is None:
+          stream.close()
+
+  def update(self, message) -> GPSFix | None:
+    """
+    Merges one parsed message into the current fix.
+
+    :param message: A parsed NMEA or UBX message.
+    :return: The new fix, or None if the message carries no fix data.
+    :rtype: GPSFix | None
+    """
+    identity = message.identity
+    now = time.monotonic()
+    if identity.endswith("GGA"):
+      quality = _number(message.quality) or 0
+      lat, lon = _number(message.lat), _number(message.lon)
+      self.fix = self.fix._replace(
+        lat=lat if quality else None,
+        lon=lon if quality else None,
+        fix_quality=int(quality),
+        hdop=_number(message.HDOP),
+        utc_time=self._utc(_number(message.time)),
+        timestamp=now
+      )
+    elif identity.endswith("RMC"):
+      valid = message.status == "A"
+      if _number(message.date) is not None:
+        self._date = message.date
+      speed = _number(message.spd)
+      self.fix = self.fix._replace(
+        lat=_number(message.lat) if valid else None,
+        lon=_number(message.lon) if valid else None,
+        speed=speed * KNOTS_TO_MPS if speed is not None else None,
+        heading=_number(message.cog),
+        fix_quality=max(self.fix.fix_quality, 1) if valid else 0,
+        utc_time=self._utc(_number(message.time)),
+        timestamp=now
+      )
+    elif identity == "NAV-PVT":
+      valid = message.gnssFixOk and message.fixType in (2, 3, 4)
+      if valid:
+        quality = 4 if message.carrSoln == 2 else 5 if message.carrSoln == 1 else 2 if message.diffSoln else 1
+      else:
+        quality = 0
+      self.fix = GPSFix(
+        lat=message.lat if valid else None,
+        lon=message.lon if valid else None,
+        speed=message.gSpeed / 1000,
+        heading=message.headMot,
+        fix_quality=quality,
+        hdop=message.pDOP,
+        utc_time=datetime(message.year, message.month, message.day, message.hour, message.min,
+                          message.second, tzinfo=timezone.utc) if message.validDate and message.validTime else None,
+        timestamp=now
+      )
+    else:
+      return None
+    return self.fix
+
+  def _utc(self, utc_time):
+    # combine the time of GGA/RMC with the last date seen in an RMC message
+    if utc_time is None or self._date is None:
+      return utc_time
+    return datetime.combine(self._date, utc_time, tzinfo=timezone.utc)
+
+  def _open(self):
+    if self._stream is not None:
+      return self._stream
+    from serial import Serial
+    return Serial(self.port, self.baudrate, timeout=3)
@@ -0,0 +1,130 @@
+from collections import OrderedDict
+
+from cameraAI import metrics
+
+
+class MessageSynchronizer:
+    """
+    Pairs the messages of several device output queues by sequence number.
+
+    The passthrough frame and the detections of the same network inference
+    carry the same sequence number, but the device queues drop messages
+    independently when the host falls behind, so taking the next message of
+    each queue does not give a matching pair. The synchronizer waits on the
+    ``anchor`` queue (the detections), drains everything that has arrived on
+    all queues, and returns the newest sequence number for which every
+    stream has a message. Older complete sets are skipped, so the loop never
+    lags behind the camera, and messages whose partner was dropped are
+    discarded once a newer set is complete. Pending messages are bounded per
+    stream.
+
+    With only the anchor stream (e.g. detections without frames) every
+    message is its own set, and the freshest one is returned. Sources that
+    never drop messages, like a session replay, use ``latest=False`` to get
+    every set in order instead.
+
+    :param queues: Stream name -> output queue with ``get`` and ``tryGet``.
+    :param anchor: Stream to wait on, its messages arrive last.
+    :param max_pending: Messages kept per stream while waiting for their
+        partners.
+    :param latest: Return the newest complete set and skip older ones,
+        otherwise the oldest.
+    :ivar orphans: Stream -> messages discarded without a partner.
+    :ivar skipped: Complete sets skipped for a newer one.
+    """
+    def __init__(self, queues: dict, anchor: str = "nn", max_pending: int = 8, latest: bool = True) -> None:
+        if anchor not in queues:
+            raise ValueError("anchor stream {} has no queue".format(anchor))
+        self.queues = queues
+        self.anchor = anchor
+        self.max_pending = max_pending
+        self.latest = latest
+        self.orphans = {name: 0 for name in queues}
+        self.skipped = 0
+        self._pending = {name: OrderedDict() for name in queues}
+        self._sequences = {name: metrics.SequenceMonitor(metrics.DROPPED_FRAMES.labels(name)) for name in queues}
+        self._orphaned = {name: metrics.UNPAIRED_MESSAGES.labels(name) for name in queues}
+        self._frames = {name: metrics.FRAMES.labels(name) for name in queues}
+        self._skipped = metrics.SKIPPED_MESSAGES
+
+    def get(self) -> dict | None:
+        """
+        Waits for the next complete set of messages.
+
+        :return: Stream name -> message, all with the same sequence number,
+            or None once the anchor queue is closed.
+        :rtype: dict | None
+        """
+        while True:
+            # a drain may already have completed the next set
+            messages = self._pop_complete()
+            if messages is not None:
+                return messages
+            message = self.queues[self.anchor].get()
+            if message is None:
+                return None
+            self._add(self.anchor, message)
+            self._drain()
+            messages = self._pop_complete()
+            if messages is not None:
+                return messages
+            # the anchor arrived before its partners, wait for them
+            for name, queue in self.queues.items():
+                while name != self.anchor and self._newest(name) < self._newest(self.anchor):
+                    message = queue.get()
+                    if message is None:
+                        return None
+                    self._add(name, message)
+            self._drain()
+            messages = self._pop_complete()
+            if messages is not None:
+                return messages
+
+    def _drain(self) -> None:
+        # take everything that already arrived, without blocking
+        for name, queue in self.queues.items():
+            message = queue.tryGet()
+            while message is not None:
+                self._add(name, message)
+                message = queue.tryGet()
+
+    def _add(self, name: str, message) -> None:
+        sequence_num = message.getSequenceNum()
+        self._frames[name].inc()
+        self._sequences[name].update(sequence_num)
+        pending = self._pending[name]
+        pending[sequence_num] = message
+        if len(pending) > self.max_pending:
+            pending.popitem(last=False)
+            self._orphan(name)
+
+    def _newest(self, name: str) -> int:
+        pending = self._pending[name]
+        return next(reversed(pending)) if pending else -1
+
+    def _pop_complete(self) -> dict | None:
+        # sequence numbers every stream has a message for
+        complete = set(self._pending[self.anchor])
+        for name, pending in self._pending.items():
+            if name != self.anchor:
+                complete.intersection_update(pending)
+        if not complete:
+            return None
+        target = max(complete) if self.latest else min(complete)
+        skipped = sum(1 for sequence_num in complete if sequence_num < target)
+        self.skipped += skipped
+        if skipped:
+            self._skipped.inc(skipped)
+        messages = {}
+        for name, pending in self._pending.items():
+            messages[name] = pending.pop(target)
+            # older messages can no longer be returned
+            for sequence_num in [sequence_num for sequence_num in pending if sequence_num < target]:
+                del pending[sequence_num]
+                if sequence_num not in complete:
+                    self._orphan(name)
+        return messages
+
+    def _orphan(self, name: str) -> None:
+        self.orphans[name] += 1
+        self._orphaned[name].inc()
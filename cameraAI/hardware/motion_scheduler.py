@@ -0,0 +1,148 @@
+from cameraAI.detection import config
+from cameraAI import metrics
+import time
+import cv2
+
+
+class MotionScheduler:
+    """
+    Adapts the inference rate of the camera to the movement of the vehicle.
+
+    The camera keeps running at ``camera_fps``, the scheduler selects every
+    how many frames the network runs and sends it to the "control" input of
+    the device, where it takes effect on the next frame without rebuilding
+    the pipeline. Moving at ``full_speed`` or faster every frame is used,
+    slower the rate drops linearly down to ``min_fps``. Stopped (slower than
+    ``stop_speed``) for ``idle_delay`` seconds, e.g. at a depot or a traffic
+    light, it drops to ``idle_fps``; the first faster GPS fix restores the
+    rate. Without a recent GPS speed the camera runs at the full rate.
+
+    With a ``motion_threshold`` the mean difference of consecutive frames
+    also counts as movement, so a stopped vehicle wakes up when something
+    moves in view. The idle rate is never zero, otherwise there would be no
+    frames to notice the movement and the camera loop would not run.
+
+    :param control_queue: Device input queue of the "control" stream.
+    :param message_type: Message class sent on the queue, ``dai.Buffer`` or
+        ``HostBuffer``.
+    :param camera_fps: Frame rate of the camera.
+    :param full_speed: Speed in m/s from which every frame is used.
+    :param stop_speed: Speed in m/s below which the vehicle is stopped.
+    :param min_fps: Inference rate of a moving vehicle.
+    :param idle_fps: Inference rate of a stopped vehicle.
+    :param idle_delay: Seconds stopped before the idle rate is used.
+    :param motion_threshold: Mean frame difference (0..1) that counts as
+        movement, 0 to only use the GPS speed.
+    :param max_fix_age: Seconds after which the speed of a fix is unknown.
+    :ivar interval: Frames per inference currently used, 1 runs the
+        network on every frame.
+    """
+    def __init__(self, control_queue, message_type, camera_fps: float = config.CAMERA_FPS,
+                 full_speed: float = config.SCHEDULER_FULL_SPEED, stop_speed: float = config.SCHEDULER_STOP_SPEED,
+                 min_fps: float = config.SCHEDULER_MIN_FPS, idle_fps: float = config.SCHEDULER_IDLE_FPS,
+                 idle_delay: float = config.SCHEDULER_IDLE_DELAY,
+                 motion_threshold: float = config.SCHEDULER_MOTION_THRESHOLD, max_fix_age: float = 3.0) -> None:
+        if idle_fps <= 0:
+            raise ValueError("the idle inference rate must be above 0 fps")
+        self.control_queue = control_queue
+        self.message_type = message_type
+        self.camera_fps = camera_fps
+        self.full_speed = full_speed
+        self.stop_speed = stop_speed
+        self.min_fps = min(min_fps, camera_fps)
+        self.idle_fps = min(idle_fps, self.min_fps)
+        self.idle_delay = idle_delay
+        self.motion_threshold = motion_threshold
+        self.max_fix_age = max_fix_age
+        self.interval = 1
+        self._stopped_since = None
+        self._thumbnail = None
+        self._gauge = metrics.INFERENCE_FPS
+
+    def update(self, fix=None, frame=None, now: float | None = None) -> int:
+        """
+        Selects the inference rate for the latest GPS fix and frame, and sends
+        it to the device when it changed.
+
+        :param fix: The latest ``GPSFix``, or None.
+        :param frame: The latest frame, used for the motion score, or None.
+        :param now: ``time.monotonic()``, now when omitted.
+        :return: Frames per inference.
+        :rtype: int
+        """
+        if now is None:
+            now = time.monotonic()
+        speed = None
+        if fix is not None and fix.speed is not None and now - fix.timestamp <= self.max_fix_age:
+            speed = fix.speed
+        fps = self.target_fps(speed, self.motion(frame), now)
+        interval = max(1, round(self.camera_fps / fps))
+        if interval != self.interval:
+            self.send(interval)
+        return interval
+
+    def target_fps(self, speed: float | None, motion: bool, now: float) -> float:
+        """
+        Returns the inference rate for a speed.
+
+        :param speed: Ground speed in m/s, or None if unknown.
+        :param motion: Whether the frames show movement.
+        :param now: ``time.monotonic()``.
+        :rtype: float
+        """
+        stopped = speed is not None and speed < self.stop_speed
+        if not stopped and speed is None and self.motion_threshold > 0 and self._thumbnail is not None:
+            # without GPS speed the frames decide
+            stopped = not motion
+        if stopped and not motion:
+            if self._stopped_since is None:
+                self._stopped_since = now
+            if now - self._stopped_since >= self.idle_delay:
+                return self.idle_fps
+            return self.min_fps
+        self._stopped_since = None
+        if speed is None:
+            return self.camera_fps
+        return max(self.min_fps, min(self.camera_fps, self.camera_fps * speed / self.full_speed))
+
+    def motion(self, frame) -> bool:
+        """
+        Compares a frame with the previous one.
+
+        :param frame: BGR frame, or None.
+        :return: Whether the mean difference reaches ``motion_threshold``.
+        :rtype: bool
+        """
+        if self.motion_threshold <= 0 or frame is None:
+            return False
+        # a small grayscale thumbnail is enough and ignores sensor noise
+        thumbnail = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (64, 64), interpolation=cv2.INTER_AREA)
+        previous, self._thumbnail = self._thumbnail, thumbnail
+        if previous is None:
+            return False
+        return cv2.absdiff(thumbnail, previous).mean() / 255.0 >= self.motion_threshold
+
+    def send(self, interval: int) -> None:
+        """
+        Sends the frames per inference to the device.
+
+        :param interval: Run the network on every ``interval``-th frame.
+        :return: None
+        """
+        message = self.message_type()
+        message.setData([interval & 0xFF, interval >> 8])
+        self.control_queue.send(message)
+        self.interval = interval
+        self._gauge.set(self.camera_fps / interval)
+        print("[INFO] inference rate set to {:.1f} fps".format(self.camera_fps / interval))
+
+
+def read_interval(message) -> int:
+    """
+    Returns the frames per inference of a control message.
+
+    :param message: Message sent by :meth:`MotionScheduler.send`.
+    :rtype: int
+    """
+    data = message.getData()
+    return max(1, int(data[0]) | int(data[1]) << 8)
@@ -0,0 +1,328 @@
+from cameraAI.detection import yolo_decode
+from cameraAI.detection.host_pipeline import HostImgFrame, HostImgDetections, HostOutputQueue
+from datetime import timedelta
+import numpy as np
+import threading
+import struct
+import math
+import time
+import cv2
+
+# A session file is a sequence of records followed by an index:
+#
+#   header   MAGIC
+#   record   kind (u8) | sequence number (u32) | timestamp (f64) | length (u32) | payload
+#   ...
+#   index    a record of kind INDEX holding one INDEX_DTYPE entry per record
+#   footer   index offset (u64) | record count (u32) | INDEX_MAGIC
+#
+# The index is only written on close. A session that was not closed cleanly
+# (crash, power loss) is still readable, the index is then rebuilt by
+# scanning the records.
+MAGIC = b"CAISESS1"
+INDEX_MAGIC = b"CAIINDEX"
+RECORD_HEADER = struct.Struct("<BIdI")
+FOOTER = struct.Struct("<QI8s")
+GPS_PAYLOAD = struct.Struct("<dd")
+RAW_FRAME_HEADER = struct.Struct("<HHH")
+
+# record kinds
+INDEX = 0
+FRAME_JPEG = 1
+FRAME_RAW = 2
+DETECTIONS = 3
+GPS_FIX = 4
+
+INDEX_DTYPE = np.dtype([
+    ("kind", np.uint8),
+    ("sequence_num", np.uint32),
+    ("timestamp", np.float64),
+    ("offset", np.uint64),
+])
+
+
+class SessionRecorder:
+    """
+    Records frames, detections and GPS fixes of a camera session to one file.
+
+    Frames are stored as JPEG bytes by default (or raw pixels), detections as
+    packed ``yolo_decode.DETECTION_DTYPE`` rows and GPS fixes as latitude and
+    longitude. Every record carries the device sequence number and timestamp,
+    so a replay pairs frames and detections exactly like the live run.
+
+    :ivar path: Path of the session file.
+    :ivar jpeg_quality: JPEG quality used for frames, or None to store raw
+        frames.
+    """
+    def __init__(self, path, jpeg_quality: int | None = 90) -> None:
+        self.path = str(path)
+        self.jpeg_quality = jpeg_quality
+        self._file = open(self.path, "wb")
+        self._file.write(MAGIC)
+        self._index = []
+        self._lock = threading.Lock()
+        self._last_coords = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_frame(self, sequence_num: int, timestamp: float, frame: np.ndarray) -> None:
+        """
+        Records a BGR frame.
+
+        :param sequence_num: Sequence number of the frame.
+        :param timestamp: Device timestamp of the frame in seconds.
+        :param frame: The BGR frame.
+        :return: None
+        """
+        if self.jpeg_quality is not None:
+            ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok:
+                raise ValueError("Could not encode frame as JPEG")
+            self._write(FRAME_JPEG, sequence_num, timestamp, encoded.tobytes())
+        else:
+            height, width = frame.shape[:2]
+            channels = frame.shape[2] if frame.ndim == 3 else 1
+            payload = RAW_FRAME_HEADER.pack(height, width, channels) + np.ascontiguousarray(frame).tobytes()
+            self._write(FRAME_RAW, sequence_num, timestamp, payload)
+
+    def write_detections(self, sequence_num: int, timestamp: float, detections) -> None:
+        """
+        Records the detections of one frame.
+
+        :param sequence_num: Sequence number of the frame the detections
+            belong to.
+        :param timestamp: Device timestamp of the detections in seconds.
+        :param detections: ``depthai.ImgDetection`` objects or a detection
+            array.
+        :return: None
+        """
+        array = yolo_decode.to_detection_array(detections)
+        self._write(DETECTIONS, sequence_num, timestamp, array.tobytes())
+
+    def write_gps(self, timestamp: float, coords: tuple[float, float] | None) -> None:
+        """
+        Records a GPS fix, unchanged fixes are skipped.
+
+        :param timestamp: Time of the fix in seconds, on the same clock as the
+            device timestamps.
+        :param coords: (latitude, longitude), or None when there is no fix.
+        :return: None
+        """
+        if coords == self._last_coords:
+            return
+        self._last_coords = coords
+        lat, lon = coords if coords is not None else (math.nan, math.nan)
+        self._write(GPS_FIX, 0, timestamp, GPS_PAYLOAD.pack(lat, lon))
+
+    def close(self) -> None:
+        """
+        Writes the index and closes the file.
+
+        :return: None
+        """
+        with self._lock:
+            if self._file.closed:
+                return
+            index_offset = self._file.tell()
+            index = np.array(self._index, dtype=INDEX_DTYPE).tobytes()
+            self._file.write(RECORD_HEADER.pack(INDEX, 0, 0.0, len(index)))
+            self._file.write(index)
+            self._file.write(FOOTER.pack(index_offset, len(self._index), INDEX_MAGIC))
+            self._file.close()
+
+    def _write(self, kind: int, sequence_num: int, timestamp: float, payload: bytes) -> None:
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(RECORD_HEADER.pack(kind, sequence_num, timestamp, len(payload)))
+            self._file.write(payload)
+            self._index.append((kind, sequence_num, timestamp, offset))
+
+
+class SessionReader:
+    """
+    Random-access reader for session files written by :class:`SessionRecorder`.
+
+    :ivar index: One ``INDEX_DTYPE`` entry per record, in recording order.
+    """
+    def __init__(self, path) -> None:
+        self.path = str(path)
+        self._file = open(self.path, "rb")
+        if self._file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{self.path} is not a session file")
+        self.index = self._read_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def read(self, position: int):
+        """
+        Reads and decodes one record.
+
+        :param position: Position of the record in the index.
+        :return: Tuple (kind, sequence number, timestamp, value) where value
+            is a BGR frame, a detection array or a (latitude, longitude) tuple
+            (None when the fix was lost).
+        """
+        self._file.seek(int(self.index[position]["offset"]))
+        kind, sequence_num, timestamp, length = RECORD_HEADER.unpack(self._file.read(RECORD_HEADER.size))
+        # a writable buffer, so replayed frames can be annotated in place
+        payload = bytearray(self._file.read(length))
+        if kind == FRAME_JPEG:
+            value = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+        elif kind == FRAME_RAW:
+            height, width, channels = RAW_FRAME_HEADER.unpack_from(payload)
+            pixels = np.frombuffer(payload, dtype=np.uint8, offset=RAW_FRAME_HEADER.size)
+            value = pixels.reshape((height, width, channels) if channels > 1 else (height, width))
+        elif kind == DETECTIONS:
+            value = np.frombuffer(payload, dtype=yolo_decode.DETECTION_DTYPE).view(np.recarray)
+        elif kind == GPS_FIX:
+            lat, lon = GPS_PAYLOAD.unpack(payload)
+            value = None if math.isnan(lat) else (lat, lon)
+        else:
+            raise ValueError(f"Unknown record kind {kind} in {self.path}")
+        return kind, sequence_num, timestamp, value
+
+    def _read_index(self) -> np.ndarray:
+        self._file.seek(0, 2)
+        size = self._file.tell()
+        if size >= len(MAGIC) + FOOTER.size:
+            self._file.seek(size - FOOTER.size)
+            index_offset, count, magic = FOOTER.unpack(self._file.read(FOOTER.size))
+            if magic == INDEX_MAGIC:
+                self._file.seek(index_offset + RECORD_HEADER.size)
+                return np.frombuffer(self._file.read(count * INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)
+        # no index, the recording was interrupted: scan the records
+        print(f"[INFO] {self.path} has no index, scanning records...")
+        entries = []
+        offset = len(MAGIC)
+        while offset + RECORD_HEADER.size <= size:
+            self._file.seek(offset)
+            kind, sequence_num, timestamp, length = RECORD_HEADER.unpack(self._file.read(RECORD_HEADER.size))
+            if kind not in (FRAME_JPEG, FRAME_RAW, DETECTIONS, GPS_FIX):
+                # reached a partially written index
+                break
+            if offset + RECORD_HEADER.size + length > size:
+                # the last record was only partially written
+                break
+            entries.append((kind, sequence_num, timestamp, offset))
+            offset += RECORD_HEADER.size + length
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+
+class ReplayDevice:
+    """
+    Replays a recorded session through the same queue API as ``depthai.Device``.
+
+    Frames and detections are published on the "rgb" and "nn" output queues
+    with their recorded sequence numbers and timestamps, GPS fixes are written
+    to ``gps_data``. In real-time mode records are released at the pace they
+    were recorded; otherwise the session runs as fast as the consumer reads
+    it. Output queues block the replay instead of dropping messages, so every
+    run of the same session produces the same results.
+
+    :ivar path: Path of the session file.
+    :ivar realtime: Replay at the recorded pace instead of at maximum speed.
+    :ivar gps_data: Object with ``set``/``unset`` methods receiving the
+        recorded GPS fixes, e.g. ``gps_manager.gps_data``.
+    :ivar streams: Output queues that are published, frames are skipped
+        without "rgb".
+    """
+    def __init__(self, path, realtime: bool = True, gps_data=None, streams=("rgb", "nn")) -> None:
+        self.path = str(path)
+        self.realtime = realtime
+        self.gps_data = gps_data
+        self.streams = tuple(streams)
+        self._queues = {}
+        self._thread = None
+        self._running = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def getOutputQueue(self, name: str, maxSize: int = 4, blocking: bool = False) -> HostOutputQueue:
+        """
+        Returns the output queue with the given stream name ("rgb" or "nn").
+        """
+        if name not in self._queues:
+            self._queues[name] = HostOutputQueue(name, maxSize, blocking=True)
+        return self._queues[name]
+
+    def start(self) -> None:
+        """
+        Starts replaying the session on a background thread.
+
+        :return: None
+        """
+        # the queues must exist before the first record is published
+        for name in self.streams:
+            self.getOutputQueue(name)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """
+        Stops the replay and closes the output queues.
+
+        :return: None
+        """
+        self._running = False
+        for queue in self._queues.values():
+            queue.close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def isClosed(self) -> bool:
+        return not self._running
+
+    def _run(self) -> None:
+        reader = SessionReader(self.path)
+        print(f"[INFO] replaying {len(reader)} records from {self.path}...")
+        start_wall = time.monotonic()
+        start_timestamp = None
+        try:
+            for position in range(len(reader)):
+                if not self._running:
+                    break
+                # frames nobody reads are not even decoded
+                if "rgb" not in self._queues and reader.index[position]["kind"] in (FRAME_JPEG, FRAME_RAW):
+                    continue
+                kind, sequence_num, timestamp, value = reader.read(position)
+                if self.realtime:
+                    if start_timestamp is None:
+                        start_timestamp = timestamp
+                    delay = (timestamp - start_timestamp) - (time.monotonic() - start_wall)
+                    if delay > 0:
+                        time.sleep(delay)
+                device_time = timedelta(seconds=timestamp)
+                if kind in (FRAME_JPEG, FRAME_RAW):
+                    self._queues["rgb"].send(HostImgFrame(value, sequence_num, device_time))
+                elif kind == DETECTIONS:
+                    self._queues["nn"].send(HostImgDetections(value, sequence_num, device_time))
+                elif kind == GPS_FIX and self.gps_data is not None:
+                    if value is None:
+                        self.gps_data.unset(timestamp)
+                    else:
+                        self.gps_data.set(*value, timestamp=timestamp)
+        finally:
+            reader.close()
+            self._running = False
+            for queue in self._queues.values():
+                queue.close()
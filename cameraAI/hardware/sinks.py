@@ -0,0 +1,109 @@
+import threading
+import cv2
+
+
+class FrameSink:
+    """
+    Base class for outputs that consume the frames of the camera loop.
+
+    :ivar needs_annotation: True if the sink wants frames with the detections
+        and FPS drawn on them. The loop only draws when at least one sink
+        needs it.
+    :ivar quit_requested: Set by a sink to ask the loop to stop.
+    """
+    needs_annotation = True
+    quit_requested = False
+
+    def write(self, frame, timestamp: float | None = None) -> None:
+        """
+        Consumes one frame.
+
+        :param frame: The BGR frame, annotated if ``needs_annotation``.
+        :param timestamp: Capture time of the frame in seconds on the device
+            clock, or None if unknown.
+        :return: None
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """
+        Releases the resources of the sink.
+
+        :return: None
+        """
+        pass
+
+
+class DisplaySink(FrameSink):
+    """
+    Shows the annotated frames in a window, pressing 'q' stops the loop.
+    """
+    def __init__(self, window_name: str = "video") -> None:
+        self.window_name = window_name
+
+    def write(self, frame, timestamp: float | None = None) -> None:
+        # display the frame with detection output on the screen
+        cv2.imshow(self.window_name, frame)
+        # stop the loop if `q` key is pressed
+        if cv2.waitKey(1) == ord('q'):
+            self.quit_requested = True
+
+    def close(self) -> None:
+        cv2.destroyAllWindows()
+
+
+class SharedDisplay:
+    """
+    Shows the frames of several camera loops, one window per camera.
+
+    OpenCV windows must be driven from one thread, so the camera loops only
+    hand their latest frame to a :meth:`sink` and :meth:`run` shows them on
+    the calling (main) thread. Pressing 'q' in any window stops all loops.
+
+    :ivar quit_requested: True once 'q' was pressed.
+    """
+    def __init__(self) -> None:
+        self.quit_requested = False
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def sink(self, window_name: str) -> FrameSink:
+        """
+        Returns the sink of one window.
+
+        :param window_name: Name of the window, e.g. the camera id.
+        :rtype: FrameSink
+        """
+        return _SharedDisplaySink(self, window_name)
+
+    def run(self, stop: threading.Event, interval: float = 0.01) -> None:
+        """
+        Shows the latest frames until ``stop`` is set or 'q' is pressed.
+
+        :param stop: Event that ends the loop.
+        :param interval: Seconds to wait for a key press per iteration.
+        :return: None
+        """
+        while not stop.is_set() and not self.quit_requested:
+            with self._lock:
+                frames, self._frames = self._frames, {}
+            for window_name, frame in frames.items():
+                cv2.imshow(window_name, frame)
+            if cv2.waitKey(max(1, int(interval * 1000))) == ord('q'):
+                self.quit_requested = True
+        cv2.destroyAllWindows()
+
+
+class _SharedDisplaySink(FrameSink):
+    def __init__(self, display: SharedDisplay, window_name: str) -> None:
+        self.display = display
+        self.window_name = window_name
+
+    @property
+    def quit_requested(self) -> bool:
+        return self.display.quit_requested
+
+    def write(self, frame, timestamp: float | None = None) -> None:
+        # only the latest frame of a window is shown
+        with self.display._lock:
+            self.display._frames[self.window_name] = frame
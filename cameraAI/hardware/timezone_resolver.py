@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from functools import lru_cache
+import threading
+import zoneinfo
+
+
+@lru_cache(maxsize=64)
+def get_zone(tz_name: str) -> zoneinfo.ZoneInfo:
+  """
+  Returns the ZoneInfo object for a timezone name, cached per name.
+
+  :param tz_name: IANA timezone name, e.g. "Europe/Amsterdam".
+  :type tz_name: str
+  :return: The timezone.
+  :rtype: zoneinfo.ZoneInfo
+  """
+  return zoneinfo.ZoneInfo(tz_name)
+
+
+class TimezoneResolver:
+  """
+  Resolves the timezone of coordinates with a shared TimezoneFinder.
+
+  The TimezoneFinder (and its polygon data) is created once, on the first
+  lookup. Results are cached per coordinate cell of ``cell_size`` degrees
+  (about 1 km at the default), since a vehicle almost never crosses a
+  timezone boundary, so repeated lookups skip the polygon search entirely.
+  Within one cell of a boundary the cached zone may be the neighbouring one.
+
+  :ivar cell_size: Size of a cache cell in decimal degrees.
+  :ivar max_cells: Maximum number of cells kept in the cache.
+  """
+  def __init__(self, cell_size: float = 0.01, max_cells: int = 1024):
+    self.cell_size = cell_size
+    self.max_cells = max_cells
+    self._finder = None
+    self._cells = OrderedDict()
+    self._lock = threading.Lock()
+
+  def timezone_name(self, lat: float, lon: float) -> str | None:
+    """
+    Returns the timezone name at the given coordinates.
+
+    :param lat: Latitude in decimal degrees.
+    :param lon: Longitude in decimal degrees.
+    :return: The IANA timezone name, or None if the location has none
+        (e.g. open sea).
+    :rtype: str | None
+    """
+    cell = (round(lat / self.cell_size), round(lon / self.cell_size))
+    with self._lock:
+      if cell in self._cells:
+        self._cells.move_to_end(cell)
+        return self._cells[cell]
+      if self._finder is None:
+        import timezonefinder
+        self._finder = timezonefinder.TimezoneFinder()
+      tz_name = self._finder.timezone_at(lat=lat, lng=lon)
+      self._cells[cell] = tz_name
+      if len(self._cells) > self.max_cells:
+        self._cells.popitem(last=False)
+      return tz_name
+
+  def preload(self):
+    """
+    Loads the timezone data now instead of on the first lookup.
+
+    :return: None
+    """
+    with self._lock:
+      if self._finder is None:
+        import timezonefinder
+        self._finder = timezonefinder.TimezoneFinder()
+
+  def timezone(self, lat: float, lon: float) -> zoneinfo.ZoneInfo | None:
+    """
+    Returns the timezone at the given coordinates.
+
+    :param lat: Latitude in decimal degrees.
+    :param lon: Longitude in decimal degrees.
+    :return: The timezone, or None if the location has none.
+    :rtype: zoneinfo.ZoneInfo | None
+    """
+    tz_name = self.timezone_name(lat, lon)
+    return get_zone(tz_name) if tz_name else None
+
+
+# shared resolver used by gps_manager.get_local_time
+timezone_resolver = TimezoneResolver()
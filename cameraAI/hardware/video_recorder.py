@@ -0,0 +1,254 @@
+from cameraAI.hardware.sinks import FrameSink
+from datetime import datetime
+import threading
+import queue
+import time
+import os
+import cv2
+
+DROP_OLDEST = "oldest"
+DROP_NEWEST = "newest"
+
+
+class SegmentFiles:
+    """
+    Names the segment files of a recording and removes old segments.
+
+    Segments are named ``<prefix>_<local start time>.<extension>`` so they
+    sort chronologically. When ``max_segments`` is set, only the most recent
+    segments are kept.
+
+    :ivar directory: Directory the segments are written to.
+    :ivar prefix: Prefix of the file names.
+    :ivar extension: File extension without the dot.
+    :ivar max_segments: Number of segments to keep, 0 keeps all.
+    """
+    def __init__(self, directory: str, prefix: str, extension: str, max_segments: int = 0) -> None:
+        self.directory = directory
+        self.prefix = prefix
+        self.extension = extension
+        self.max_segments = max_segments
+        self._paths = []
+
+    def next_path(self) -> str:
+        """
+        Returns the path of a new segment and removes the oldest segments
+        above ``max_segments``.
+
+        :return: Path of the new segment.
+        :rtype: str
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        path = os.path.join(self.directory, "{}_{}.{}".format(self.prefix, stamp, self.extension))
+        self._paths.append(path)
+        if self.max_segments:
+            while len(self._paths) > self.max_segments:
+                old = self._paths.pop(0)
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+        return path
+
+
+class AsyncVideoWriter(FrameSink):
+    """
+    Writes frames to segmented video files on a background thread.
+
+    The camera loop only puts a reference to the frame on a bounded queue;
+    encoding and disk I/O happen on the writer thread. When the writer falls
+    behind, the queue is full and a frame is dropped according to
+    ``drop_policy`` ("oldest" discards the oldest queued frame, "newest"
+    discards the incoming one), so the loop never waits for the disk.
+
+    Frames are placed in the file by their capture timestamp: a file has a
+    constant rate of ``fps``, frames arriving faster are skipped and gaps
+    (dropped frames, a stalled camera) are filled by repeating the last
+    frame, so playback time matches wall time. A new segment is started
+    every ``segment_seconds``.
+
+    Frames must not be modified after they were written; the camera loop
+    annotates a copy when raw frames are recorded.
+
+    :ivar fps: Frame rate of the files, the camera frame rate.
+    :ivar needs_annotation: Record annotated frames (True) or the raw camera
+        frames (False).
+    :ivar segment_seconds: Length of a segment in seconds.
+    :ivar dropped: Number of frames dropped because the queue was full.
+    """
+    # longest gap filled with repeated frames, longer gaps are cut
+    max_gap = 2.0
+
+    def __init__(self, directory: str, prefix: str = "camera", fps: float = 40.0, annotate: bool = True,
+                 segment_seconds: float = 300.0, max_segments: int = 0, queue_size: int = 64,
+                 drop_policy: str = DROP_OLDEST, fourcc: str = "MJPG", extension: str = "avi") -> None:
+        if drop_policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError("unknown drop policy {!r}".format(drop_policy))
+        self.fps = fps
+        self.needs_annotation = annotate
+        self.segment_seconds = segment_seconds
+        self.drop_policy = drop_policy
+        self.fourcc = fourcc
+        self.dropped = 0
+        self.segments = SegmentFiles(directory, prefix, extension, max_segments)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer = None
+        self._segment_start = 0.0
+        self._written = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, frame, timestamp: float | None = None) -> None:
+        if timestamp is None:
+            timestamp = time.monotonic()
+        item = (frame, timestamp)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            if self.drop_policy == DROP_NEWEST:
+                return
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                pass
+
+    def close(self) -> None:
+        # the writer finishes the queued frames before it stops
+        self._queue.put(None)
+        self._thread.join()
+        if self.dropped:
+            print("[INFO] video writer dropped {} frames".format(self.dropped))
+
+    def _run(self) -> None:
+        last = None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame, timestamp = item
+            if self._writer is None or timestamp - self._segment_start >= self.segment_seconds:
+                self._open(frame, timestamp)
+                last = None
+            elif timestamp - self._segment_start - self._written / self.fps > self.max_gap:
+                # cut long gaps instead of filling them, the next segment
+                # starts at this frame
+                self._open(frame, timestamp)
+                last = None
+            # number of frames the segment should hold at this timestamp
+            due = int((timestamp - self._segment_start) * self.fps) + 1
+            if self._written >= due:
+                continue
+            # fill a gap with the previous frame, then write this one
+            while last is not None and self._written < due - 1:
+                self._writer.write(last)
+                self._written += 1
+            self._writer.write(frame)
+            self._written += 1
+            last = frame
+        self._release()
+
+    def _open(self, frame, timestamp: float) -> None:
+        self._release()
+        height, width = frame.shape[:2]
+        self._writer = cv2.VideoWriter(self.segments.next_path(), cv2.VideoWriter_fourcc(*self.fourcc),
+                                       self.fps, (width, height))
+        self._segment_start = timestamp
+        self._written = 0
+
+    def _release(self) -> None:
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+
+def _is_keyframe(data, codec: str) -> bool:
+    # every MJPEG frame is a keyframe; an H.264 keyframe starts with the
+    # sequence parameter set (NAL type 7) or an IDR slice (NAL type 5)
+    if codec != "h264":
+        return True
+    data = bytes(data[:64])
+    start = data.find(b"\x00\x00\x01")
+    return start >= 0 and start + 3 < len(data) and data[start + 3] & 0x1F in (5, 7)
+
+
+class BitstreamRecorder:
+    """
+    Stores the video bitstream encoded on the OAK device in segmented files.
+
+    The device ``VideoEncoder`` node encodes the camera frames in hardware
+    and sends the bitstream over its own XLink queue; this recorder only
+    appends the packets to the current segment on a background thread, so
+    recording costs no encode time on the host. Segments are rotated on a
+    keyframe after ``segment_seconds``, each file can be played or muxed on
+    its own, e.g. ``ffmpeg -framerate 40 -i segment.h264 -c copy out.mp4``.
+
+    Packets lost because the host queue overflowed are counted from gaps in
+    the sequence numbers.
+
+    :ivar codec: "h264" or "mjpeg", must match the encoder of the pipeline.
+    :ivar segment_seconds: Length of a segment in seconds.
+    :ivar packets: Number of packets written.
+    :ivar dropped: Number of packets lost before reaching the host.
+    """
+    def __init__(self, video_queue, directory: str, prefix: str = "camera", codec: str = "h264",
+                 segment_seconds: float = 300.0, max_segments: int = 0) -> None:
+        self.codec = codec
+        self.segment_seconds = segment_seconds
+        self.packets = 0
+        self.dropped = 0
+        self.segments = SegmentFiles(directory, prefix, codec, max_segments)
+        self._queue = video_queue
+        self._file = None
+        self._segment_start = 0.0
+        self._last_sequence = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """
+        Stops the recorder and closes the current segment.
+
+        :return: None
+        """
+        self._running = False
+        self._thread.join()
+        if self.dropped:
+            print("[INFO] video recorder lost {} packets".format(self.dropped))
+
+    def _run(self) -> None:
+        while self._running:
+            packet = self._queue.tryGet()
+            if packet is None:
+                time.sleep(0.005)
+                continue
+            self._write(packet)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, packet) -> None:
+        sequence = packet.getSequenceNum()
+        if self._last_sequence is not None and sequence > self._last_sequence + 1:
+            self.dropped += sequence - self._last_sequence - 1
+        self._last_sequence = sequence
+        timestamp = packet.getTimestamp().total_seconds()
+        data = packet.getData()
+        if self._file is None or timestamp - self._segment_start >= self.segment_seconds:
+            # a segment has to start with a keyframe to be decodable
+            if not _is_keyframe(data, self.codec):
+                if self._file is None:
+                    return
+            else:
+                if self._file is not None:
+                    self._file.close()
+                self._file = open(self.segments.next_path(), "wb")
+                self._segment_start = timestamp
+        self._file.write(data)
+        self.packets += 1
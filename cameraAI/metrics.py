@@ -0,0 +1,366 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from contextlib import contextmanager
+import threading
+import bisect
+import json
+import math
+import time
+
+# latency buckets in seconds, from sub-millisecond host stages up to
+# multi-second network requests
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Counter:
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def sample(self):
+        return self.value
+
+
+class _Gauge:
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._function = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def set_function(self, function) -> None:
+        # the value is read from ``function`` when the metrics are collected
+        self._function = function
+
+    def sample(self):
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return math.nan
+        return self.value
+
+
+class _Histogram:
+    def __init__(self, buckets) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def quantile(self, q: float) -> float:
+        # estimated by linear interpolation inside the bucket, like
+        # Prometheus' histogram_quantile
+        if not self.count:
+            return math.nan
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def sample(self):
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        return {
+            "count": count,
+            "sum": total,
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], _cumulative(counts))),
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+        }
+
+
+def _cumulative(counts):
+    total = 0
+    result = []
+    for count in counts:
+        total += count
+        result.append(total)
+    return result
+
+
+class Metric:
+    """
+    A named metric, optionally with labels.
+
+    Without label names the metric is used directly (``inc``, ``set``,
+    ``observe``, ``time``); with label names a child per label value is
+    obtained with :meth:`labels`.
+
+    :ivar name: Metric name as exposed to Prometheus.
+    :ivar help: Description of the metric.
+    :ivar kind: "counter", "gauge" or "histogram".
+    :ivar labelnames: Names of the labels.
+    """
+    def __init__(self, name: str, help: str, kind: str, labelnames=(), buckets=LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._buckets = buckets
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values):
+        """
+        Returns the child of the metric for the given label values.
+
+        :param values: One value per label name.
+        :return: The child, created on first use.
+        """
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError("{} expects labels {}".format(self.name, self.labelnames))
+            with self._lock:
+                child = self._children.setdefault(values, self._create())
+        return child
+
+    def _create(self):
+        if self.kind == "counter":
+            return _Counter()
+        if self.kind == "gauge":
+            return _Gauge()
+        return _Histogram(self._buckets)
+
+    # unlabelled metrics are used directly, these forward to the only child
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def set_function(self, function) -> None:
+        self._default.set_function(function)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def samples(self):
+        """
+        Returns the (label values, sample) pairs of all children.
+        """
+        with self._lock:
+            children = list(self._children.items())
+        return [(values, child.sample()) for values, child in children]
+
+
+class Registry:
+    """
+    Collection of metrics, rendered as Prometheus text or as JSON.
+    """
+    def __init__(self) -> None:
+        self._metrics = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames=()) -> Metric:
+        return self.register(Metric(name, help, "counter", labelnames))
+
+    def gauge(self, name: str, help: str, labelnames=()) -> Metric:
+        return self.register(Metric(name, help, "gauge", labelnames))
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS) -> Metric:
+        return self.register(Metric(name, help, "histogram", labelnames, buckets))
+
+    def to_prometheus(self) -> str:
+        """
+        Renders the metrics in the Prometheus text exposition format.
+
+        :rtype: str
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.append("# HELP {} {}".format(metric.name, metric.help))
+            lines.append("# TYPE {} {}".format(metric.name, metric.kind))
+            for values, sample in metric.samples():
+                labels = list(zip(metric.labelnames, values))
+                if metric.kind == "histogram":
+                    for bound, count in sample["buckets"].items():
+                        lines.append("{}_bucket{} {}".format(metric.name, _labels(labels + [("le", bound)]), count))
+                    lines.append("{}_sum{} {}".format(metric.name, _labels(labels), _format(sample["sum"])))
+                    lines.append("{}_count{} {}".format(metric.name, _labels(labels), sample["count"]))
+                else:
+                    lines.append("{}{} {}".format(metric.name, _labels(labels), _format(sample)))
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> dict:
+        """
+        Returns the metrics as a JSON serializable dictionary, histograms
+        include estimated percentiles.
+
+        :rtype: dict
+        """
+        result = {}
+        for metric in self._metrics.values():
+            result[metric.name] = {
+                "help": metric.help,
+                "type": metric.kind,
+                "values": [{"labels": dict(zip(metric.labelnames, values)), "value": _json_safe(sample)}
+                           for values, sample in metric.samples()],
+            }
+        return result
+
+
+def _format(value) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def _json_safe(value):
+    # NaN is not valid JSON
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    escaped = ('{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+               for name, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+class SequenceMonitor:
+    """
+    Counts frames lost on a queue from gaps in their sequence numbers.
+
+    :ivar dropped: Counter incremented by the number of missing frames.
+    """
+    def __init__(self, dropped) -> None:
+        self.dropped = dropped
+        self._last = None
+
+    def update(self, sequence_num: int) -> int:
+        """
+        Records the sequence number of a received message.
+
+        :param sequence_num: Sequence number of the message.
+        :return: Number of messages missing before this one.
+        :rtype: int
+        """
+        missing = 0
+        if self._last is not None and sequence_num > self._last + 1:
+            missing = sequence_num - self._last - 1
+            self.dropped.inc(missing)
+        self._last = sequence_num
+        return missing
+
+
+REGISTRY = Registry()
+
+FRAMES = REGISTRY.counter("cameraai_frames_total", "Messages received from the device queues.", ("stream",))
+DROPPED_FRAMES = REGISTRY.counter("cameraai_dropped_frames_total",
+                                  "Messages lost on the device queues, from sequence number gaps.", ("stream",))
+UNPAIRED_MESSAGES = REGISTRY.counter("cameraai_unpaired_messages_total",
+                                     "Messages discarded because their partner on another queue was lost.",
+                                     ("stream",))
+SKIPPED_MESSAGES = REGISTRY.counter("cameraai_skipped_messages_total",
+                                    "Matched frames and detections skipped for a newer pair.")
+CAPTURE_LATENCY = REGISTRY.histogram("cameraai_capture_latency_seconds",
+                                     "Time from capture on the device until the message reached the host loop.",
+                                     ("stream",))
+STAGE_SECONDS = REGISTRY.histogram("cameraai_stage_seconds", "Host processing time per stage of the camera loop.",
+                                   ("stage",))
+INFERENCE_FPS = REGISTRY.gauge("cameraai_inference_fps", "Inference rate selected by the motion scheduler.")
+DETECTION_QUEUE_DEPTH = REGISTRY.gauge("cameraai_detection_queue_depth", "Detections waiting in the outbox.")
+REPORTED_DETECTIONS = REGISTRY.counter("cameraai_reported_detections_total", "Detections put in the outbox.")
+SUPPRESSED_DETECTIONS = REGISTRY.counter("cameraai_suppressed_detections_total",
+                                         "Confirmed detections not reported, by reason.", ("reason",))
+GEOCODE_SECONDS = REGISTRY.histogram("cameraai_geocode_request_seconds",
+                                     "Latency of geocoding requests that missed the cache.")
+GEOCODE_CACHE = REGISTRY.counter("cameraai_geocode_cache_lookups_total", "Geocode cache lookups by result.",
+                                 ("result",))
+UPLOAD_SECONDS = REGISTRY.histogram("cameraai_upload_seconds", "Latency of POST requests to the API.", ("route",))
+STARTUP_SECONDS = REGISTRY.gauge("cameraai_startup_seconds",
+                                 "Seconds from process start until each startup phase completed.", ("phase",))
+UPLOAD_FAILURES = REGISTRY.counter("cameraai_upload_failures_total", "Failed uploads by reason.", ("reason",))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body = self.registry.to_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = json.dumps(self.registry.to_json(), default=str).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        # scrapes are frequent, keep them out of the console
+        pass
+
+
+def start_http_server(port: int, host: str = "127.0.0.1", registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """
+    Serves the metrics on a daemon thread.
+
+    ``/metrics`` returns the Prometheus text format, ``/metrics.json`` the
+    same metrics as JSON with percentiles.
+
+    :param port: TCP port to listen on, 0 picks a free port.
+    :param host: Address to bind, local only by default.
+    :param registry: The metrics to serve.
+    :return: The running server, stop it with ``shutdown()``.
+    :rtype: ThreadingHTTPServer
+    """
+    handler = type("MetricsHandler", (_Handler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,200 @@
+import threading
+import sqlite3
+import json
+import time
+import uuid
+
+
+class Outbox:
+    """
+    Durable, bounded queue of detections waiting to be uploaded.
+
+    Detections are written to an SQLite database in WAL mode as soon as they
+    are put, so nothing is lost on a crash or power cut and memory stays flat
+    during long network outages. Records are only deleted after the upload
+    was acknowledged (at-least-once delivery); every record carries a unique
+    idempotency key so the server can discard duplicates of a retried upload.
+    When ``max_records`` is reached the oldest records are dropped. A record
+    that failed ``max_attempts`` times is moved to the ``dead_letter`` table,
+    so a record that can never be uploaded does not block the ones after it.
+
+    The ``put`` method accepts the same ``(result, coords)`` tuples as the
+    in-memory queue it replaces, ``put(None)`` asks the worker to shut down.
+
+    :ivar path: Path of the SQLite database.
+    :ivar max_records: Maximum number of records kept on disk.
+    :ivar max_attempts: Failed attempts after which a record is dead-lettered.
+    :ivar dropped: Number of records dropped because the outbox was full.
+    :ivar dead_lettered: Number of records moved to the dead letter table.
+    """
+    def __init__(self, path: str, max_records: int = 50000, max_attempts: int = 5) -> None:
+        self.path = path
+        self.max_records = max_records
+        self.max_attempts = max_attempts
+        self.dropped = 0
+        self.dead_lettered = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL survives process crashes, a power cut can lose at most
+        # the last transactions that were not checkpointed yet
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "idempotency_key TEXT NOT NULL UNIQUE, "
+            "payload TEXT NOT NULL, "
+            "created REAL NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letter ("
+            "id INTEGER PRIMARY KEY, "
+            "idempotency_key TEXT NOT NULL, "
+            "payload TEXT NOT NULL, "
+            "created REAL NOT NULL, "
+            "attempts INTEGER NOT NULL, "
+            "failed REAL NOT NULL)"
+        )
+        self._size = self._db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def put(self, item) -> None:
+        """
+        Stores a detection, or signals shutdown when ``item`` is None.
+
+        :param item: Tuple (result, coords) as produced by the camera loop,
+            optionally followed by extra fields that are stored as well.
+        :return: None
+        """
+        if item is None:
+            self.close()
+            return
+        result, coords, *extra = item
+        payload = json.dumps({"result": result, "coords": coords, "extra": extra})
+        with self._condition:
+            self._db.execute("INSERT INTO outbox (idempotency_key, payload, created) VALUES (?, ?, ?)",
+                             (uuid.uuid4().hex, payload, time.time()))
+            self._size += 1
+            if self._size > self.max_records:
+                excess = self._size - self.max_records
+                self._db.execute("DELETE FROM outbox WHERE id IN (SELECT id FROM outbox ORDER BY id LIMIT ?)",
+                                 (excess,))
+                self._size -= excess
+                self.dropped += excess
+            self._condition.notify_all()
+
+    def wait(self, count: int, timeout: float) -> list:
+        """
+        Waits until ``count`` records are stored or ``timeout`` has passed,
+        then returns up to ``count`` of the oldest records without removing
+        them.
+
+        :param count: Number of records to wait for.
+        :param timeout: Maximum seconds to wait.
+        :return: List of (id, idempotency key, payload dict, created) tuples,
+            empty when the outbox is empty or closed.
+        :rtype: list
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._size < count and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            rows = self._db.execute(
+                "SELECT id, idempotency_key, payload, created FROM outbox ORDER BY id LIMIT ?", (count,)
+            ).fetchall()
+        return [(row_id, key, json.loads(payload), created) for row_id, key, payload, created in rows]
+
+    def ack(self, ids) -> None:
+        """
+        Removes records that were uploaded successfully.
+
+        :param ids: Ids of the uploaded records.
+        :return: None
+        """
+        ids = list(ids)
+        with self._condition:
+            cursor = self._db.executemany("DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id in ids])
+            self._size -= cursor.rowcount
+
+    def nack(self, ids) -> int:
+        """
+        Marks records whose upload failed. They stay in the outbox until they
+        failed ``max_attempts`` times, then they are moved to the
+        ``dead_letter`` table.
+
+        :param ids: Ids of the records that failed.
+        :return: Number of records dead-lettered.
+        :rtype: int
+        """
+        ids = [(row_id,) for row_id in ids]
+        with self._condition:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany("UPDATE outbox SET attempts = attempts + 1 WHERE id = ?", ids)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO dead_letter (id, idempotency_key, payload, created, attempts, failed) "
+                    "SELECT id, idempotency_key, payload, created, attempts, ? FROM outbox WHERE attempts >= ?",
+                    (time.time(), self.max_attempts))
+                cursor = self._db.execute("DELETE FROM outbox WHERE attempts >= ?", (self.max_attempts,))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            self._size -= cursor.rowcount
+            self.dead_lettered += cursor.rowcount
+            return cursor.rowcount
+
+    def qsize(self) -> int:
+        """
+        Returns the number of records waiting to be uploaded.
+        """
+        return self._size
+
+    def close(self) -> None:
+        """
+        Wakes up waiting workers and marks the outbox as closed.
+
+        :return: None
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+
+class RateLimiter:
+    """
+    Token bucket limiting how fast the outbox is drained.
+
+    :ivar rate: Records per second.
+    :ivar burst: Maximum number of records sent at once.
+    """
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def acquire(self, count: int) -> None:
+        """
+        Waits until ``count`` records may be sent.
+
+        :param count: Number of records about to be sent.
+        :return: None
+        """
+        count = min(count, self.burst)
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= count:
+                self._tokens -= count
+                return
+            time.sleep((count - self._tokens) / self.rate)
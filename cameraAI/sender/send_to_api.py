@@ -1,56 +1,372 @@
-import requests
+from __future__ import annotations
+from typing import TYPE_CHECKING
 import os
+import json
+import gzip
+import time
+from datetime import datetime, timezone
 from cameraAI.dto.DetectionRecordDto import DetectionRecordDto
+from cameraAI.sender.outbox import Outbox, RateLimiter
 from dotenv import load_dotenv
-import queue
 from cameraAI.hardware import gps_manager
 from cameraAI.external_api import external_api
+from cameraAI import metrics
 import threading
 
+if TYPE_CHECKING:
+    import requests
+
 # Load in secrets
 load_dotenv()
 API_ENDPOINT = os.getenv("API_URL")
 API_KEY = os.getenv("API_KEY")
 
-detection_queue = queue.Queue()
+# Records are uploaded in batches of up to UPLOAD_BATCH_SIZE, a batch is sent
+# early once its oldest record is UPLOAD_BATCH_MAX_AGE seconds old.
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "20"))
+UPLOAD_BATCH_MAX_AGE = float(os.getenv("UPLOAD_BATCH_MAX_AGE", "10"))
+# Compress request bodies with gzip, the server must accept Content-Encoding: gzip.
+UPLOAD_GZIP = os.getenv("UPLOAD_GZIP", "0") == "1"
+# Seconds to wait for a connection to the API and for its response. A pooled
+# connection that went half-open in a dead zone would otherwise block the
+# upload worker forever; a timeout is retried like any network error.
+UPLOAD_TIMEOUT = (float(os.getenv("UPLOAD_CONNECT_TIMEOUT", "5")), float(os.getenv("UPLOAD_READ_TIMEOUT", "30")))
+# Detections wait in a durable on-disk outbox until they are uploaded. The
+# outbox keeps at most OUTBOX_MAX_RECORDS (oldest dropped first) and a backlog
+# is drained at no more than OUTBOX_DRAIN_RATE records per second.
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", "outbox.sqlite3")
+OUTBOX_MAX_RECORDS = int(os.getenv("OUTBOX_MAX_RECORDS", "50000"))
+OUTBOX_DRAIN_RATE = float(os.getenv("OUTBOX_DRAIN_RATE", "20"))
+# A record that could not be built or was refused by the server this many
+# times is moved to the dead letter table of the outbox. Failures while the
+# API is unreachable do not count.
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+# Address sent when the coordinates could not be geocoded.
+UNKNOWN_ADDRESS = "Unknown address"
+
+_detection_queue: Outbox | None = None
+_session: requests.Session | None = None
+_worker: threading.Thread | None = None
+_lock = threading.Lock()
+
+
+def get_detection_queue() -> Outbox:
+    """
+    Returns the outbox the camera loop puts detections in, opening it on
+    first use.
+
+    :return: The outbox.
+    :rtype: Outbox
+    """
+    global _detection_queue
+    with _lock:
+        if _detection_queue is None:
+            _detection_queue = Outbox(OUTBOX_PATH, max_records=OUTBOX_MAX_RECORDS, max_attempts=OUTBOX_MAX_ATTEMPTS)
+            metrics.DETECTION_QUEUE_DEPTH.set_function(_detection_queue.qsize)
+        return _detection_queue
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the pooled HTTP session, creating it on first use.
+
+    :return: The session.
+    :rtype: requests.Session
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
+
+def start() -> None:
+    """
+    Starts the worker thread that uploads the detections in the outbox.
+
+    Importing this module starts nothing; calling it again while the worker
+    runs has no effect.
+
+    :return: None
+    """
+    global _worker
+    get_detection_queue()
+    if _worker is None or not _worker.is_alive():
+        _worker = threading.Thread(target=detection_worker, daemon=True)
+        _worker.start()
+
+
+def stop(timeout: float = 10.0) -> None:
+    """
+    Stops the upload worker after the batch it is sending.
+
+    Records that were not uploaded stay in the outbox for the next run.
+
+    :param timeout: Maximum seconds to wait for the worker.
+    :return: None
+    """
+    global _worker
+    if _detection_queue is not None:
+        _detection_queue.close()
+    if _worker is not None:
+        _worker.join(timeout)
+        _worker = None
+
+
+def create_session() -> requests.Session:
+    """
+    Creates the HTTP session used for all uploads.
+
+    The session keeps its connection to the API alive between requests, so
+    the TCP and TLS handshakes are only paid once instead of per record.
+    Connection failures and 502/503/504 responses are retried with back-off.
+
+    :return: A configured requests session.
+    :rtype: requests.Session
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504],
+                    allowed_methods=None)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retries)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Content-Type": "application/json",
+        "x-api-key": API_KEY or "",
+        "Connection": "keep-alive"
+    })
+    return session
+
+
+def _post_json(url: str, data, compress: bool = UPLOAD_GZIP, headers: dict | None = None) -> requests.Response:
+    """
+    Posts JSON data with the pooled session, optionally gzip compressed.
+
+    :param url: The URL to post to.
+    :param data: JSON serializable data.
+    :param compress: Compress the body with gzip.
+    :param headers: Extra request headers.
+    :return: The response.
+    :rtype: requests.Response
+    :raises requests.Timeout: If the API does not connect or answer within
+        ``UPLOAD_TIMEOUT``.
+    """
+    body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    headers = dict(headers or {})
+    if compress:
+        body = gzip.compress(body)
+        headers["Content-Encoding"] = "gzip"
+    route = url[len(API_ENDPOINT):] if API_ENDPOINT and url.startswith(API_ENDPOINT) else url
+    with metrics.UPLOAD_SECONDS.labels(route).time():
+        return get_session().post(url=url, data=body, headers=headers, timeout=UPLOAD_TIMEOUT)
+
+
+class BatchUploader:
+    """
+    Uploads detection records in batches.
+
+    Records are posted as a JSON array to the ``/litters/batch`` route. When
+    the server does not have the batch route (404, 405 or 501) the uploader
+    switches to posting records one by one for the rest of the run; every
+    record is posted and has its own result, so one rejected record does not
+    hold back the others.
+
+    :ivar batch_supported: False once the server rejected the batch route.
+    :ivar reachable: False when the last upload did not reach the server.
+    """
+    def __init__(self) -> None:
+        self.batch_supported = True
+        self.reachable = True
+
+    def send(self, records: list[DetectionRecordDto]) -> list[bool]:
+        """
+        Uploads a batch of records.
+
+        :param records: The records to upload.
+        :return: One result per record, True when the record is done with:
+            uploaded, or rejected by the server as invalid (4xx) so retrying
+            cannot help. False when it should be retried later (network
+            error, 5xx, 408, 429).
+        :rtype: list[bool]
+        """
+        import requests
+        self.reachable = True
+        results = []
+        try:
+            if self.batch_supported:
+                response = _post_json(API_ENDPOINT + "/litters/batch", [record.to_dict() for record in records])
+                if response.status_code in (404, 405, 501):
+                    print("[Uploader] server has no batch route, posting records one by one")
+                    self.batch_supported = False
+                else:
+                    return [_handle_response(response, f"{len(records)} records")] * len(records)
+            for record in records:
+                results.append(post_detection_record(record))
+        except requests.Timeout as e:
+            self.reachable = False
+            metrics.UPLOAD_FAILURES.labels("timeout").inc()
+            print("[Uploader] upload timed out, retrying later:", e)
+        except requests.RequestException as e:
+            self.reachable = False
+            metrics.UPLOAD_FAILURES.labels("network").inc()
+            print("[Uploader] upload failed, retrying later:", e)
+        # the records after a network error were not sent
+        return results + [False] * (len(records) - len(results))
+
+
+def _handle_response(response: requests.Response, what: str) -> bool:
+    # log the response and tell whether the upload is done with
+    if response.ok:
+        print("Success:", what)
+        return True
+    print("Error:", response.status_code, response.text)
+    metrics.UPLOAD_FAILURES.labels(str(response.status_code)).inc()
+    retry = response.status_code >= 500 or response.status_code in (408, 429)
+    return not retry
+
+
+def build_record(key: str, payload: dict, created: float) -> DetectionRecordDto:
+    """
+    Builds the detection record for an outbox entry.
+
+    The address is looked up now (through the geocode cache), the time is the
+    moment the detection was put in the outbox, in the local time of the
+    detection's location. When geocoding fails the record is sent with
+    ``UNKNOWN_ADDRESS`` rather than held back.
+
+    :param key: Idempotency key of the outbox entry.
+    :param payload: The stored detection (result, coordinates and the id
+        of the camera, if any, as extra field).
+    :param created: Unix time the detection was stored.
+    :return: The record to upload.
+    :rtype: DetectionRecordDto
+    """
+    coords = tuple(payload["coords"]) if payload["coords"] else None
+    extra = payload.get("extra") or [None]
+    # Retrieve the address based on coördinates.
+    address = lookup_address(coords) if coords else "No GPS"
+    return DetectionRecordDto(
+        payload["result"],
+        coords if coords else (0, 0),
+        address,
+        gps_manager.get_local_time(coords, timestamp=created),
+        idempotency_key=key,
+        camera_id=extra[0]
+    )
+
+
+def lookup_address(coords: tuple) -> str:
+    """
+    Returns the address of the coordinates, or ``UNKNOWN_ADDRESS`` when it
+    cannot be geocoded (no API key, no result, a failed or timed out request).
+
+    :param coords: (latitude, longitude).
+    :rtype: str
+    """
+    try:
+        return external_api.get_address_from_coordinates(*coords)
+    except Exception as e:
+        print("[Worker] geocoding failed, sending without address:", e)
+        return UNKNOWN_ADDRESS
+
 
 def detection_worker():
     """
-    Processes detection tasks from a queue in a loop and creates detection records.
+    Drains the detection outbox and uploads the records in batches.
 
-    This function runs indefinitely until a `None` value is retrieved from the
-    queue, which signals a shutdown. For each item processed, it extracts the
-    detection result and corresponding coordinates, retrieves the address
-    associated with the coordinates (if available), and creates a detection
-    record by calling `post_detection_record`.
+    The worker waits until ``UPLOAD_BATCH_SIZE`` detections are stored or the
+    oldest has waited ``UPLOAD_BATCH_MAX_AGE`` seconds, builds the records
+    (address and local time) and uploads them. Records are only removed from
+    the outbox after a successful upload. After a failure the worker backs off
+    exponentially, and once connectivity returns the backlog is drained at no
+    more than ``OUTBOX_DRAIN_RATE`` records per second. It stops when `None`
+    is put in the queue.
+
+    Every record is built on its own, a record that cannot be built is
+    failed alone and the others are uploaded. Records that fail
+    ``OUTBOX_MAX_ATTEMPTS`` times while the server is reachable are moved to
+    the dead letter table of the outbox.
 
     If any errors occur during processing, they are logged to the standard output.
 
     :raises Exception: Logs exceptions encountered during detection record
         creation or address retrieval, but does not stop the worker thread.
     """
-    while True:
-        data = detection_queue.get()
-        if data is None:
-            # Allows clean shutdown
-            break
-
-        result, coords = data
+    detection_queue = get_detection_queue()
+    uploader = BatchUploader()
+    limiter = RateLimiter(OUTBOX_DRAIN_RATE, burst=UPLOAD_BATCH_SIZE)
+    backoff = 1.0
+    while not detection_queue.closed:
+        entries = detection_queue.wait(UPLOAD_BATCH_SIZE, timeout=UPLOAD_BATCH_MAX_AGE)
+        if not entries:
+            continue
+        ids = []
+        records = []
+        failed = []
+        for row_id, key, payload, created in entries:
+            try:
+                records.append(build_record(key, payload, created))
+                ids.append(row_id)
+            except Exception as e:
+                print("[Worker error] record {}: {}".format(row_id, e))
+                failed.append(row_id)
+        if failed:
+            dead = detection_queue.nack(failed)
+            if dead:
+                print("[Worker] moved {} records to the dead letter table".format(dead))
+        if not records:
+            continue
         try:
-            # Retrieve the address based on coördinates.
-            address = external_api.get_address_from_coordinates(*coords) if coords else "No GPS"
-            # Post the record to the API.
-            post_detection_record(
-                DetectionRecordDto(
-                    result,
-                    coords if coords else (0, 0),
-                    address,
-                    gps_manager.get_local_time(coords)
-                )
-            )
+            limiter.acquire(len(records))
+            results = uploader.send(records)
         except Exception as e:
             print("[Worker error]", e)
-        detection_queue.task_done()
+            results = [False] * len(records)
+        done = [row_id for row_id, result in zip(ids, results) if result]
+        retry = [row_id for row_id, result in zip(ids, results) if not result]
+        if done:
+            detection_queue.ack(done)
+        if not retry:
+            backoff = 1.0
+        else:
+            # only failures of a reachable server count towards dead-lettering,
+            # an outage must not discard the backlog
+            if uploader.reachable and detection_queue.nack(retry):
+                print("[Worker] moved failed records to the dead letter table")
+            print("[Worker] {} records waiting, retrying in {:.0f}s".format(detection_queue.qsize(), backoff))
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+
+def fetch_recent_reports(since: float) -> list:
+    """
+    Fetches the litter reported to the API since a given time, by any vehicle.
+
+    The records are requested from ``GET /litters?since=<ISO time>`` and
+    converted to the (class name, latitude, longitude, Unix time) tuples
+    that seed the report index.
+
+    :param since: Unix time of the oldest report to fetch.
+    :return: The reports, records without coordinates are skipped.
+    :rtype: list[tuple[str, float, float, float]]
+    :raises requests.RequestException: If the request fails.
+    """
+    response = get_session().get(API_ENDPOINT + "/litters",
+                           params={"since": datetime.fromtimestamp(since, timezone.utc).isoformat()}, timeout=30)
+    response.raise_for_status()
+    reports = []
+    for record in response.json():
+        coords = record.get("Coordinates")
+        if not coords or tuple(coords) == (0, 0):
+            continue
+        reported = datetime.fromisoformat(record["Time"])
+        if reported.tzinfo is None:
+            reported = reported.astimezone()
+        reports.append((record["typeOfTrash"], float(coords[0]), float(coords[1]), reported.timestamp()))
+    return reports
 
 
 def post_detection_record(detection_record: DetectionRecordDto):
@@ -58,8 +374,9 @@ def post_detection_record(detection_record: DetectionRecordDto):
     Posts a detection record to a specified API endpoint.
 
     This function sends a POST request to the configured API endpoint with a
-    detection record payload. The payload is in JSON format, and the request
-    includes an API key in the header for authentication.
+    detection record payload, using the pooled keep-alive session. The payload
+    is in JSON format, and the request includes an API key in the header for
+    authentication.
 
     The function attempts to log the server's response, printing either a success
     message with the response data, or an error message with the status code and
@@ -67,22 +384,15 @@ def post_detection_record(detection_record: DetectionRecordDto):
 
     :param detection_record: An instance of DetectionRecordDto containing the
         detection record data to be sent.
-    :return: None
+    :return: True when the record is done with (uploaded, or rejected as
+        invalid), False when it should be retried.
+    :rtype: bool
     """
-    headers = {
-        "Content-Type": "application/json",
-        "x-api-key": API_KEY
-    }
-
     data = detection_record.to_dict()
 
-    response = requests.post(url=API_ENDPOINT + "/litters", json=data, headers=headers)
+    headers = {"Idempotency-Key": detection_record.idempotency_key} if detection_record.idempotency_key else {}
+    response = _post_json(API_ENDPOINT + "/litters", data, headers=headers)
 
     # Print a result depending on if the request was succesfull
-    if response.status_code == 200:
-        print("Success:", response.json())
-    else:
-        print("Error:", response.status_code, response.text)
+    return _handle_response(response, response.text)
 
-# Start the detection thread which sends the detections over to our API.
-threading.Thread(target=detection_worker, daemon=True).start()
\ No newline at end of file
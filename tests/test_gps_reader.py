@@ -0,0 +1,96 @@
+from datetime import date, datetime, timezone
+from functools import reduce
+import io
+import time
+
+import pytest
+
+from cameraAI.hardware.gps_reader import GPSReader, KNOTS_TO_MPS
+
+pyubx2 = pytest.importorskip("pyubx2")
+
+
+def nmea(body: str) -> bytes:
+    checksum = reduce(lambda value, char: value ^ ord(char), body, 0)
+    return "${}*{:02X}\r\n".format(body, checksum).encode("ascii")
+
+
+GGA = nmea("GPGGA,120000.00,5200.00000,N,00400.00000,E,1,08,0.9,10.0,M,46.9,M,,")
+RMC = nmea("GPRMC,120000.00,A,5200.00000,N,00400.00000,E,10.0,90.0,170126,,,A")
+NO_FIX = nmea("GPGGA,120001.00,,,,,0,00,99.99,,,,,,")
+
+
+def nav_pvt(**fields) -> bytes:
+    values = dict(year=2026, month=1, day=17, hour=12, min=0, second=2, validDate=1, validTime=1,
+                  fixType=3, gnssFixOk=1, lat=52.1, lon=4.1, gSpeed=5000, headMot=180.0, pDOP=1.5)
+    values.update(fields)
+    return pyubx2.UBXMessage("NAV", "NAV-PVT", pyubx2.GET, **values).serialize()
+
+
+def read(data: bytes):
+    fixes = []
+    reader = GPSReader(stream=io.BytesIO(data), on_fix=fixes.append, stop_at_eof=True)
+    reader.run()
+    return reader, fixes
+
+
+def test_merges_gga_and_rmc():
+    reader, fixes = read(GGA + RMC)
+    assert reader.messages == 2
+    assert len(fixes) == 2
+    fix = fixes[-1]
+    assert fix.has_position
+    assert (fix.lat, fix.lon) == pytest.approx((52.0, 4.0))
+    assert fix.speed == pytest.approx(10.0 * KNOTS_TO_MPS)
+    assert fix.heading == pytest.approx(90.0)
+    assert fix.hdop == pytest.approx(0.9)
+    # the date of the RMC message completes the UTC time
+    assert fix.utc_time == datetime(2026, 1, 17, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def test_lost_fix_has_no_position():
+    _, fixes = read(GGA + NO_FIX)
+    assert fixes[0].has_position
+    assert not fixes[-1].has_position
+    assert fixes[-1].lat is None
+
+
+def test_nav_pvt():
+    _, fixes = read(nav_pvt())
+    fix = fixes[0]
+    assert fix.fix_quality == 1
+    assert (fix.lat, fix.lon) == pytest.approx((52.1, 4.1))
+    assert fix.speed == pytest.approx(5.0)
+    assert fix.utc_time == datetime(2026, 1, 17, 12, 0, 2, tzinfo=timezone.utc)
+
+
+def test_nav_pvt_without_fix():
+    _, fixes = read(nav_pvt(fixType=0, gnssFixOk=0))
+    assert not fixes[0].has_position
+
+
+def test_malformed_message_is_skipped():
+    broken = GGA[:-5] + b"00\r\n"
+    reader, fixes = read(broken + RMC)
+    # the reader keeps going with the next message
+    assert reader.messages == 1
+    assert fixes[-1].has_position
+    assert fixes[-1].utc_time.date() == date(2026, 1, 17)
+
+
+class CountingStream(io.BytesIO):
+    reads = 0
+
+    def read(self, *args):
+        self.reads += 1
+        return super().read(*args)
+
+
+def test_empty_stream_is_polled_without_spinning():
+    stream = CountingStream(b"")
+    reader = GPSReader(stream=stream, poll_interval=0.05)
+    reader.start()
+    time.sleep(0.3)
+    reader.stop()
+    assert not reader._thread.is_alive()
+    assert stream.reads < 20
@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from cameraAI.hardware import gps_manager
+from cameraAI.hardware.gps_manager import GPSData, GPSTrack
+from cameraAI.hardware.gps_reader import GPSFix
+
+
+def test_empty_track_has_no_position():
+    assert GPSTrack().at(10.0) is None
+
+
+def test_interpolates_between_fixes():
+    track = GPSTrack()
+    track.append(10.0, 52.0, 4.0)
+    track.append(11.0, 52.1, 4.2)
+    assert track.at(10.25) == pytest.approx((52.025, 4.05))
+    assert track.at(11.0) == pytest.approx((52.1, 4.2))
+
+
+def test_before_the_oldest_fix_returns_the_oldest():
+    track = GPSTrack()
+    track.append(10.0, 52.0, 4.0)
+    track.append(11.0, 52.1, 4.2)
+    assert track.at(5.0) == (52.0, 4.0)
+
+
+def test_extrapolates_for_a_short_while_only():
+    track = GPSTrack(max_extrapolation=1.0)
+    track.append(10.0, 52.0, 4.0)
+    track.append(11.0, 52.1, 4.0)
+    assert track.at(11.5) == pytest.approx((52.15, 4.0))
+    assert track.at(13.0) == (52.1, 4.0)
+
+
+def test_lost_fix_yields_the_nearest_fix():
+    track = GPSTrack()
+    track.append(10.0, 52.0, 4.0)
+    track.append(11.0, None, None)
+    assert track.at(10.2) == (52.0, 4.0)
+    assert track.at(10.8) is None
+
+
+def test_wraps_around_and_keeps_the_newest_entries():
+    track = GPSTrack(capacity=4)
+    for i in range(10):
+        track.append(float(i), 50.0 + i, 4.0)
+    assert len(track) == 3
+    assert track.at(8.5) == pytest.approx((58.5, 4.0))
+    # older entries were overwritten, the oldest one kept answers
+    assert track.at(2.0) == (57.0, 4.0)
+
+
+def test_gps_data_merges_the_messages_of_one_epoch(monkeypatch):
+    monkeypatch.setattr(gps_manager, "GPS_LATENCY", 0.0)
+    data = GPSData()
+    epoch = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    data.set_fix(GPSFix(52.0, 4.0, fix_quality=1, utc_time=epoch, timestamp=10.0))
+    data.set_fix(GPSFix(52.0, 4.0, speed=3.0, fix_quality=1, utc_time=epoch, timestamp=10.2))
+    assert len(data.track) == 1
+    data.set_fix(GPSFix(fix_quality=0, utc_time=epoch.replace(second=1), timestamp=11.0))
+    assert data.get() is None
+    assert data.get(10.1) == (52.0, 4.0)
+    assert data.get_fix().fix_quality == 0
+
+
+def test_gps_data_places_fixes_by_their_utc_time(monkeypatch):
+    monkeypatch.setattr(gps_manager, "GPS_LATENCY", 0.05)
+    data = GPSData()
+    epoch = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    # received 0.6, 0.2 and 0.9 seconds after the epoch
+    for second, delay in enumerate((0.6, 0.2, 0.9)):
+        data.set_fix(GPSFix(52.0 + second, 4.0, fix_quality=1, utc_time=epoch.replace(second=second),
+                            timestamp=100.0 + second + delay))
+    # the smallest delay is taken as the offset, every later fix uses it
+    assert data.get(102.15) == pytest.approx((54.0, 4.0))
+    assert data.get(101.15) == pytest.approx((53.0, 4.0))
+    # the first fix was placed before the fast one was seen, by its own delay
+    assert data.get(100.55) == pytest.approx((52.0, 4.0))
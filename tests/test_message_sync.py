@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+import pytest
+
+from cameraAI.detection.host_pipeline import HostImgDetections, HostImgFrame, HostOutputQueue
+from cameraAI.hardware.message_sync import MessageSynchronizer
+
+
+def make_queues(frames, detections):
+    queues = {"rgb": HostOutputQueue("rgb", maxSize=16), "nn": HostOutputQueue("nn", maxSize=16)}
+    for sequence_num in frames:
+        queues["rgb"].send(HostImgFrame(None, sequence_num, timedelta(0)))
+    for sequence_num in detections:
+        queues["nn"].send(HostImgDetections([], sequence_num, timedelta(0)))
+    for queue in queues.values():
+        queue.close()
+    return queues
+
+
+def drain(synchronizer):
+    sets = []
+    while (messages := synchronizer.get()) is not None:
+        assert messages["rgb"].getSequenceNum() == messages["nn"].getSequenceNum()
+        sets.append(messages["nn"].getSequenceNum())
+    return sets
+
+
+def test_pairs_every_set_in_order():
+    synchronizer = MessageSynchronizer(make_queues(range(4), range(4)), latest=False)
+    assert drain(synchronizer) == [0, 1, 2, 3]
+    assert synchronizer.orphans == {"rgb": 0, "nn": 0}
+
+
+def test_drops_messages_whose_partner_was_lost():
+    synchronizer = MessageSynchronizer(make_queues([0, 1, 3, 4], [0, 2, 3, 4]), latest=False)
+    assert drain(synchronizer) == [0, 3, 4]
+    assert synchronizer.orphans == {"rgb": 1, "nn": 1}
+
+
+def test_latest_skips_older_sets():
+    synchronizer = MessageSynchronizer(make_queues(range(3), range(3)))
+    assert drain(synchronizer) == [2]
+    assert synchronizer.skipped == 2
+
+
+def test_pending_messages_are_bounded():
+    synchronizer = MessageSynchronizer(make_queues(range(10), [9]), max_pending=4, latest=False)
+    assert drain(synchronizer) == [9]
+    # six frames fell out of the pending window, three were older than the set
+    assert synchronizer.orphans["rgb"] == 9
+
+
+def test_anchor_only():
+    queues = make_queues([], range(3))
+    synchronizer = MessageSynchronizer({"nn": queues["nn"]}, latest=False)
+    assert [messages["nn"].getSequenceNum() for messages in iter(synchronizer.get, None)] == [0, 1, 2]
+
+
+def test_anchor_must_have_a_queue():
+    with pytest.raises(ValueError):
+        MessageSynchronizer({"rgb": HostOutputQueue("rgb")})
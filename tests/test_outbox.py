@@ -0,0 +1,78 @@
+import sqlite3
+
+import pytest
+
+from cameraAI.sender.outbox import Outbox
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.sqlite3"), max_records=10, max_attempts=2)
+    yield outbox
+    outbox.close()
+
+
+def test_put_and_wait_return_the_oldest_records(outbox):
+    for i in range(3):
+        outbox.put(("bottle", (52.0 + i, 4.0), "left"))
+    entries = outbox.wait(2, timeout=0)
+    assert len(entries) == 2
+    assert [payload["coords"] for _, _, payload, _ in entries] == [[52.0, 4.0], [53.0, 4.0]]
+    assert entries[0][2]["extra"] == ["left"]
+    # every record has its own idempotency key
+    assert entries[0][1] != entries[1][1]
+    # wait does not remove the records
+    assert outbox.qsize() == 3
+
+
+def test_wait_times_out_with_fewer_records(outbox):
+    outbox.put(("can", None))
+    assert len(outbox.wait(5, timeout=0.05)) == 1
+
+
+def test_ack_removes_records(outbox):
+    for i in range(3):
+        outbox.put(("can", None))
+    ids = [row_id for row_id, _, _, _ in outbox.wait(2, timeout=0)]
+    outbox.ack(ids)
+    assert outbox.qsize() == 1
+    assert not {row_id for row_id, _, _, _ in outbox.wait(3, timeout=0)} & set(ids)
+
+
+def test_nack_dead_letters_after_max_attempts(outbox):
+    outbox.put(("can", None))
+    outbox.put(("bottle", None))
+    first = outbox.wait(1, timeout=0)[0][0]
+    assert outbox.nack([first]) == 0
+    assert outbox.qsize() == 2
+    assert outbox.nack([first]) == 1
+    assert outbox.qsize() == 1
+    assert outbox.dead_lettered == 1
+    # the next record is no longer blocked by the failing one
+    assert outbox.wait(1, timeout=0)[0][2]["result"] == "bottle"
+    rows = sqlite3.connect(outbox.path).execute("SELECT id, attempts FROM dead_letter").fetchall()
+    assert rows == [(first, 2)]
+
+
+def test_oldest_records_are_dropped_when_full(outbox):
+    for i in range(12):
+        outbox.put(("can", (i, 0)))
+    assert outbox.qsize() == 10
+    assert outbox.dropped == 2
+    assert outbox.wait(1, timeout=0)[0][2]["coords"] == [2, 0]
+
+
+def test_records_survive_a_reopen(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    outbox = Outbox(path)
+    outbox.put(("can", None))
+    outbox.close()
+    reopened = Outbox(path)
+    assert reopened.qsize() == 1
+    reopened.close()
+
+
+def test_put_none_closes(outbox):
+    outbox.put(None)
+    assert outbox.closed
+    assert outbox.wait(1, timeout=1) == []
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from cameraAI.detection import yolo_decode
+from cameraAI.detection.host_pipeline import HostImgDetections, HostOutputQueue
+from cameraAI.detection.tiling import TileMerger, merge_tiles, parse_tiles, tile_rois
+
+
+def detections(*rows):
+    array = np.recarray(len(rows), dtype=yolo_decode.DETECTION_DTYPE)
+    array[:] = [(0, *row) for row in rows]
+    return array
+
+
+def test_parse_tiles():
+    assert parse_tiles("") is None
+    assert parse_tiles("3X2") == (3, 2)
+    with pytest.raises(ValueError):
+        parse_tiles("0x2")
+
+
+def test_tile_rois_cover_the_frame_with_overlap():
+    rois = tile_rois(2, 1, overlap=0.2, full_frame=True)
+    assert rois.shape == (3, 4)
+    np.testing.assert_allclose(rois[0], (0, 0, 1 / 1.8, 1), rtol=1e-6)
+    np.testing.assert_allclose(rois[1], (0.8 / 1.8, 0, 1, 1), rtol=1e-6)
+    np.testing.assert_allclose(rois[2], (0, 0, 1, 1))
+
+
+def test_merge_maps_tile_boxes_to_the_frame_and_removes_duplicates():
+    rois = np.array([(0.0, 0.0, 0.6, 1.0), (0.4, 0.0, 1.0, 1.0)], dtype=np.float32)
+    # the same object in the overlap of both tiles, and one only in the right tile
+    left = detections((0, 0.8, 0.75, 0.5, 0.95, 0.6))
+    right = detections((0, 0.9, 0.05 / 0.6, 0.5, 0.17 / 0.6, 0.6), (1, 0.7, 0.5, 0.1, 0.6, 0.2))
+    merged = merge_tiles([left, right], rois)
+    assert merged.label.tolist() == [0, 1]
+    np.testing.assert_allclose(merged.confidence, [0.9, 0.7], rtol=1e-6)
+    np.testing.assert_allclose((merged[0].xmin, merged[0].xmax), (0.45, 0.57), rtol=1e-5)
+    np.testing.assert_allclose((merged[1].xmin, merged[1].xmax), (0.7, 0.76), rtol=1e-5)
+
+
+def test_merge_without_tiles():
+    assert len(merge_tiles([], np.zeros((0, 4), dtype=np.float32))) == 0
+
+
+def test_tile_merger_returns_one_message_per_frame_and_drops_incomplete_frames():
+    rois = tile_rois(2, 1)
+    queue = HostOutputQueue("nn", maxSize=16)
+    one = detections((0, 0.9, 0.1, 0.1, 0.2, 0.2))
+    for sequence_num, tiles in ((0, 2), (1, 1), (2, 2)):
+        for _ in range(tiles):
+            queue.send(HostImgDetections(one, sequence_num, timedelta(seconds=sequence_num)))
+    queue.close()
+    merger = TileMerger(queue, rois)
+    frames = list(iter(merger.get, None))
+    assert [frame.getSequenceNum() for frame in frames] == [0, 2]
+    assert frames[1].getTimestamp() == timedelta(seconds=2)
+    assert len(frames[0].detections) == 2
+    assert merger.incomplete == 1
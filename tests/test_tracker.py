@@ -0,0 +1,90 @@
+import numpy as np
+
+from cameraAI.detection import tracker as tracker_module
+from cameraAI.detection import yolo_decode
+from cameraAI.detection.tracker import SortTracker, iou_matrix
+
+
+def detections(*boxes, label=0, confidence=0.9):
+    array = np.recarray(len(boxes), dtype=yolo_decode.DETECTION_DTYPE)
+    array[:] = [(0, label, confidence, *box) for box in boxes]
+    return array
+
+
+BOX = (0.40, 0.40, 0.50, 0.50)
+
+
+def moved(box, dx):
+    return (box[0] + dx, box[1], box[2] + dx, box[3])
+
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 1, 1], [0, 0, 0.5, 1]])
+    b = np.array([[0, 0, 1, 1], [2, 2, 3, 3]])
+    np.testing.assert_allclose(iou_matrix(a, b), [[1, 0], [0.5, 0]])
+
+
+def test_track_is_confirmed_after_min_hits():
+    tracker = SortTracker(min_hits=3)
+    assert tracker.update(detections(BOX)) == []
+    assert tracker.update(detections(moved(BOX, 0.01))) == []
+    confirmed = tracker.update(detections(moved(BOX, 0.02)))
+    assert len(confirmed) == 1
+    assert len(tracker) == 1
+    track = confirmed[0]
+    assert track.label == 0
+    assert track.confidence == np.float32(0.9)
+    assert abs(track.xmin - 0.42) < 0.02
+
+
+def test_tracks_only_match_their_own_class():
+    tracker = SortTracker(min_hits=2)
+    tracker.update(detections(BOX, label=0))
+    assert tracker.update(detections(BOX, label=1)) == []
+    assert len(tracker) == 2
+
+
+def test_confirmed_track_is_returned_until_marked_reported():
+    tracker = SortTracker(min_hits=2)
+    tracker.update(detections(BOX))
+    track_id = tracker.update(detections(BOX))[0].track_id
+    # not reported yet (e.g. throttled), offered again
+    assert [track.track_id for track in tracker.update(detections(BOX))] == [track_id]
+    tracker.mark_reported([track_id])
+    assert tracker.update(detections(BOX)) == []
+    # the track itself lives on, so the object is not reported twice
+    assert len(tracker) == 1
+
+
+def test_track_coasts_through_missed_frames():
+    tracker = SortTracker(min_hits=2, max_age=3)
+    tracker.update(detections(BOX))
+    track_id = tracker.update(detections(moved(BOX, 0.01)))[0].track_id
+    for _ in range(3):
+        tracker.update(detections())
+    assert len(tracker) == 1
+    # the predicted box still matches the object when it reappears
+    assert [track.track_id for track in tracker.update(detections(moved(BOX, 0.05)))] == [track_id]
+
+
+def test_track_is_dropped_after_max_age():
+    tracker = SortTracker(min_hits=2, max_age=2)
+    tracker.update(detections(BOX))
+    for _ in range(3):
+        tracker.update(detections())
+    assert len(tracker) == 0
+
+
+def test_min_confidence_holds_back_weak_tracks():
+    tracker = SortTracker(min_hits=1, min_confidence=0.5)
+    assert tracker.update(detections(BOX, confidence=0.3)) == []
+    assert len(tracker.update(detections(BOX, confidence=0.6))) == 1
+
+
+def test_greedy_matching_without_scipy(monkeypatch):
+    monkeypatch.setattr(tracker_module, "_linear_sum_assignment", lambda: None)
+    tracker = SortTracker(min_hits=2)
+    other = (0.10, 0.10, 0.20, 0.20)
+    tracker.update(detections(BOX, other))
+    confirmed = tracker.update(detections(other, BOX))
+    assert sorted(track.track_id for track in confirmed) == [1, 2]
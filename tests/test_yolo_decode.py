@@ -0,0 +1,91 @@
+import numpy as np
+
+from cameraAI.detection import yolo_decode
+from cameraAI.detection.yolo_decode import batched_nms, decode_yolov8
+
+INPUT_SIZE = (640, 640)
+
+
+def raw_output(anchors, num_classes=3, num_anchors=8):
+    """
+    Builds a raw YOLOv8 output of one image, ``anchors`` maps an anchor index
+    to (cx, cy, w, h, class, score) in input pixels.
+    """
+    output = np.zeros((4 + num_classes, num_anchors), dtype=np.float32)
+    for anchor, (cx, cy, w, h, label, score) in anchors.items():
+        output[:4, anchor] = (cx, cy, w, h)
+        output[4 + label, anchor] = score
+    return output
+
+
+def test_batched_nms_suppresses_overlaps_within_a_group():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [20, 20, 30, 30]], dtype=np.float32)
+    scores = np.array([0.8, 0.9, 0.7], dtype=np.float32)
+    keep = batched_nms(boxes, scores, np.zeros(3, dtype=np.int64), iou_threshold=0.5)
+    assert keep.tolist() == [1, 2]
+
+
+def test_batched_nms_keeps_overlaps_of_different_groups():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11]], dtype=np.float32)
+    scores = np.array([0.8, 0.9], dtype=np.float32)
+    keep = batched_nms(boxes, scores, np.array([0, 1]), iou_threshold=0.5)
+    assert keep.tolist() == [1, 0]
+
+
+def test_batched_nms_limits_boxes_per_image():
+    boxes = np.array([[0, 0, 1, 1], [5, 5, 6, 6], [10, 10, 11, 11], [0, 0, 1, 1]], dtype=np.float32)
+    scores = np.array([0.9, 0.8, 0.7, 0.6], dtype=np.float32)
+    images = np.array([0, 0, 0, 1])
+    keep = batched_nms(boxes, scores, images, 0.5, images=images, max_per_image=2)
+    assert keep.tolist() == [0, 1, 3]
+
+
+def test_batched_nms_without_boxes():
+    assert batched_nms(np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=np.int64), 0.5).size == 0
+
+
+def test_decode_normalizes_boxes_and_picks_the_best_class():
+    output = raw_output({2: (320, 160, 64, 32, 1, 0.9)})
+    output[4 + 2, 2] = 0.6
+    detections = decode_yolov8(output, INPUT_SIZE, confidence_threshold=0.5)
+    assert len(detections) == 1
+    detection = detections[0]
+    assert (detection.image, detection.label) == (0, 1)
+    assert detection.confidence == np.float32(0.9)
+    np.testing.assert_allclose((detection.xmin, detection.ymin, detection.xmax, detection.ymax),
+                               (0.45, 0.225, 0.55, 0.275), rtol=1e-6)
+
+
+def test_decode_drops_low_scores_and_duplicates():
+    output = raw_output({
+        0: (100, 100, 50, 50, 0, 0.9),
+        1: (102, 102, 50, 50, 0, 0.8),  # duplicate of anchor 0
+        2: (102, 102, 50, 50, 1, 0.7),  # same place, other class
+        3: (400, 400, 50, 50, 0, 0.3),  # below the threshold
+    })
+    detections = decode_yolov8(output, INPUT_SIZE, confidence_threshold=0.5, iou_threshold=0.5)
+    assert detections.label.tolist() == [0, 1]
+    np.testing.assert_allclose(detections.confidence, [0.9, 0.7])
+
+
+def test_decode_batch_keeps_images_apart():
+    first = raw_output({0: (100, 100, 50, 50, 0, 0.6)})
+    second = raw_output({0: (100, 100, 50, 50, 0, 0.9), 5: (500, 500, 50, 50, 2, 0.8)})
+    detections = decode_yolov8(np.stack((first, second)), INPUT_SIZE)
+    assert detections.image.tolist() == [0, 1, 1]
+    split = yolo_decode.split_by_image(detections, 2)
+    assert [len(image) for image in split] == [1, 2]
+
+
+def test_decode_limits_candidates_and_detections():
+    anchors = {i: (20 + 60 * i, 100, 40, 40, 0, 0.5 + i / 100) for i in range(8)}
+    output = raw_output(anchors)
+    detections = decode_yolov8(output, INPUT_SIZE, max_candidates=4, max_detections=3)
+    # the best four candidates are considered, the best three kept
+    assert detections.confidence.tolist() == np.float32([0.57, 0.56, 0.55]).tolist()
+
+
+def test_decode_without_detections():
+    detections = decode_yolov8(raw_output({}), INPUT_SIZE)
+    assert len(detections) == 0
+    assert detections.dtype == yolo_decode.DETECTION_DTYPE